@@ -4,7 +4,10 @@ ComfyUI 飞书多维表格插件
 """
 
 from .feishu_table_node import FeishuTableNode
+from .feishu_table_page_node import FeishuTablePageNode
 from .feishu_write_node import FeishuWriteNode
+from .feishu_claim_node import FeishuClaimNode
+from .feishu_watch_node import FeishuWatchNode
 
 from .feishu_fetch_image_node import FeishuFetchImageNode
 from .feishu_fetch_video_node import FeishuFetchVideoNode
@@ -15,7 +18,10 @@ from .feishu_video_upload_node import FeishuVideoUploadNode
 # 节点类映射
 NODE_CLASS_MAPPINGS = {
     "FeishuTableNode": FeishuTableNode,
+    "FeishuTablePageNode": FeishuTablePageNode,
     "FeishuWriteNode": FeishuWriteNode,
+    "FeishuClaimNode": FeishuClaimNode,
+    "FeishuWatchNode": FeishuWatchNode,
 
     "FeishuFetchImageNode": FeishuFetchImageNode,
     "FeishuFetchVideoNode": FeishuFetchVideoNode,
@@ -27,7 +33,10 @@ NODE_CLASS_MAPPINGS = {
 # 节点显示名称映射
 NODE_DISPLAY_NAME_MAPPINGS = {
     "FeishuTableNode": "获取文本（飞书多维表格）",
+    "FeishuTablePageNode": "分页读取（飞书多维表格）",
     "FeishuWriteNode": "写入文本（飞书多维表格）",
+    "FeishuClaimNode": "领取任务（飞书多维表格）",
+    "FeishuWatchNode": "监视变更（飞书多维表格）",
 
     "FeishuFetchImageNode": "获取图片（飞书多维表格）",
     "FeishuFetchVideoNode": "获取视频（飞书多维表格）",
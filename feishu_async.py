@@ -0,0 +1,82 @@
+"""
+飞书节点异步执行支持
+为节点提供协程入口（ComfyUI 支持协程节点时启用）以及共享的并发 I/O 线程池
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+
+
+def _detect_async_support() -> bool:
+    """检测当前 ComfyUI 是否支持协程 FUNCTION（可用 FEISHU_ASYNC_NODES=0/1 强制指定）"""
+    override = os.environ.get("FEISHU_ASYNC_NODES")
+    if override is not None:
+        return override.strip().lower() in ("1", "true", "yes", "on")
+    try:
+        # 支持协程节点的 ComfyUI 版本同时提供了执行上下文工具
+        from comfy_execution.utils import get_executing_context  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+ASYNC_NODES_SUPPORTED = _detect_async_support()
+
+# 节点内部并发网络请求使用的线程数
+IO_WORKERS = max(1, int(os.environ.get("FEISHU_IO_WORKERS", "8") or 8))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="feishu-io")
+    return _executor
+
+
+def submit_io(func: Callable, *args, **kwargs) -> Future:
+    """在共享 I/O 线程池中后台执行一次调用（保留当前执行上下文）"""
+    ctx = contextvars.copy_context()
+    return _get_executor().submit(ctx.run, func, *args, **kwargs)
+
+
+def current_prompt_id() -> Optional[str]:
+    """返回当前正在执行的 ComfyUI prompt_id；无法获取时返回 None"""
+    try:
+        from comfy_execution.utils import get_executing_context
+        context = get_executing_context()
+        return getattr(context, "prompt_id", None) if context is not None else None
+    except Exception:
+        return None
+
+
+def first_result(calls: Sequence[Callable[[], Any]],
+                 accept: Callable[[Any], bool] = lambda r: r is not None) -> Any:
+    """
+    依次尝试多个备选方案，返回第一个满足 accept 的结果；全部失败时返回 None
+    前一个失败才开始下一个（用于下载回退链，避免同时下载多份完整文件）
+    """
+    for call in calls:
+        try:
+            result = call()
+        except Exception:
+            continue
+        if accept(result):
+            return result
+    return None
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """在工作线程中执行同步调用，避免阻塞 ComfyUI 的事件循环"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(ctx.run, func, *args, **kwargs))
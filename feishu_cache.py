@@ -0,0 +1,153 @@
+"""
+飞书多维表格记录快照缓存
+进程内按 (应用, 多维表格, 数据表, 视图) 缓存记录列表，带 TTL 与按内存占用的 LRU 淘汰
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import AbstractSet, Dict, Hashable, List, Optional
+
+try:
+    from .feishu_client import env_float
+except ImportError:
+    from feishu_client import env_float
+
+
+# 快照有效期（秒），0 表示关闭快照缓存
+SNAPSHOT_TTL = env_float("FEISHU_SNAPSHOT_TTL", 30.0)
+# 快照缓存的内存上限（MB，按接口响应体积估算）
+SNAPSHOT_MAX_MB = env_float("FEISHU_SNAPSHOT_MAX_MB", 256.0)
+
+# 解析后的 Python 对象约为 JSON 响应体积的数倍
+_OBJECT_OVERHEAD = 4
+
+# 保留的过期快照列式视图数量
+RETIRED_VIEWS = 8
+
+
+class TableSnapshot:
+    """
+    一次记录扫描的结果（field_names 为 None 表示包含全部字段）
+
+    columnar 为按需构建的列式视图；columnar_base 为同一键上一份快照的列式视图，供增量构建
+    """
+
+    __slots__ = ("records", "complete", "nbytes", "loaded_at", "field_names", "columnar", "columnar_base")
+
+    def __init__(self, records: List[Dict], complete: bool, nbytes: int = 0,
+                 field_names: Optional[AbstractSet[str]] = None):
+        self.records = records
+        self.complete = complete
+        self.nbytes = nbytes
+        self.field_names = frozenset(field_names) if field_names is not None else None
+        self.loaded_at = time.monotonic()
+        self.columnar = None
+        self.columnar_base = None
+
+    def has_fields(self, field_names: Optional[AbstractSet[str]]) -> bool:
+        """快照是否包含 field_names 中的全部字段（None 表示需要全部字段）"""
+        if self.field_names is None:
+            return True
+        return field_names is not None and self.field_names.issuperset(field_names)
+
+    def covers(self, max_rows: Optional[int], field_names: Optional[AbstractSet[str]] = None) -> bool:
+        """快照是否足以满足最多 max_rows 条（None 表示全部）、包含 field_names 字段的请求"""
+        if not self.has_fields(field_names):
+            return False
+        if self.complete:
+            return True
+        return max_rows is not None and len(self.records) >= max_rows
+
+    def supersedes(self, other: "TableSnapshot") -> bool:
+        """本快照能否满足 other 能满足的所有请求"""
+        if not self.has_fields(other.field_names):
+            return False
+        return self.complete or (not other.complete and len(self.records) >= len(other.records))
+
+    def memory_cost(self) -> int:
+        return max(self.nbytes, len(self.records) * 64) * _OBJECT_OVERHEAD
+
+
+class SnapshotCache:
+    """线程安全的记录快照缓存（TTL + 内存上限 LRU）"""
+
+    def __init__(self, ttl: float = SNAPSHOT_TTL, max_bytes: int = int(SNAPSHOT_MAX_MB * 1024 * 1024)):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, TableSnapshot]" = OrderedDict()
+        self._bytes = 0
+        # 过期/失效快照留下的列式视图（每个键一份），交给同一键的下一份快照增量复用
+        self._retired: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Hashable, max_rows: Optional[int] = None,
+            field_names: Optional[AbstractSet[str]] = None) -> Optional[TableSnapshot]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            snapshot = self._entries.get(key)
+            if snapshot is None:
+                return None
+            if time.monotonic() - snapshot.loaded_at > self.ttl:
+                self._retire(key)
+                return None
+            if not snapshot.covers(max_rows, field_names):
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def put(self, key: Hashable, snapshot: TableSnapshot) -> None:
+        if not self.enabled:
+            return
+        cost = snapshot.memory_cost()
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            existing = self._entries.get(key)
+            # 不用更少的数据（行或字段）覆盖仍然有效的快照
+            if (existing is not None and existing.supersedes(snapshot)
+                    and time.monotonic() - existing.loaded_at <= self.ttl):
+                return
+            self._retire(key)
+            snapshot.columnar_base = self._retired.pop(key, None)
+            self._entries[key] = snapshot
+            self._bytes += cost
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, predicate) -> None:
+        """删除键满足 predicate 的快照"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._retire(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._retired.clear()
+            self._bytes = 0
+
+    def _retire(self, key: Hashable) -> None:
+        snapshot = self._entries.get(key)
+        self._remove(key)
+        view = snapshot and (snapshot.columnar or snapshot.columnar_base)
+        if view is not None:
+            self._retired[key] = view
+            self._retired.move_to_end(key)
+            while len(self._retired) > RETIRED_VIEWS:
+                self._retired.popitem(last=False)
+
+    def _remove(self, key: Hashable) -> None:
+        snapshot = self._entries.pop(key, None)
+        if snapshot is not None:
+            self._bytes -= snapshot.memory_cost()
+
+
+# 全局共享实例
+snapshot_cache = SnapshotCache()
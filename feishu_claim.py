@@ -0,0 +1,134 @@
+"""
+把多维表格当作多个 ComfyUI 工作进程共享的任务队列：按租约领取待处理的行
+- 领取者列写入本次领取的标记（工作者 ID#随机串），租约列写入到期时间（毫秒时间戳）
+- 飞书没有比较并交换（CAS）接口，因此采用「写入前回读 → 批量写入 → 等待片刻 → 批量回读校验」：
+  写入前再读一次选中的行，已被别人领取的不再写入；同一行被多个工作进程同时写入时以最后写入者为准，
+  回读时标记不是自己的行即视为未领到
+- 仍然存在的竞争：两个工作进程的「写入前回读」都发生在对方写入之前，且后写入者的写入晚于先写入者的回读校验
+  （即后写入者从写入前回读到写入之间的间隔超过 CLAIM_SETTLE_SECONDS）时，两者都会认为领到了同一行。
+  该间隔通常只有一次请求的时间，FEISHU_CLAIM_SETTLE 应明显大于写入请求的耗时；需要严格互斥时请另用外部锁
+- 租约过期（工作进程崩溃或超时）的行会被重新领取
+- 各工作进程按「工作者 ID + 记录 ID」的哈希打乱候选顺序，减少争抢同一批行
+"""
+
+import hashlib
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+try:
+    from .feishu_client import env_float
+    from .feishu_filter import display_text, parse_date, parse_number
+    from .feishu_records import (batch_get_records, batch_update_records, fetch_table_fields,
+                                 invalidate_table, stream_table_records)
+except ImportError:
+    from feishu_client import env_float
+    from feishu_filter import display_text, parse_date, parse_number
+    from feishu_records import (batch_get_records, batch_update_records, fetch_table_fields,
+                                invalidate_table, stream_table_records)
+
+
+# 写入后等待多少秒再回读校验（让同时写入的其它工作进程的结果先落地）
+CLAIM_SETTLE_SECONDS = env_float("FEISHU_CLAIM_SETTLE", 1.0)
+# 候选行数为领取数量的多少倍（各工作进程从中按哈希挑选，越大争抢越少）
+CLAIM_SPREAD = 4
+
+_TEXT_TYPE = 1
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def lease_expiry(value: Any) -> Optional[int]:
+    """租约列的到期时间（毫秒时间戳，文本列可填数字或日期）；为空或无法解析时返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = display_text(value).strip() if value else ""
+    number = parse_number(text) if text else None
+    if number is None and text:
+        number = parse_date(text)
+    return int(number) if number is not None else None
+
+
+def is_free(fields: Dict[str, Any], worker_column: str, lease_column: str, now_ms: int) -> bool:
+    """该行是否可以领取：未被领取，或租约已过期（已被领取但租约无法解析时视为仍被占用）"""
+    if not display_text(fields.get(worker_column)).strip():
+        return True
+    lease = fields.get(lease_column)
+    if not display_text(lease).strip() and not isinstance(lease, (int, float)):
+        # 有领取者却没有租约：没有可以遵守的期限，视为空闲
+        return True
+    expiry = lease_expiry(lease)
+    return expiry is not None and expiry <= now_ms
+
+
+def _cell_value(field_type: Optional[int], value: Any) -> Any:
+    # 文本列写入字符串，数字/日期列写入数值
+    return str(value) if field_type == _TEXT_TYPE else value
+
+
+def claim_records(access_token: str, app_token: str, table_id: str, filter_condition: str, count: int,
+                  worker_id: str = "", lease_seconds: float = 600, worker_column: str = "领取者",
+                  lease_column: str = "租约到期", field_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    领取最多 count 条满足 filter_condition 且空闲（未领取或租约过期）的记录
+
+    返回 {"token": 本次领取标记, "records": 领取成功的记录（回读的最新内容）, "lost": 被其它工作进程抢走的条数}。
+    接口报错时抛出 FeishuAPIError
+    """
+    worker_id = (worker_id or "").strip() or default_worker_id()
+    token = f"{worker_id}#{uuid.uuid4().hex[:8]}"
+    now_ms = int(time.time() * 1000)
+
+    # 领取必须基于最新数据，不能使用快照缓存
+    invalidate_table(app_token, table_id)
+    wanted_fields = list(field_names or []) + [worker_column, lease_column]
+    candidates: List[Dict] = []
+    for record in stream_table_records(access_token, app_token, table_id, filter_condition=filter_condition,
+                                       field_names=wanted_fields):
+        if record.get("record_id") and is_free(record.get("fields", {}), worker_column, lease_column, now_ms):
+            candidates.append(record)
+            if len(candidates) >= count * CLAIM_SPREAD:
+                break
+    if not candidates:
+        return {"token": token, "records": [], "lost": 0}
+
+    candidates.sort(key=lambda r: hashlib.sha1(f"{worker_id}/{r['record_id']}".encode("utf-8")).digest())
+    chosen = candidates[:count]
+    field_types = {f.get("field_name"): f.get("type")
+                   for f in fetch_table_fields(access_token, app_token, table_id) or []}
+    # 扫描到写入之间其它工作进程可能已经领取了其中的行：写入前再读一次，只写仍然空闲的行
+    fresh = {r.get("record_id"): r
+             for r in batch_get_records(access_token, app_token, table_id, [r["record_id"] for r in chosen])}
+    now_ms = int(time.time() * 1000)
+    taken = len(chosen)
+    chosen = [r for r in chosen
+              if r["record_id"] in fresh and is_free(fresh[r["record_id"]].get("fields", {}),
+                                                     worker_column, lease_column, now_ms)]
+    taken -= len(chosen)
+    if not chosen:
+        return {"token": token, "records": [], "lost": taken}
+    expiry = now_ms + int(lease_seconds * 1000)
+    updates = [{"record_id": r["record_id"],
+                "fields": {worker_column: token,
+                           lease_column: _cell_value(field_types.get(lease_column), expiry)}}
+               for r in chosen]
+    try:
+        batch_update_records(access_token, app_token, table_id, updates)
+    finally:
+        invalidate_table(app_token, table_id)
+
+    if CLAIM_SETTLE_SECONDS > 0:
+        time.sleep(CLAIM_SETTLE_SECONDS)
+    current = {r.get("record_id"): r
+               for r in batch_get_records(access_token, app_token, table_id, [r["record_id"] for r in chosen])}
+    claimed = [current[r["record_id"]] for r in chosen if r["record_id"] in current
+               and display_text(current[r["record_id"]].get("fields", {}).get(worker_column)).strip() == token]
+    lost = taken + len(chosen) - len(claimed)
+    print(f"🎫 {worker_id} 领取 {len(claimed)} 条记录（候选 {len(candidates)} 条，被抢走 {lost} 条）")
+    return {"token": token, "records": claimed, "lost": lost}
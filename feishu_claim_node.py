@@ -0,0 +1,147 @@
+"""
+飞书多维表格任务领取节点
+多个 ComfyUI 工作进程共用一张任务表时，每次按租约领取若干条待处理的行，避免重复处理（见 feishu_claim）
+"""
+
+from typing import List, Tuple
+
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from .feishu_claim import claim_records
+    from .feishu_client import get_tenant_access_token
+    from .feishu_filter import split_column_names
+    from .feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from .feishu_records import FeishuAPIError
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from feishu_claim import claim_records
+    from feishu_client import get_tenant_access_token
+    from feishu_filter import split_column_names
+    from feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from feishu_records import FeishuAPIError
+
+
+class FeishuClaimNode:
+    """
+    飞书多维表格任务领取节点
+
+    功能：
+    1. 在满足「待处理条件」的行中领取最多 N 条未被领取（或租约已过期）的行
+    2. 领取者列写入领取标记，租约列写入到期时间；写入后回读校验，只返回确实领到的行
+    3. 输出领取标记，可作为「写入文本」节点的筛选条件（领取者列名+领取标记）回写处理结果
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "飞书配置": ("FEISHU_CONFIG",),
+                "筛选列名": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "placeholder": "必填：输出的列名（每行一个）。例：\n提示词\n参考图"
+                }),
+                "待处理条件": ("STRING", {
+                    "multiline": True,
+                    "default": "进度-完成",
+                    "placeholder": "待处理任务的筛选条件（每行一条），语法与「获取文本」节点相同"
+                }),
+                "领取数量": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 100,
+                    "step": 1
+                }),
+                "工作者ID": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "留空使用 主机名-进程号"
+                }),
+                "租约秒数": ("INT", {
+                    "default": 600,
+                    "min": 10,
+                    "max": 86400,
+                    "step": 10
+                }),
+            },
+            "optional": {
+                "领取者列名": ("STRING", {"default": "领取者", "multiline": False}),
+                "租约列名": ("STRING", {"default": "租约到期", "multiline": False}),
+                "列分隔符": ("STRING", {
+                    "multiline": True,
+                    "default": " | ",
+                    "placeholder": "自定义列分隔符（仅标记文本格式使用），默认为 ' | '"
+                }),
+                "输出格式": (list(OUTPUT_FORMATS), {
+                    "default": MARKER_FORMAT
+                })
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("表格数据", "领取标记", "状态信息", "逐行数据")
+    OUTPUT_IS_LIST = (False, False, False, True)
+
+    FUNCTION = "claim_async" if ASYNC_NODES_SUPPORTED else "claim"
+    CATEGORY = "飞书工具"
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        # 每次执行都要重新领取
+        return float("nan")
+
+    async def claim_async(self, **kwargs):
+        """协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环"""
+        return await run_blocking(self.claim, **kwargs)
+
+    def claim(self, 飞书配置: dict, 筛选列名: str, 待处理条件: str, 领取数量: int, 工作者ID: str, 租约秒数: int,
+              领取者列名: str = "领取者", 租约列名: str = "租约到期", 列分隔符: str = " | ",
+              输出格式: str = MARKER_FORMAT) -> Tuple[str, str, str, List[str]]:
+        app_id = 飞书配置.get("app_id", "")
+        app_secret = 飞书配置.get("app_secret", "")
+        url_app_id = 飞书配置.get("url_app_id", "")
+        table_id = 飞书配置.get("table_id", "")
+
+        if not app_id or not app_secret or not url_app_id or not table_id:
+            return "", "", "错误：配置信息不完整，请检查飞书配置节点", []
+        columns = split_column_names(筛选列名)
+        if not columns:
+            return "", "", "提示：未填写列名（第一个框），本次不返回任何数据。", []
+        worker_column, lease_column = 领取者列名.strip(), 租约列名.strip()
+        if not worker_column or not lease_column:
+            return "", "", "错误：未填写领取者列名或租约列名", []
+
+        access_token = get_tenant_access_token(app_id, app_secret)
+        if not access_token:
+            return "", "", "错误：无法获取访问令牌，请检查App ID和App Secret", []
+
+        try:
+            result = claim_records(access_token, url_app_id, table_id, 待处理条件, 领取数量, 工作者ID, 租约秒数,
+                                   worker_column, lease_column, field_names=columns)
+        except FeishuAPIError as e:
+            error_msg = f"领取任务失败: {str(e)}"
+            print(error_msg)
+            return "", "", error_msg, []
+        except Exception as e:
+            error_msg = f"执行过程中发生错误: {str(e)}"
+            print(error_msg)
+            return "", "", error_msg, []
+
+        records = result["records"]
+        output_data, rows = format_records(records, columns, 输出格式, normalize_separator(列分隔符))
+        status_msg = f"领取 {len(records)} 条记录，租约 {租约秒数} 秒"
+        if result["lost"]:
+            status_msg += f"，{result['lost']} 条被其它工作进程领取"
+        if not records:
+            status_msg = "没有可领取的记录" if not result["lost"] else status_msg
+        return output_data, result["token"], status_msg, rows
+
+
+# 节点注册映射（由 __init__.py 汇总导出）
+NODE_CLASS_MAPPINGS = {
+    "FeishuClaimNode": FeishuClaimNode,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "FeishuClaimNode": "领取任务（飞书多维表格）",
+}
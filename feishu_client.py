@@ -0,0 +1,309 @@
+"""
+飞书开放平台公共客户端
+为所有飞书节点提供共享的访问令牌缓存、带连接池的 HTTP 会话和频率限制调度
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+AUTH_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# 令牌到期前提前刷新的秒数（飞书在剩余有效期不足30分钟时会签发新令牌）
+TOKEN_REFRESH_MARGIN = 300
+
+# 连接池配置（可通过环境变量覆盖）
+# POOL_CONNECTIONS: 缓存的主机连接池数量；POOL_MAXSIZE: 每个主机保持的最大连接数
+POOL_CONNECTIONS = env_int("FEISHU_HTTP_POOL_CONNECTIONS", 8)
+POOL_MAXSIZE = env_int("FEISHU_HTTP_POOL_MAXSIZE", 16)
+# 建立连接的超时秒数；读取超时沿用各调用处传入的 timeout
+CONNECT_TIMEOUT = env_float("FEISHU_HTTP_CONNECT_TIMEOUT", 10.0)
+
+# 各接口族的每应用 QPS 上限（令牌桶速率，可通过环境变量覆盖）
+RATE_LIMITS = {
+    "bitable_read": env_float("FEISHU_RATE_BITABLE_READ", 20.0),
+    "bitable_write": env_float("FEISHU_RATE_BITABLE_WRITE", 10.0),
+    "drive": env_float("FEISHU_RATE_DRIVE", 5.0),
+}
+# 触发频率限制后的最大重试次数与退避参数（秒）
+RATE_LIMIT_MAX_RETRIES = env_int("FEISHU_RATE_MAX_RETRIES", 5)
+RATE_LIMIT_BACKOFF_BASE = 0.5
+RATE_LIMIT_BACKOFF_MAX = 30.0
+# 飞书表示频率限制的业务错误码
+RATE_LIMIT_CODES = {99991400, 1254290}
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的 HTTP 会话（keep-alive 连接池）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+class TokenBucket:
+    """线程安全的令牌桶，acquire 在桶空时阻塞等待"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 0.01)
+        self.capacity = capacity if capacity is not None else max(self.rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """服务端要求等待时，暂停整个桶（所有共享该桶的调用方）"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class RateLimiter:
+    """按 (app_id, 接口族) 维护令牌桶的请求调度器"""
+
+    def __init__(self, limits: Mapping[str, float] = RATE_LIMITS):
+        self.limits = dict(limits)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_family(method: str, url: str) -> Optional[str]:
+        if "/open-apis/bitable/" in url:
+            if method.upper() == "GET" or url.rstrip("/").endswith("/records/search"):
+                return "bitable_read"
+            return "bitable_write"
+        if "/open-apis/drive/" in url:
+            return "drive"
+        return None
+
+    def bucket_for(self, method: str, url: str, headers: Optional[Mapping[str, str]]) -> Optional[TokenBucket]:
+        family = self.endpoint_family(method, url)
+        if family is None or family not in self.limits:
+            return None
+        app_id = "default"
+        auth = (headers or {}).get("Authorization", "")
+        if auth.startswith("Bearer "):
+            app_id = token_cache.owner_of(auth[len("Bearer "):]) or "default"
+        key = (app_id, family)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.limits[family])
+                self._buckets[key] = bucket
+            return bucket
+
+
+rate_limiter = RateLimiter()
+
+
+def _rate_limit_wait(response: requests.Response, attempt: int) -> Optional[float]:
+    """若响应为频率限制，返回下次重试前应等待的秒数；否则返回 None"""
+    limited = response.status_code == 429
+    # 频率限制的错误响应体很小，只解析小体积的 JSON 响应，避免重复解析大分页数据
+    if not limited and "json" in response.headers.get("Content-Type", "") and len(response.content) <= 2048:
+        try:
+            limited = response.json().get("code") in RATE_LIMIT_CODES
+        except Exception:
+            limited = False
+    if not limited:
+        return None
+
+    # 优先遵循服务端给出的重置时间
+    for header in ("x-ogw-ratelimit-reset", "Retry-After"):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return max(float(value), 0.0) + random.uniform(0, RATE_LIMIT_BACKOFF_BASE)
+            except ValueError:
+                pass
+    # 带抖动的指数退避
+    ceiling = min(RATE_LIMIT_BACKOFF_MAX, RATE_LIMIT_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def http_request(method: str, url: str, timeout: float = 30, **kwargs) -> requests.Response:
+    """
+    通过共享会话发送请求
+
+    - timeout 为读取超时；传入 (connect, read) 元组时原样使用
+    - 飞书接口按 (app_id, 接口族) 限速，遇到 429/频率限制错误码时退避重试
+    """
+    if not isinstance(timeout, tuple):
+        timeout = (min(CONNECT_TIMEOUT, timeout), timeout)
+    bucket = rate_limiter.bucket_for(method, url, kwargs.get("headers"))
+
+    attempt = 0
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+        response = get_session().request(method, url, timeout=timeout, **kwargs)
+        wait = _rate_limit_wait(response, attempt)
+        if wait is None or attempt >= RATE_LIMIT_MAX_RETRIES:
+            return response
+        attempt += 1
+        print(f"⏳ 触发飞书频率限制，{wait:.2f} 秒后第 {attempt} 次重试: {method} {url}")
+        if bucket is not None:
+            bucket.pause(wait)
+        else:
+            time.sleep(wait)
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return http_request("GET", url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return http_request("POST", url, **kwargs)
+
+
+def http_put(url: str, **kwargs) -> requests.Response:
+    return http_request("PUT", url, **kwargs)
+
+
+class _TokenEntry:
+    __slots__ = ("token", "expires_at", "secret_digest")
+
+    def __init__(self, token: str, expires_at: float, secret_digest: str):
+        self.token = token
+        self.expires_at = expires_at
+        self.secret_digest = secret_digest
+
+
+class TokenCache:
+    """
+    进程内共享的 tenant_access_token 缓存
+
+    - 按 app_id 缓存令牌，遵循飞书返回的 expire 有效期
+    - 到期前 refresh_margin 秒内视为过期并刷新
+    - 同一 app_id 的并发调用只会触发一次刷新请求
+    """
+
+    def __init__(self, refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._entries: Dict[str, _TokenEntry] = {}
+        self._owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._refresh_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _digest(app_secret: str) -> str:
+        return hashlib.sha256(app_secret.encode("utf-8")).hexdigest()
+
+    def _valid_entry(self, app_id: str, secret_digest: str) -> Optional[_TokenEntry]:
+        entry = self._entries.get(app_id)
+        if entry is None or entry.secret_digest != secret_digest:
+            return None
+        if time.time() >= entry.expires_at - self.refresh_margin:
+            return None
+        return entry
+
+    def get_token(self, app_id: str, app_secret: str) -> Optional[str]:
+        """获取有效令牌，必要时向飞书请求新令牌"""
+        secret_digest = self._digest(app_secret)
+        with self._lock:
+            entry = self._valid_entry(app_id, secret_digest)
+            if entry is not None:
+                return entry.token
+            refresh_lock = self._refresh_locks.setdefault(app_id, threading.Lock())
+
+        # 同一 app_id 只允许一个线程刷新，其余线程等待后复用结果
+        with refresh_lock:
+            with self._lock:
+                entry = self._valid_entry(app_id, secret_digest)
+                if entry is not None:
+                    return entry.token
+
+            token, expire = self._request_token(app_id, app_secret)
+            if not token:
+                return None
+
+            with self._lock:
+                old = self._entries.get(app_id)
+                if old is not None:
+                    self._owners.pop(old.token, None)
+                self._entries[app_id] = _TokenEntry(token, time.time() + expire, secret_digest)
+                self._owners[token] = app_id
+            return token
+
+    def owner_of(self, token: str) -> Optional[str]:
+        """根据令牌反查所属 app_id（用于按应用限速）"""
+        return self._owners.get(token)
+
+    def invalidate(self, app_id: Optional[str] = None) -> None:
+        """使指定 app_id（或全部）的缓存令牌失效"""
+        with self._lock:
+            if app_id is None:
+                self._entries.clear()
+                self._owners.clear()
+            else:
+                entry = self._entries.pop(app_id, None)
+                if entry is not None:
+                    self._owners.pop(entry.token, None)
+
+    def _request_token(self, app_id: str, app_secret: str):
+        try:
+            payload = {"app_id": app_id, "app_secret": app_secret}
+            response = http_post(AUTH_URL, json=payload, timeout=30)
+            response.raise_for_status()
+
+            data = response.json()
+            if data.get("code") == 0:
+                return data.get("tenant_access_token"), int(data.get("expire", 7200))
+            print(f"获取访问令牌失败: {data.get('msg', '未知错误')}")
+        except Exception as e:
+            print(f"获取访问令牌时发生错误: {str(e)}")
+        return None, 0
+
+
+# 全局共享实例
+token_cache = TokenCache()
+
+
+def get_tenant_access_token(app_id: str, app_secret: str) -> Optional[str]:
+    """获取 tenant_access_token（进程内缓存，到期前自动刷新）"""
+    return token_cache.get_token(app_id, app_secret)
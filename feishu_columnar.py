@@ -0,0 +1,308 @@
+"""
+飞书记录的列式表示
+为大快照按列构建紧凑的文本与判空掩码（需要 numpy），筛选规则变为向量化的掩码运算：
+- 每列的规范化文本拼接成一个字符串，关键词匹配在整列上一次性查找，再按行偏移映射回行号
+- 判空结果保存为布尔数组
+- 同一列被多次按关键词查询后，构建二元组（bigram）倒排索引，只在候选行上复核
+- 按大小比较的规则使用按需构建的有序索引，二分查找取出区间内的行
+- 各列的空值比例、不同取值数量作为规则通过率的估计，决定规则的判定顺序
+列按需构建并挂在快照上，随快照一起过期；输出仍使用原始记录。
+快照刷新后，新视图从上一份视图增量构建：未变化的单元格直接复用，行位置不变时只更新变化行的索引
+"""
+
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from .feishu_cache import TableSnapshot
+    from .feishu_client import env_int
+    from .feishu_filter import (EMPTY, NOT_EMPTY, CompiledFilter, TypedRule, comparable_keys, is_empty_value,
+                                normalize_text, searchable_text, selectivity_stats)
+except ImportError:
+    from feishu_cache import TableSnapshot
+    from feishu_client import env_int
+    from feishu_filter import (EMPTY, NOT_EMPTY, CompiledFilter, TypedRule, comparable_keys, is_empty_value,
+                               normalize_text, searchable_text, selectivity_stats)
+
+
+# 快照行数不少于该值时使用列式筛选，0 表示关闭
+COLUMNAR_MIN_ROWS = env_int("FEISHU_COLUMNAR_MIN_ROWS", 5000)
+# 同一列被按关键词查询达到该次数后构建倒排索引，0 表示不建索引
+KEYWORD_INDEX_AFTER = env_int("FEISHU_KEYWORD_INDEX_AFTER", 2)
+
+# 行（以及列表中各项）之间的分隔符，关键词不会跨行匹配
+_SEP = "\x00"
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class KeywordIndex:
+    """一列的 bigram 倒排索引：bigram -> 包含它的行号集合"""
+
+    __slots__ = ("postings",)
+
+    def __init__(self, postings: Dict[str, Set[int]]):
+        self.postings = postings
+
+    @classmethod
+    def build(cls, texts: List[str]) -> "KeywordIndex":
+        postings: Dict[str, Set[int]] = {}
+        for row, text in enumerate(texts):
+            for gram in _grams(text):
+                rows = postings.get(gram)
+                if rows is None:
+                    postings[gram] = {row}
+                else:
+                    rows.add(row)
+        return cls(postings)
+
+    def updated(self, changes: List[Tuple[int, str, str]]) -> "KeywordIndex":
+        """按 (行号, 旧文本, 新文本) 更新索引，返回新索引（写时复制，旧视图上的查询不受影响）"""
+        postings = dict(self.postings)
+        copied: Set[str] = set()
+
+        def rows_of(gram: str) -> Set[int]:
+            if gram not in copied:
+                copied.add(gram)
+                postings[gram] = set(postings.get(gram, ()))
+            return postings[gram]
+
+        for row, old, new in changes:
+            old_grams, new_grams = _grams(old), _grams(new)
+            for gram in old_grams - new_grams:
+                rows_of(gram).discard(row)
+            for gram in new_grams - old_grams:
+                rows_of(gram).add(row)
+        return KeywordIndex(postings)
+
+    def candidates(self, needle: str) -> Set[int]:
+        """可能包含 needle（至少 2 个字符）的行"""
+        lists = []
+        for gram in _grams(needle):
+            rows = self.postings.get(gram)
+            if not rows:
+                return set()
+            lists.append(rows)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+
+class TextColumn:
+    """一列的紧凑表示：拼接后的规范化文本、每行起始偏移、判空掩码，以及按需构建的倒排索引和有序索引"""
+
+    __slots__ = ("values", "blob", "starts", "empty", "index", "lookups", "ordered", "stats")
+
+    def __init__(self, values: List, texts: Optional[List[str]] = None, empty: Optional[List[bool]] = None):
+        if texts is None:
+            texts = [searchable_text(v, _SEP) for v in values]
+        if empty is None:
+            empty = [is_empty_value(v) for v in values]
+        self.values = values
+        lengths = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=len(texts))
+        self.starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(texts) else np.zeros(0, dtype=np.int64)
+        self.blob = _SEP.join(texts)
+        self.empty = np.fromiter(empty, dtype=bool, count=len(values))
+        self.index: Optional[KeywordIndex] = None
+        self.lookups = 0
+        self.ordered: Optional[Tuple["np.ndarray", "np.ndarray"]] = None
+        self.stats: Optional[Tuple[float, int]] = None
+
+    @classmethod
+    def derive(cls, base: "TextColumn", values: List, base_rows: List[int], stable: bool) -> "TextColumn":
+        """
+        从上一份视图的同名列增量构建：base_rows[i] 为第 i 行在旧视图中的行号（-1 表示新记录），
+        stable 表示旧记录的行号都没有变化，此时倒排索引只更新变化的行
+        """
+        texts: List[str] = []
+        empty: List[bool] = []
+        changes: List[Tuple[int, str, str]] = []
+        for row, value in enumerate(values):
+            old_row = base_rows[row]
+            if old_row >= 0:
+                old_value = base.values[old_row]
+                if old_value is value or old_value == value:
+                    texts.append(base.text(old_row))
+                    empty.append(bool(base.empty[old_row]))
+                    continue
+            text = searchable_text(value, _SEP)
+            texts.append(text)
+            empty.append(is_empty_value(value))
+            changes.append((row, base.text(old_row) if old_row >= 0 else "", text))
+
+        column = cls(values, texts, empty)
+        column.lookups = base.lookups
+        if base.index is not None and stable:
+            column.index = base.index.updated(changes)
+        return column
+
+    def statistics(self) -> Tuple[float, int]:
+        """(空值比例, 不同取值的数量)；列表字段按各项计数"""
+        if self.stats is None:
+            empty_ratio = float(self.empty.mean()) if len(self.empty) else 0.0
+            self.stats = (empty_ratio, len(set(self.blob.split(_SEP))))
+        return self.stats
+
+    def text(self, row: int) -> str:
+        start = int(self.starts[row])
+        end = int(self.starts[row + 1]) - 1 if row + 1 < len(self.starts) else len(self.blob)
+        return self.blob[start:end]
+
+    def contains(self, needle: str) -> "np.ndarray":
+        """各行文本是否包含 needle（已规范化）"""
+        self.lookups += 1
+        if len(needle) >= 2 and KEYWORD_INDEX_AFTER > 0 and (
+                self.index is not None or self.lookups >= KEYWORD_INDEX_AFTER):
+            return self._contains_indexed(needle)
+
+        mask = np.zeros(len(self.starts), dtype=bool)
+        blob, starts = self.blob, self.starts
+        pos = blob.find(needle)
+        while pos != -1:
+            row = int(np.searchsorted(starts, pos, side="right")) - 1
+            mask[row] = True
+            # 同一行只需命中一次，直接跳到下一行
+            if row + 1 >= len(starts):
+                break
+            pos = blob.find(needle, int(starts[row + 1]))
+        return mask
+
+    def matches(self, rule: TypedRule) -> "np.ndarray":
+        """各行是否满足按类型比较的规则：大小比较走有序索引，相等比较逐行判定"""
+        if not rule.is_range:
+            return np.fromiter((rule(v) for v in self.values), dtype=bool, count=len(self.values))
+        mask = np.zeros(len(self.values), dtype=bool)
+        if rule.kind is None:
+            return mask
+        if self.ordered is None:
+            pairs = [(key, row) for row, value in enumerate(self.values) for key in comparable_keys(value)]
+            keys = np.array([k for k, _ in pairs], dtype=np.float64)
+            rows = np.array([r for _, r in pairs], dtype=np.int64)
+            order = np.argsort(keys, kind="stable")
+            self.ordered = (keys[order], rows[order])
+        keys, rows = self.ordered
+        lo = 0 if rule.low is None else np.searchsorted(keys, rule.low, "left" if rule.low_inclusive else "right")
+        hi = len(keys) if rule.high is None else np.searchsorted(
+            keys, rule.high, "right" if rule.high_inclusive else "left")
+        mask[rows[lo:hi]] = True
+        return mask
+
+    def _contains_indexed(self, needle: str) -> "np.ndarray":
+        index = self.index
+        if index is None:
+            index = self.index = KeywordIndex.build([self.text(row) for row in range(len(self.starts))])
+        mask = np.zeros(len(self.starts), dtype=bool)
+        for row in index.candidates(needle):
+            if needle in self.text(row):
+                mask[row] = True
+        return mask
+
+
+class ColumnarTable:
+    """快照的列式视图，列按需构建（给出 base 时从上一份视图增量构建）"""
+
+    def __init__(self, records: List[Dict], base: Optional["ColumnarTable"] = None):
+        self.records = records
+        self._base = base
+        self._base_rows: Optional[Tuple[List[int], bool]] = None
+        self._columns: Dict[str, TextColumn] = {}
+        self._lock = threading.Lock()
+        if base is not None:
+            # 只保留一代，避免旧快照的记录被链式引用
+            with base._lock:
+                base._base = None
+
+    def _row_mapping(self) -> Tuple[List[int], bool]:
+        """新行在旧视图中的行号（按 record_id 对应），以及旧记录的行号是否都未变化"""
+        if self._base_rows is None:
+            old_rows = {rec.get('record_id'): i for i, rec in enumerate(self._base.records)}
+            base_rows = [old_rows.get(rec.get('record_id'), -1) for rec in self.records]
+            stable = (len(self.records) >= len(self._base.records)
+                      and all(base_rows[i] == i for i in range(len(self._base.records))))
+            self._base_rows = (base_rows, stable)
+        return self._base_rows
+
+    def column(self, name: str) -> TextColumn:
+        with self._lock:
+            column = self._columns.get(name)
+            if column is None:
+                values = [(rec.get('fields') or {}).get(name) for rec in self.records]
+                base_column = self._base._columns.get(name) if self._base is not None else None
+                if base_column is not None:
+                    column = TextColumn.derive(base_column, values, *self._row_mapping())
+                else:
+                    column = TextColumn(values)
+                self._columns[name] = column
+            return column
+
+    def estimate(self, col: str, val: Any, expect: bool) -> Optional[float]:
+        """由列统计估计规则的通过率：判空规则取空值比例，相等比较取 1 / 不同取值数量"""
+        empty_ratio, distinct = self.column(col).statistics()
+        if isinstance(val, TypedRule):
+            if val.is_range:
+                return None
+            rate = (1.0 - empty_ratio) / max(distinct, 1)
+            rate = rate if val.op == "==" else 1.0 - rate
+        elif val == EMPTY:
+            rate = empty_ratio
+        elif val == NOT_EMPTY:
+            rate = 1.0 - empty_ratio
+        else:
+            return None
+        return rate if expect else 1.0 - rate
+
+    def mask(self, compiled: CompiledFilter, scope: Hashable = None) -> "np.ndarray":
+        """筛选条件对应的行掩码（按执行计划的顺序判定，并记录各规则的通过率）"""
+        mask = np.ones(len(self.records), dtype=bool)
+        plan = compiled.plan(scope, self.estimate)
+        if len(plan) > 1:
+            print(f"🧭 筛选顺序：{compiled.describe(plan)}")
+        for i, _ in plan:
+            col, val, expect = compiled.rules[i]
+            column = self.column(col)
+            if isinstance(val, TypedRule):
+                hit = column.matches(val)
+            elif val == EMPTY:
+                hit = column.empty
+            elif val == NOT_EMPTY:
+                hit = ~column.empty
+            else:
+                hit = column.contains(normalize_text(val))
+            passed = hit if expect else ~hit
+            selectivity_stats.observe((scope, compiled.labels[i]), len(passed), int(passed.sum()))
+            mask &= passed
+            if not mask.any():
+                break
+        return mask
+
+    def filter(self, compiled: CompiledFilter, limit: Optional[int] = None, scope: Hashable = None) -> List[Dict]:
+        rows = np.flatnonzero(self.mask(compiled, scope))
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.records[i] for i in rows]
+
+
+_attach_lock = threading.Lock()
+
+
+def filter_snapshot(snapshot: TableSnapshot, compiled: CompiledFilter,
+                    limit: Optional[int] = None, scope: Hashable = None) -> Optional[List[Dict]]:
+    """
+    用列式视图筛选快照中的记录；numpy 不可用、已关闭或快照太小时返回 None，由调用方逐条筛选
+
+    scope 为统计规则通过率所用的键（通常是表格键）
+    """
+    if np is None or COLUMNAR_MIN_ROWS <= 0 or len(snapshot.records) < COLUMNAR_MIN_ROWS:
+        return None
+    with _attach_lock:
+        if snapshot.columnar is None:
+            base = snapshot.columnar_base
+            snapshot.columnar = ColumnarTable(snapshot.records, base if isinstance(base, ColumnarTable) else None)
+            snapshot.columnar_base = None
+    return snapshot.columnar.filter(compiled, limit, scope)
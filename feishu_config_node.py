@@ -15,6 +15,7 @@ class FeishuConfigNode:
         self.table_url = ""
         self.url_app_id = ""
         self.table_id = ""
+        self.local_mirror = False
         self._parsed = False
     
     @classmethod
@@ -36,6 +37,13 @@ class FeishuConfigNode:
                     "multiline": False,
                     "placeholder": "飞书多维表格链接"
                 })
+            },
+            "optional": {
+                "本地镜像": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "启用本地镜像",
+                    "label_off": "直接读取"
+                })
             }
         }
     
@@ -44,11 +52,12 @@ class FeishuConfigNode:
     FUNCTION = "create_config"
     CATEGORY = "飞书工具"
     
-    def create_config(self, 应用ID: str, 应用密钥: str, 表格链接: str) -> tuple:
+    def create_config(self, 应用ID: str, 应用密钥: str, 表格链接: str, 本地镜像: bool = False) -> tuple:
         """创建飞书配置"""
         self.app_id = 应用ID.strip()
         self.app_secret = 应用密钥.strip()
         self.table_url = 表格链接.strip()
+        self.local_mirror = bool(本地镜像)
         
         # 解析表格信息
         self._parse_table_info()
@@ -60,6 +69,7 @@ class FeishuConfigNode:
             "table_url": self.table_url,
             "url_app_id": self.url_app_id,
             "table_id": self.table_id,
+            "local_mirror": self.local_mirror,
             "parsed": self._parsed
         }
         
@@ -113,6 +123,7 @@ class FeishuConfigNode:
             "table_url": self.table_url,
             "url_app_id": self.url_app_id,
             "table_id": self.table_id,
+            "local_mirror": self.local_mirror,
             "parsed": self._parsed
         }
     
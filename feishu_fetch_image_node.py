@@ -10,11 +10,23 @@ import json
 import re
 
 import numpy as np
-import requests
 from PIL import Image
 from urllib.parse import urlparse, parse_qs
 import torch
 
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, first_result, run_blocking
+    from .feishu_client import get_tenant_access_token, http_get
+    from .feishu_filter import condition_columns, display_text, filter_records, node_shard, shard_records, split_column_names
+    from .feishu_profile import attach_profile, explain, lap, record_matched
+    from .feishu_records import fetch_table_records, read_fingerprint, remember_config
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, first_result, run_blocking
+    from feishu_client import get_tenant_access_token, http_get
+    from feishu_filter import condition_columns, display_text, filter_records, node_shard, shard_records, split_column_names
+    from feishu_profile import attach_profile, explain, lap, record_matched
+    from feishu_records import fetch_table_records, read_fingerprint, remember_config
+
 # 尝试导入ComfyUI的folder_paths模块
 try:
     import folder_paths
@@ -59,44 +71,49 @@ class FeishuFetchImageNode:
                     "default": True,
                     "label_on": "显示预览",
                     "label_off": "隐藏预览"
+                }),
+                "执行分析": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "附加执行分析",
+                    "label_off": "关闭"
+                }),
+                "分片序号": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "分片总数": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
                 })
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
             }
         }
 
     RETURN_TYPES = ("IMAGE", "STRING", "STRING", "IMAGE")
     RETURN_NAMES = ("图片", "状态信息", "提取的内容", "使用说明")
-    FUNCTION = "fetch_images"
+    FUNCTION = "fetch_images_async" if ASYNC_NODES_SUPPORTED else "fetch_images"
     CATEGORY = "飞书工具"
     OUTPUT_NODE = True
 
-    def IS_CHANGED(self, **kwargs):
-        # 让节点在每次执行时都刷新，确保预览能正确显示
-        import time
-        return str(time.time())
+    @classmethod
+    def IS_CHANGED(cls, 飞书配置=None, unique_id=None, **kwargs):
+        # 表格内容与其余输入都未变化时复用上次的输出；表格被修改后重新执行
+        return read_fingerprint((cls.__name__, unique_id), 飞书配置, kwargs)
 
     # =============== 基础 API ===============
     def get_access_token(self, app_id: str, app_secret: str) -> Optional[str]:
-        try:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            payload = {"app_id": app_id, "app_secret": app_secret}
-            print(f"🔑 获取访问令牌: app_id={app_id}, app_secret={app_secret[:10]}...")
-            resp = requests.post(url, json=payload, timeout=30)
-            print(f"🔑 响应状态: {resp.status_code}")
-            resp.raise_for_status()
-            data = resp.json()
-            print(f"🔑 响应数据: {json.dumps(data, ensure_ascii=False, indent=2)}")
-            if data.get("code") == 0:
-                token = data.get("tenant_access_token")
-                print(f"🔑 获取到访问令牌: {token[:20]}...")
-                return token
-            else:
-                print(f"🔑 获取访问令牌失败: {data.get('msg', '未知错误')}")
-            return None
-        except Exception as e:
-            print(f"🔑 获取访问令牌异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None
+        token = get_tenant_access_token(app_id, app_secret)
+        if token:
+            print(f"🔑 获取到访问令牌: {token[:20]}...")
+        else:
+            print(f"🔑 获取访问令牌失败: app_id={app_id}")
+        return token
 
     def extract_table_info(self, table_url: str) -> Tuple[Optional[str], Optional[str]]:
         try:
@@ -112,170 +129,49 @@ class FeishuFetchImageNode:
         except Exception:
             return None, None
 
-    def get_table_records(self, access_token: str, app_id: str, table_id: str, page_size: int = 100) -> List[Dict]:
-        """获取表格记录"""
-        records: List[Dict] = []
-        try:
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_id}/tables/{table_id}/records"
-            params: Dict[str, Any] = {"page_size": page_size}
-            headers = {"Authorization": f"Bearer {access_token}"}
-            while True:
-                r = requests.get(url, headers=headers, params=params, timeout=30)
-                if r.status_code != 200:
-                    break
-                j = r.json()
-                if j.get('code') != 0:
-                    break
-                batch = j.get('data', {}).get('items', [])
-                records.extend(batch)
-                page_token = j.get('data', {}).get('page_token')
-                if not page_token:
-                    break
-                params["page_token"] = page_token
-        except Exception:
-            pass
-        return records
+    def get_table_records(self, access_token: str, app_id: str, table_id: str, use_mirror: bool = False,
+                          filter_condition: str = "", field_names: Optional[List[str]] = None) -> List[Dict]:
+        """获取表格记录（同一次执行内与其它节点共享相同的扫描结果；有筛选条件时尽量由服务端筛选）"""
+        return fetch_table_records(access_token, app_id, table_id, use_mirror=use_mirror,
+                                   filter_condition=filter_condition, field_names=field_names) or []
 
     # =============== 筛选 ===============
-    def _is_empty_value(self, v: Any) -> bool:
-        if v is None:
-            return True
-        if isinstance(v, str) and not v.strip():
-            return True
-        if isinstance(v, list) and len(v) == 0:
-            return True
-        if isinstance(v, dict):
-            text_content = v.get('text', '') or v.get('name', '') or str(v)
-            return not text_content or not text_content.strip()
-        return False
-
-    def _value_contains(self, v: Any, needle: str) -> bool:
-        if v is None:
-            return False
-        needle_l = str(needle).lower()
-        if isinstance(v, list):
-            return any(needle_l in str(x).lower() for x in v)
-        if isinstance(v, dict):
-            text_content = v.get('text', '') or v.get('name', '') or str(v)
-            return needle_l in text_content.lower()
-        return needle_l in str(v).lower()
-
-    def _check_condition(self, v: Any, cond: str) -> bool:
-        if cond == "空值":
-            return self._is_empty_value(v)
-        if cond == "非空值":
-            return not self._is_empty_value(v)
-        return self._value_contains(v, cond)
-
     def filter_records(self, records: List[Dict], filter_condition: str) -> List[Dict]:
-        if not filter_condition.strip():
-            return records
-        include_conds: List[Tuple[str, str]] = []
-        exclude_conds: List[Tuple[str, str]] = []
-        for raw in filter_condition.strip().split('\n'):
-            line = raw.strip()
-            if not line:
-                continue
-            m = re.match(r"^\s*([^+\-=\s]+)\s*([+-])\s*(.+?)\s*$", line)
-            if m:
-                col = m.group(1).strip()
-                op = m.group(2)
-                val = m.group(3).strip()
-                (include_conds if op == '+' else exclude_conds).append((col, val))
-                continue
-            if '=' in line:
-                col, val = line.split('=', 1)
-                include_conds.append((col.strip(), val.strip()))
-
-        out: List[Dict] = []
-        for rec in records:
-            fields = rec.get('fields', {})
-            ok_inc = True
-            if include_conds:
-                for col, val in include_conds:
-                    if not self._check_condition(fields.get(col, None), val):
-                        ok_inc = False
-                        break
-            if not ok_inc:
-                continue
-            hit_exc = False
-            for col, val in exclude_conds:
-                if self._check_condition(fields.get(col, None), val):
-                    hit_exc = True
-                    break
-            if not hit_exc:
-                out.append(rec)
-        return out
+        """根据筛选条件过滤记录（共享的已编译筛选器）"""
+        return filter_records(records, filter_condition)
 
     # =============== 下载图片 ===============
     def _download_image_by_file_token(self, access_token: str, file_token: str) -> Optional[Image.Image]:
-        """按文件token下载图片。尝试多种下载方式。"""
+        """按文件token下载图片。多种下载方式依次尝试，前一种失败才尝试下一种。"""
         headers = {"Authorization": f"Bearer {access_token}"}
         
-        # 方案一：GET /open-apis/drive/v1/files/download?file_token=xxx
-        try:
-            url1 = "https://open.feishu.cn/open-apis/drive/v1/files/download"
-            print(f"  🔍 尝试方案1: {url1}")
-            resp = requests.get(url1, headers=headers, params={"file_token": file_token}, timeout=60, allow_redirects=True)
-            print(f"  📡 方案1状态: {resp.status_code}")
-            if resp.status_code == 200 and resp.content:
-                img = Image.open(io.BytesIO(resp.content))
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print(f"  ✅ 方案1成功，尺寸: {img.size}, 模式: {img.mode}")
-                return img
-        except Exception as e:
-            print(f"  ❌ 方案1异常: {str(e)}")
-        
-        # 方案二：GET /open-apis/drive/v1/files/{file_token}/download
-        try:
-            url2 = f"https://open.feishu.cn/open-apis/drive/v1/files/{file_token}/download"
-            print(f"  🔍 尝试方案2: {url2}")
-            resp2 = requests.get(url2, headers=headers, timeout=60, allow_redirects=True)
-            print(f"  📡 方案2状态: {resp2.status_code}")
-            if resp2.status_code == 200 and resp2.content:
-                img = Image.open(io.BytesIO(resp2.content))
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print(f"  ✅ 方案2成功，尺寸: {img.size}, 模式: {img.mode}")
-                return img
-        except Exception as e:
-            print(f"  ❌ 方案2异常: {str(e)}")
-        
-        # 方案三：GET /open-apis/drive/v1/medias/{file_token}/download
-        try:
-            url3 = f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download"
-            print(f"  🔍 尝试方案3: {url3}")
-            resp3 = requests.get(url3, headers=headers, timeout=60, allow_redirects=True)
-            print(f"  📡 方案3状态: {resp3.status_code}")
-            if resp3.status_code == 200 and resp3.content:
-                img = Image.open(io.BytesIO(resp3.content))
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print(f"  ✅ 方案3成功，尺寸: {img.size}, 模式: {img.mode}")
-                return img
-        except Exception as e:
-            print(f"  ❌ 方案3异常: {str(e)}")
-        
-        # 方案四：GET /open-apis/drive/v1/medias/{file_token}/download?extra=...
-        try:
-            url4 = f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download"
-            params = {
-                "extra": json.dumps({"bitablePerm": {"tableId": "tblPlnQ7x0dYGWC8", "rev": 5}})
-            }
-            print(f"  🔍 尝试方案4: {url4} 带参数")
-            resp4 = requests.get(url4, headers=headers, params=params, timeout=60, allow_redirects=True)
-            print(f"  📡 方案4状态: {resp4.status_code}")
-            if resp4.status_code == 200 and resp4.content:
-                img = Image.open(io.BytesIO(resp4.content))
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                print(f"  ✅ 方案4成功，尺寸: {img.size}, 模式: {img.mode}")
-                return img
-        except Exception as e:
-            print(f"  ❌ 方案4异常: {str(e)}")
+        def attempt(label: str, url: str, params: Optional[Dict[str, str]] = None) -> Optional[Image.Image]:
+            try:
+                print(f"  🔍 尝试{label}: {url}")
+                resp = http_get(url, headers=headers, params=params, timeout=60, allow_redirects=True)
+                print(f"  📡 {label}状态: {resp.status_code}")
+                if resp.status_code == 200 and resp.content:
+                    img = Image.open(io.BytesIO(resp.content))
+                    if img.mode != 'RGB':
+                        img = img.convert('RGB')
+                    print(f"  ✅ {label}成功，尺寸: {img.size}, 模式: {img.mode}")
+                    return img
+            except Exception as e:
+                print(f"  ❌ {label}异常: {str(e)}")
+            return None
         
-        return None
+        return first_result([
+            # 方案一：GET /open-apis/drive/v1/files/download?file_token=xxx
+            lambda: attempt("方案1", "https://open.feishu.cn/open-apis/drive/v1/files/download",
+                            {"file_token": file_token}),
+            # 方案二：GET /open-apis/drive/v1/files/{file_token}/download
+            lambda: attempt("方案2", f"https://open.feishu.cn/open-apis/drive/v1/files/{file_token}/download"),
+            # 方案三：GET /open-apis/drive/v1/medias/{file_token}/download
+            lambda: attempt("方案3", f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download"),
+            # 方案四：GET /open-apis/drive/v1/medias/{file_token}/download?extra=...
+            lambda: attempt("方案4", f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download",
+                            {"extra": json.dumps({"bitablePerm": {"tableId": "tblPlnQ7x0dYGWC8", "rev": 5}})}),
+        ])
 
     def _get_tmp_download_urls(self, access_token: str, file_tokens: List[str], table_id: str) -> Dict[str, str]:
         """获取临时下载链接"""
@@ -295,7 +191,7 @@ class FeishuFetchImageNode:
             
             print(f"📥 获取 {len(file_tokens)} 个文件的临时下载链接...")
             
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = http_get(url, headers=headers, params=params, timeout=30)
             
             print(f"📡 临时下载链接请求状态: {response.status_code}")
             print(f"📡 请求URL: {url}")
@@ -335,7 +231,7 @@ class FeishuFetchImageNode:
     def _download_image_by_tmp_url(self, tmp_url: str) -> Optional[Image.Image]:
         """使用临时下载链接下载图片"""
         try:
-            response = requests.get(tmp_url, timeout=60, allow_redirects=True)
+            response = http_get(tmp_url, timeout=60, allow_redirects=True)
             
             if response.status_code == 200 and response.content:
                 img = Image.open(io.BytesIO(response.content))
@@ -401,22 +297,9 @@ class FeishuFetchImageNode:
                 if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
                     line_parts.append(f"获取结果{record_index}&{col_name}***(空)***")
                 elif isinstance(value, list):
-                    # 处理列表类型字段（如富文本、附件等）
-                    if value and isinstance(value[0], dict):
-                        # 富文本或附件字段
-                        if 'text' in value[0]:
-                            text_content = ', '.join([item.get('text', '') for item in value if item.get('text')])
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({text_content})***")
-                        elif 'name' in value[0]:
-                            # 附件字段
-                            names = [item.get('name', '') for item in value if item.get('name')]
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({', '.join(names)})***")
-                        else:
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({str(value)})***")
-                    else:
-                        # 普通列表
-                        content = ', '.join(map(str, value))
-                        line_parts.append(f"获取结果{record_index}&{col_name}***({content})***")
+                    # 处理列表类型字段（富文本取文本，人员/附件取名称）
+                    content = display_text(value) or str(value)
+                    line_parts.append(f"获取结果{record_index}&{col_name}***({content})***")
                 else:
                     # 普通字段
                     line_parts.append(f"获取结果{record_index}&{col_name}***({value})***")
@@ -428,14 +311,30 @@ class FeishuFetchImageNode:
         return f"{line_content}&获取结果{record_index}#"
 
     # =============== 主入口 ===============
-    def fetch_images(self, 飞书配置: dict, 目标列名: str, 筛选条件: str,
-                     图片索引: int, 提取列名: str = "", 列分隔符: str = " | ", 显示预览: bool = True) -> Tuple[torch.Tensor, str, str]:
+    async def fetch_images_async(self, **kwargs):
+        """协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环"""
+        return await run_blocking(self.fetch_images, **kwargs)
+
+    def fetch_images(self, 飞书配置: dict, 目标列名: str, 筛选条件: str, 图片索引: int, 提取列名: str = "",
+                     列分隔符: str = " | ", 显示预览: bool = True, 执行分析: bool = False,
+                     分片序号: int = 1, 分片总数: int = 1, unique_id=None) -> Dict[str, Any]:
+        remember_config((type(self).__name__, unique_id), 飞书配置)
+        # 打开执行分析时，在状态信息末尾附加执行计划与各阶段耗时
+        with explain("FeishuFetchImageNode", 执行分析) as profile:
+            result = self._fetch_images(飞书配置, 目标列名, 筛选条件, 图片索引, 提取列名, 列分隔符, 显示预览,
+                                        分片序号, 分片总数)
+        return attach_profile(result, profile)
+
+    def _fetch_images(self, 飞书配置: dict, 目标列名: str, 筛选条件: str, 图片索引: int,
+                      提取列名: str, 列分隔符: str, 显示预览: bool,
+                      分片序号: int = 1, 分片总数: int = 1) -> Dict[str, Any]:
         # 从配置中获取认证信息
         app_id = 飞书配置.get("app_id", "")
         app_secret = 飞书配置.get("app_secret", "")
         table_url = 飞书配置.get("table_url", "")
         url_app_id = 飞书配置.get("url_app_id", "")
         table_id = 飞书配置.get("table_id", "")
+        use_mirror = 飞书配置.get("local_mirror", False)
         
         # 验证配置
         if not app_id or not app_secret or not table_url:
@@ -446,17 +345,31 @@ class FeishuFetchImageNode:
             usage_image = self._load_usage_image()
             return {"ui": {"images": []}, "result": (self._placeholder_image(), "错误：表格链接格式无效，请检查飞书配置节点", "", usage_image)}
         
+        # 分片总数大于 1 时只处理 record_id 哈希到本分片的记录
+        try:
+            shard = node_shard(分片序号, 分片总数)
+        except ValueError as e:
+            usage_image = self._load_usage_image()
+            return {"ui": {"images": []}, "result": (self._placeholder_image(), f"错误：{str(e)}", "", usage_image)}
+        
         # 1. token
         token = self.get_access_token(app_id, app_secret)
         if not token:
             usage_image = self._load_usage_image()
             return {"ui": {"images": []}, "result": (self._placeholder_image(), "错误：无法获取访问令牌", "", usage_image)}
+        lap("auth")
         # 2. 拉取记录并筛选
-        records = self.get_table_records(token, url_app_id, table_id)
+        # 只拉取用到的列：目标列、提取列与筛选条件中的列
+        needed_fields = [目标列名] + split_column_names(提取列名) + condition_columns(筛选条件)
+        records = self.get_table_records(token, url_app_id, table_id, use_mirror=use_mirror,
+                                         filter_condition=筛选条件, field_names=needed_fields)
+        lap("fetch")
         if records is None or len(records) == 0:
             usage_image = self._load_usage_image()
             return {"ui": {"images": []}, "result": (self._placeholder_image(), "错误：未获取到任何记录", "", usage_image)}
-        filtered = self.filter_records(records, 筛选条件)
+        filtered = shard_records(self.filter_records(records, 筛选条件), shard)
+        lap("filter")
+        record_matched(len(filtered))
         if len(filtered) == 0:
             usage_image = self._load_usage_image()
             return {"ui": {"images": []}, "result": (self._placeholder_image(), "错误：筛选条件未匹配到记录", "", usage_image)}
@@ -486,6 +399,8 @@ class FeishuFetchImageNode:
         # 提取其他列内容
         extracted_content = self._extract_single_record_content(selected_record, 提取列名, 列分隔符)
         
+        lap("locate")
+
         # 5. 获取临时下载链接
         file_token = selected_record['file_token']
         tmp_urls = self._get_tmp_download_urls(token, [file_token], table_id)
@@ -501,6 +416,7 @@ class FeishuFetchImageNode:
         # 如果临时链接失败，尝试直接下载
         if img == None:
             img = self._download_image_by_file_token(token, file_token)
+        lap("download")
         
         if img is None:
             usage_image = self._load_usage_image()
@@ -508,6 +424,7 @@ class FeishuFetchImageNode:
         
         # 7. 转换为tensor，保持原始尺寸
         image_tensor = self._to_single_image(img)
+        lap("convert")
         
         # 8. 加载使用说明图片
         usage_image = self._load_usage_image()
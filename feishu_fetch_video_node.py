@@ -6,6 +6,7 @@
 """
 
 from typing import Any, Dict, List, Optional, Tuple
+import functools
 import io
 import json
 import os
@@ -13,7 +14,18 @@ import re
 import tempfile
 from urllib.parse import urlparse, parse_qs
 
-import requests
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, first_result, run_blocking
+    from .feishu_client import get_tenant_access_token, http_get
+    from .feishu_filter import condition_columns, display_text, filter_records, node_shard, shard_records, split_column_names
+    from .feishu_profile import attach_profile, explain, lap, record_matched
+    from .feishu_records import fetch_table_records, read_fingerprint, remember_config
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, first_result, run_blocking
+    from feishu_client import get_tenant_access_token, http_get
+    from feishu_filter import condition_columns, display_text, filter_records, node_shard, shard_records, split_column_names
+    from feishu_profile import attach_profile, explain, lap, record_matched
+    from feishu_records import fetch_table_records, read_fingerprint, remember_config
 
 
 # 依赖按需导入（用于视频解码预览）
@@ -68,29 +80,44 @@ class FeishuFetchVideoNode:
                     "multiline": True,
                     "default": " | ",
                     "placeholder": "自定义列分隔符，默认为 ' | '。例如：\n- 使用逗号：, \n- 使用分号：; \n- 使用制表符：\\t\n- 使用换行：\\n\n- 使用自定义符号：→\n- 使用多个字符：---\n- 留空则使用默认分隔符"
+                }),
+                "执行分析": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "附加执行分析",
+                    "label_off": "关闭"
+                }),
+                "分片序号": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "分片总数": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
                 })
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
             }
         }
 
     RETURN_TYPES = ("VIDEO", "STRING", "STRING", "IMAGE")
     RETURN_NAMES = ("视频", "状态信息", "提取的内容", "使用说明")
-    FUNCTION = "fetch_videos"
+    FUNCTION = "fetch_videos_async" if ASYNC_NODES_SUPPORTED else "fetch_videos"
     CATEGORY = "飞书工具"
     OUTPUT_NODE = True
 
+    @classmethod
+    def IS_CHANGED(cls, 飞书配置=None, unique_id=None, **kwargs):
+        # 表格内容与其余输入都未变化时复用上次的输出；表格被修改后重新执行
+        return read_fingerprint((cls.__name__, unique_id), 飞书配置, kwargs)
+
     # =============== 基础 API ===============
     def get_access_token(self, app_id: str, app_secret: str) -> Optional[str]:
-        try:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            payload = {"app_id": app_id, "app_secret": app_secret}
-            resp = requests.post(url, json=payload, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-            if data.get("code") == 0:
-                return data.get("tenant_access_token")
-            return None
-        except Exception:
-            return None
+        return get_tenant_access_token(app_id, app_secret)
 
     def extract_table_info(self, table_url: str) -> Tuple[Optional[str], Optional[str]]:
         try:
@@ -106,99 +133,16 @@ class FeishuFetchVideoNode:
         except Exception:
             return None, None
 
-    def get_table_records(self, access_token: str, app_id: str, table_id: str, page_size: int = 100) -> List[Dict]:
-        records: List[Dict] = []
-        try:
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_id}/tables/{table_id}/records"
-            params: Dict[str, Any] = {"page_size": page_size}
-            headers = {"Authorization": f"Bearer {access_token}"}
-            while True:
-                r = requests.get(url, headers=headers, params=params, timeout=30)
-                if r.status_code != 200:
-                    break
-                j = r.json()
-                if j.get('code') != 0:
-                    break
-                batch = j.get('data', {}).get('items', [])
-                records.extend(batch)
-                page_token = j.get('data', {}).get('page_token')
-                if not page_token:
-                    break
-                params["page_token"] = page_token
-        except Exception:
-            pass
-        return records
+    def get_table_records(self, access_token: str, app_id: str, table_id: str, use_mirror: bool = False,
+                          filter_condition: str = "", field_names: Optional[List[str]] = None) -> List[Dict]:
+        """获取表格记录（同一次执行内与其它节点共享相同的扫描结果；有筛选条件时尽量由服务端筛选）"""
+        return fetch_table_records(access_token, app_id, table_id, use_mirror=use_mirror,
+                                   filter_condition=filter_condition, field_names=field_names) or []
 
     # =============== 筛选 ===============
-    def _is_empty_value(self, v: Any) -> bool:
-        if v is None:
-            return True
-        if isinstance(v, str) and not v.strip():
-            return True
-        if isinstance(v, list) and len(v) == 0:
-            return True
-        if isinstance(v, dict):
-            text_content = v.get('text', '') or v.get('name', '') or str(v)
-            return not text_content or not text_content.strip()
-        return False
-
-    def _value_contains(self, v: Any, needle: str) -> bool:
-        if v is None:
-            return False
-        needle_l = str(needle).lower()
-        if isinstance(v, list):
-            return any(needle_l in str(x).lower() for x in v)
-        if isinstance(v, dict):
-            text_content = v.get('text', '') or v.get('name', '') or str(v)
-            return needle_l in text_content.lower()
-        return needle_l in str(v).lower()
-
-    def _check_condition(self, v: Any, cond: str) -> bool:
-        if cond == "空值":
-            return self._is_empty_value(v)
-        if cond == "非空值":
-            return not self._is_empty_value(v)
-        return self._value_contains(v, cond)
-
     def filter_records(self, records: List[Dict], filter_condition: str) -> List[Dict]:
-        if not filter_condition.strip():
-            return records
-        include_conds: List[Tuple[str, str]] = []
-        exclude_conds: List[Tuple[str, str]] = []
-        for raw in filter_condition.strip().split('\n'):
-            line = raw.strip()
-            if not line:
-                continue
-            m = re.match(r"^\s*([^+\-=\s]+)\s*([+-])\s*(.+?)\s*$", line)
-            if m:
-                col = m.group(1).strip()
-                op = m.group(2)
-                val = m.group(3).strip()
-                (include_conds if op == '+' else exclude_conds).append((col, val))
-                continue
-            if '=' in line:
-                col, val = line.split('=', 1)
-                include_conds.append((col.strip(), val.strip()))
-
-        out: List[Dict] = []
-        for rec in records:
-            fields = rec.get('fields', {})
-            ok_inc = True
-            if include_conds:
-                for col, val in include_conds:
-                    if not self._check_condition(fields.get(col, None), val):
-                        ok_inc = False
-                        break
-            if not ok_inc:
-                continue
-            hit_exc = False
-            for col, val in exclude_conds:
-                if self._check_condition(fields.get(col, None), val):
-                    hit_exc = True
-                    break
-            if not hit_exc:
-                out.append(rec)
-        return out
+        """根据筛选条件过滤记录（共享的已编译筛选器）"""
+        return filter_records(records, filter_condition)
 
     # =============== 下载视频 ===============
     def _get_tmp_download_urls(self, access_token: str, file_tokens: List[str], table_id: str) -> Dict[str, str]:
@@ -211,7 +155,7 @@ class FeishuFetchVideoNode:
                 "extra": json.dumps({"bitablePerm": {"tableId": table_id, "rev": 5}})
             }
             headers = {"Authorization": f"Bearer {access_token}"}
-            response = requests.get(url, headers=headers, params=params, timeout=30)
+            response = http_get(url, headers=headers, params=params, timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("code") == 0:
@@ -229,7 +173,7 @@ class FeishuFetchVideoNode:
 
     def _download_file_by_tmp_url(self, tmp_url: str) -> Optional[bytes]:
         try:
-            response = requests.get(tmp_url, timeout=120, allow_redirects=True)
+            response = http_get(tmp_url, timeout=120, allow_redirects=True)
             if response.status_code == 200 and response.content:
                 return response.content
         except Exception:
@@ -238,20 +182,24 @@ class FeishuFetchVideoNode:
 
     def _download_file_by_file_token(self, access_token: str, file_token: str) -> Optional[bytes]:
         headers = {"Authorization": f"Bearer {access_token}"}
-        # 依次尝试三种路径
+        # 三种候选下载路径
         urls = [
             ("https://open.feishu.cn/open-apis/drive/v1/files/download", {"file_token": file_token}),
             (f"https://open.feishu.cn/open-apis/drive/v1/files/{file_token}/download", None),
             (f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download", None),
         ]
-        for base, params in urls:
+
+        def attempt(base: str, params: Optional[Dict[str, str]]) -> Optional[bytes]:
             try:
-                resp = requests.get(base, headers=headers, params=params, timeout=120, allow_redirects=True)
+                resp = http_get(base, headers=headers, params=params, timeout=120, allow_redirects=True)
                 if resp.status_code == 200 and resp.content:
                     return resp.content
             except Exception:
-                continue
-        return None
+                pass
+            return None
+
+        # 各路径依次尝试（不同时下载多份完整视频），取第一个成功的结果
+        return first_result([functools.partial(attempt, base, params) for base, params in urls])
 
     def _gather_video_tokens(self, records: List[Dict], target_column: str) -> List[Dict]:
         video_exts = ('.mp4', '.mov', '.avi', '.mkv', '.webm', '.gif', '.webp')
@@ -527,22 +475,9 @@ class FeishuFetchVideoNode:
                 if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
                     line_parts.append(f"获取结果{record_index}&{col_name}***(空)***")
                 elif isinstance(value, list):
-                    # 处理列表类型字段（如富文本、附件等）
-                    if value and isinstance(value[0], dict):
-                        # 富文本或附件字段
-                        if 'text' in value[0]:
-                            text_content = ', '.join([item.get('text', '') for item in value if item.get('text')])
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({text_content})***")
-                        elif 'name' in value[0]:
-                            # 附件字段
-                            names = [item.get('name', '') for item in value if item.get('name')]
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({', '.join(names)})***")
-                        else:
-                            line_parts.append(f"获取结果{record_index}&{col_name}***({str(value)})***")
-                    else:
-                        # 普通列表
-                        content = ', '.join(map(str, value))
-                        line_parts.append(f"获取结果{record_index}&{col_name}***({content})***")
+                    # 处理列表类型字段（富文本取文本，人员/附件取名称）
+                    content = display_text(value) or str(value)
+                    line_parts.append(f"获取结果{record_index}&{col_name}***({content})***")
                 else:
                     # 普通字段
                     line_parts.append(f"获取结果{record_index}&{col_name}***({value})***")
@@ -554,30 +489,57 @@ class FeishuFetchVideoNode:
         return f"{line_content}&获取结果{record_index}#"
 
     # =============== 主入口 ===============
-    def fetch_videos(self, 飞书配置: dict, 目标列名: str, 筛选条件: str,
-                     视频索引: int, 提取列名: str = "", 列分隔符: str = " | ") -> Tuple[Any, str, str]:
+    async def fetch_videos_async(self, **kwargs):
+        """协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环"""
+        return await run_blocking(self.fetch_videos, **kwargs)
+
+    def fetch_videos(self, 飞书配置: dict, 目标列名: str, 筛选条件: str, 视频索引: int,
+                     提取列名: str = "", 列分隔符: str = " | ", 执行分析: bool = False,
+                     分片序号: int = 1, 分片总数: int = 1, unique_id=None) -> Tuple[Any, str, str]:
+        remember_config((type(self).__name__, unique_id), 飞书配置)
+        # 打开执行分析时，在状态信息末尾附加执行计划与各阶段耗时
+        with explain("FeishuFetchVideoNode", 执行分析) as profile:
+            result = self._fetch_videos(飞书配置, 目标列名, 筛选条件, 视频索引, 提取列名, 列分隔符,
+                                        分片序号, 分片总数)
+        return attach_profile(result, profile)
+
+    def _fetch_videos(self, 飞书配置: dict, 目标列名: str, 筛选条件: str, 视频索引: int,
+                      提取列名: str, 列分隔符: str, 分片序号: int = 1, 分片总数: int = 1) -> Tuple[Any, str, str]:
         # 配置
         app_id = 飞书配置.get("app_id", "")
         app_secret = 飞书配置.get("app_secret", "")
         table_url = 飞书配置.get("table_url", "")
         url_app_id = 飞书配置.get("url_app_id", "")
         table_id = 飞书配置.get("table_id", "")
+        use_mirror = 飞书配置.get("local_mirror", False)
 
         if not app_id or not app_secret or not table_url:
             return None, "错误：配置信息不完整，请检查飞书配置节点", ""
         if not url_app_id or not table_id:
             return None, "错误：表格链接格式无效，请检查飞书配置节点", ""
+        # 分片总数大于 1 时只处理 record_id 哈希到本分片的记录
+        try:
+            shard = node_shard(分片序号, 分片总数)
+        except ValueError as e:
+            return None, f"错误：{str(e)}", ""
 
         # 1. token
         token = self.get_access_token(app_id, app_secret)
         if not token:
             return None, "错误：无法获取访问令牌", ""
+        lap("auth")
 
         # 2. 拉取记录并筛选
-        records = self.get_table_records(token, url_app_id, table_id)
+        # 只拉取用到的列：目标列、提取列与筛选条件中的列
+        needed_fields = [目标列名] + split_column_names(提取列名) + condition_columns(筛选条件)
+        records = self.get_table_records(token, url_app_id, table_id, use_mirror=use_mirror,
+                                         filter_condition=筛选条件, field_names=needed_fields)
+        lap("fetch")
         if not records:
             return None, "错误：未获取到任何记录", ""
-        filtered = self.filter_records(records, 筛选条件)
+        filtered = shard_records(self.filter_records(records, 筛选条件), shard)
+        lap("filter")
+        record_matched(len(filtered))
         if not filtered:
             return None, "错误：筛选条件未匹配到记录", ""
 
@@ -600,6 +562,7 @@ class FeishuFetchVideoNode:
         
         # 额外信息
         extracted_content = self._extract_single_record_content(selected, 提取列名, 列分隔符)
+        lap("locate")
 
         # 5. 获取临时下载链接并下载
         file_token = selected['file_token']
@@ -609,6 +572,7 @@ class FeishuFetchVideoNode:
             data = self._download_file_by_tmp_url(tmp_urls[file_token])
         if data is None:
             data = self._download_file_by_file_token(token, file_token)
+        lap("download")
         if data is None:
             return None, "错误：视频下载失败", extracted_content
 
@@ -617,6 +581,7 @@ class FeishuFetchVideoNode:
 
         # 7. 构造 VIDEO 对象
         video_obj = self._VideoFromPath(local_path)
+        lap("convert")
 
         # 8. 组织状态信息（尽量提供可读信息）
         size_mb = len(data) / (1024 * 1024)
@@ -0,0 +1,663 @@
+"""
+飞书节点筛选条件
+解析「列名+关键词 / 列名-关键词 / 空值 / 非空值」规则，以及按类型比较的
+「列名>值 / >= / < / <= / 介于 a~b / == / !=」规则，编译为本地判定函数（按条件文本缓存），
+并把服务端能等价表达的规则编译为多维表格 records/search 接口的 filter 对象
+"""
+
+import datetime
+import functools
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# (列名, 关键词或「空值」/「非空值」)
+FilterRule = Tuple[str, str]
+
+_RULE_RE = re.compile(r"^\s*([^+\-=\s]+)\s*([+-])\s*(.+?)\s*$")
+_TYPED_RE = re.compile(r"^\s*([^+\-=<>!\s]+)\s*(>=|<=|==|!=|>|<|介于)\s*(.+?)\s*$")
+# 「介于」两端的分隔符
+_RANGE_SPLIT_RE = re.compile(r"\s*(?:~|～|至|到)\s*")
+# 列名列表的分隔符：英文逗号, 中文逗号，顿号、英文/中文分号，以及换行/回车
+_COLUMN_SPLIT_RE = re.compile(r"[\,\uFF0C\u3001;\uFF1B\n\r]+")
+
+EMPTY = "空值"
+NOT_EMPTY = "非空值"
+
+# 缓存的已编译筛选条件数量
+FILTER_CACHE_SIZE = 256
+
+# 每次筛选时完整判定全部规则、用于统计命中率的记录数
+SELECTIVITY_SAMPLE = 256
+# 命中率统计的条目上限，以及给出估计所需的最少样本数
+_STATS_MAX_ENTRIES = 4096
+_STATS_MIN_SAMPLES = 16
+# 没有统计时假定的规则通过率
+_DEFAULT_PASS_RATE = 0.5
+# 单条规则的相对判定代价：判空 < 按类型比较 < 关键词匹配
+_COST_EMPTY, _COST_TYPED, _COST_KEYWORD = 1.0, 2.0, 3.0
+
+# 服务端 contains/doesNotContain 为子串匹配的字段类型：多行文本、电话号码
+_SUBSTRING_TYPES = {1, 13}
+# 服务端判空与本地判空一致的字段类型
+_EMPTY_CHECK_TYPES = {1, 2, 3, 4, 5, 11, 13, 15, 17, 18, 21}
+# 文本类字段的纯空白内容在本地视为空值，服务端不是，因此只下推「非空」
+_STRING_TYPES = {1, 13}
+# 按类型比较时可下推的字段类型：数字；日期、创建时间、最后更新时间；复选框；单选、多选
+_NUMBER_TYPES = {2}
+_DATE_TYPES = {5, 1001, 1002}
+_CHECKBOX_TYPE = 7
+_SINGLE_SELECT_TYPE = 3
+_MULTI_SELECT_TYPE = 4
+
+_DAY_MS = 24 * 3600 * 1000
+_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M",
+                 "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S")
+_RELATIVE_DAYS = {"今天": 0, "昨天": -1, "明天": 1}
+# 复选框取值
+_BOOL_WORDS = {"是": True, "true": True, "勾选": True, "已勾选": True,
+               "否": False, "false": False, "未勾选": False}
+
+
+def parse_number(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(text: str) -> Optional[float]:
+    """解析日期（本地时区），返回毫秒时间戳；今天/昨天/明天取当天零点"""
+    text = text.strip()
+    if text in _RELATIVE_DAYS:
+        day = datetime.date.today() + datetime.timedelta(days=_RELATIVE_DAYS[text])
+        return time.mktime(day.timetuple()) * 1000
+    for fmt in _DATE_FORMATS:
+        try:
+            return time.mktime(datetime.datetime.strptime(text, fmt).timetuple()) * 1000
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_scalar(text: str) -> Tuple[Optional[float], Optional[str]]:
+    """比较值：数字或日期（毫秒时间戳），返回 (值, "number"/"date")，无法解析时为 (None, None)"""
+    number = parse_number(text)
+    if number is not None:
+        return number, "number"
+    date = parse_date(text)
+    if date is not None:
+        return date, "date"
+    return None, None
+
+
+def comparable_keys(value: Any) -> List[float]:
+    """字段值中可比较大小的数值（数字、日期时间戳、数字文本；公式取其结果；复选框不参与）"""
+    if value is None or isinstance(value, bool):
+        return []
+    if isinstance(value, (int, float)):
+        return [float(value)]
+    if isinstance(value, str):
+        number = parse_number(value.strip())
+        return [] if number is None else [number]
+    if isinstance(value, list):
+        return [key for item in value for key in comparable_keys(item)]
+    if isinstance(value, dict) and 'value' in value:
+        return comparable_keys(value['value'])
+    return []
+
+
+class TypedRule:
+    """
+    按类型比较的规则
+
+    >、>=、<、<=、介于（两端包含）按数值比较，日期取当天零点的时间戳；
+    == / != 对复选框比较是/否，对数字按数值比较，对日期按同一天比较，其它字段（选项、人员等）按名称完全相等比较
+    """
+
+    __slots__ = ("column", "op", "operand", "kind", "low", "low_inclusive", "high", "high_inclusive",
+                 "flag", "number", "day")
+
+    def __init__(self, column: str, op: str, operand: str):
+        self.column = column
+        self.op = op
+        self.operand = operand
+        self.kind: Optional[str] = None
+        self.low = self.high = None
+        self.low_inclusive = self.high_inclusive = True
+        self.flag = self.number = self.day = None
+
+        if op == "介于":
+            parts = _RANGE_SPLIT_RE.split(operand, 1)
+            if len(parts) == 2:
+                (self.low, low_kind), (self.high, high_kind) = _parse_scalar(parts[0]), _parse_scalar(parts[1])
+                if self.low is not None and self.high is not None:
+                    self.kind = "date" if "date" in (low_kind, high_kind) else "number"
+        elif op in (">", ">="):
+            self.low, self.kind = _parse_scalar(operand)
+            self.low_inclusive = op == ">="
+        elif op in ("<", "<="):
+            self.high, self.kind = _parse_scalar(operand)
+            self.high_inclusive = op == "<="
+        else:
+            self.flag = _BOOL_WORDS.get(operand.lower())
+            self.number, self.kind = _parse_scalar(operand)
+            if self.kind == "date":
+                self.day, self.number = self.number, None
+
+    @property
+    def is_range(self) -> bool:
+        return self.op not in ("==", "!=")
+
+    def in_range(self, key: float) -> bool:
+        if self.low is not None and (key < self.low or (key == self.low and not self.low_inclusive)):
+            return False
+        if self.high is not None and (key > self.high or (key == self.high and not self.high_inclusive)):
+            return False
+        return True
+
+    def equals(self, value: Any) -> bool:
+        if self.flag is not None and (value is None or isinstance(value, bool)):
+            return bool(value) is self.flag
+        if value is None or isinstance(value, bool):
+            return False
+        if isinstance(value, (int, float)):
+            if self.day is not None:
+                return self.day <= value < self.day + _DAY_MS
+            return self.number is not None and float(value) == self.number
+        if isinstance(value, str):
+            return value.strip() == self.operand
+        if isinstance(value, list):
+            return any(self.equals(item) for item in value)
+        if isinstance(value, dict):
+            if 'value' in value:
+                return self.equals(value['value'])
+            return _dict_text(value).strip() == self.operand
+        return str(value) == self.operand
+
+    def __call__(self, value: Any) -> bool:
+        if self.op == "==":
+            return self.equals(value)
+        if self.op == "!=":
+            return not self.equals(value)
+        if self.kind is None:
+            # 无法解析的比较值：不匹配任何记录
+            return False
+        return any(self.in_range(key) for key in comparable_keys(value))
+
+
+def parse_conditions(filter_condition: str) -> Tuple[List[FilterRule], List[FilterRule], List[TypedRule]]:
+    """解析筛选条件（按行一条规则），返回 (包含规则, 排除规则, 按类型比较的规则)"""
+    include: List[FilterRule] = []
+    exclude: List[FilterRule] = []
+    typed: List[TypedRule] = []
+    for raw_line in (filter_condition or "").strip().split('\n'):
+        line = raw_line.strip()
+        if not line:
+            continue
+        # 按类型比较：列名>值、列名==值、列名介于a~b 等
+        m = _TYPED_RE.match(line)
+        if m:
+            typed.append(TypedRule(m.group(1), m.group(2), m.group(3)))
+            continue
+        # 解析 + / - 语法
+        m = _RULE_RE.match(line)
+        if m:
+            rule = (m.group(1).strip(), m.group(3).strip())
+            (include if m.group(2) == '+' else exclude).append(rule)
+            continue
+        # 兼容符号前置的写法：+列名+关键词 / -列名-关键词
+        if line[0] in '+-':
+            col, sep, val = line[1:].partition(line[0])
+            if sep and col.strip() and val.strip():
+                (include if line[0] == '+' else exclude).append((col.strip(), val.strip()))
+            continue
+        # 兼容旧格式：列名=值
+        if '=' in line:
+            col, val = line.split('=', 1)
+            include.append((col.strip(), val.strip()))
+    return include, exclude, typed
+
+
+def parse_filter_condition(filter_condition: str) -> Tuple[List[FilterRule], List[FilterRule]]:
+    """解析筛选条件中的关键词与空值规则，返回 (包含规则, 排除规则)"""
+    include, exclude, _ = parse_conditions(filter_condition)
+    return include, exclude
+
+
+def split_column_names(columns: str) -> List[str]:
+    """解析逗号/顿号/分号/换行分隔的列名列表"""
+    return [col.strip() for col in _COLUMN_SPLIT_RE.split((columns or "").strip()) if col.strip()]
+
+
+def condition_columns(filter_condition: str) -> List[str]:
+    """
+    筛选条件中引用的列名（用于决定需要拉取的字段）
+
+    按宽松的方式解析：去掉行首的 +/- 后，取第一个 +、-、=、<、>、!、「介于」之前的部分，兼容各节点的写法
+    """
+    columns: List[str] = []
+    for raw_line in (filter_condition or "").strip().split('\n'):
+        line = raw_line.strip().lstrip('+-').strip()
+        col = re.split(r"[+\-=<>!]|介于", line, 1)[0].strip()
+        if col and col not in columns:
+            columns.append(col)
+    return columns
+
+
+# 对象中可读文本所在的键（value 为公式、查找引用的结果）
+_DICT_TEXT_KEYS = ('text', 'name', 'full_address', 'value')
+
+
+def _dict_text(value: Dict) -> str:
+    # 链接、人员、附件、地理位置等对象取 text / name / full_address；公式、查找引用取其中的 value
+    for key in _DICT_TEXT_KEYS[:3]:
+        if value.get(key):
+            return str(value[key])
+    if 'value' in value:
+        return display_text(value['value'])
+    return ''
+
+
+def display_text(value: Any, sep: str = ", ") -> str:
+    """
+    字段值的可读文本：富文本各段直接拼接，人员/附件/选项等列表各项用 sep 连接，对象取其文本或名称
+    """
+    if value.__class__ is str:
+        return value
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        if value and all(isinstance(v, dict) and 'type' in v and 'text' in v for v in value):
+            # 富文本分段
+            return ''.join(str(v['text']) for v in value)
+        parts = (_dict_text(v) if isinstance(v, dict) else str(v) for v in value)
+        return sep.join(p for p in parts if p)
+    if isinstance(value, dict):
+        return _dict_text(value)
+    return str(value)
+
+
+def normalize_text(text: str) -> str:
+    """匹配用的规范化文本：NFKC 规范化（全角/半角等统一）后 casefold"""
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def searchable_text(value: Any, sep: str = "\x00") -> str:
+    """关键词匹配所比对的规范化文本（列表各项以 sep 分隔，关键词不会跨项匹配）"""
+    if value.__class__ is str:
+        return normalize_text(value)
+    return normalize_text(display_text(value, sep))
+
+
+def is_empty_value(value: Any) -> bool:
+    """判断字段值是否为空"""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip()
+    if isinstance(value, list):
+        return len(value) == 0
+    if isinstance(value, dict):
+        if _dict_text(value).strip():
+            return False
+        # 只有链接、id 等没有可读文本的对象仍然有值；带文本键的对象在文本键全部为空时才算空
+        text_keys = [key for key in _DICT_TEXT_KEYS if key in value]
+        if text_keys:
+            return all(is_empty_value(value[key]) for key in text_keys)
+        return not value
+    return False
+
+
+def _keyword_matcher(needle: str) -> Callable[[Any], bool]:
+    """生成规范化后的子串匹配函数（关键词只规范化一次）"""
+    needle_n = normalize_text(needle)
+
+    def match(value: Any) -> bool:
+        if value is None:
+            return False
+        return needle_n in searchable_text(value)
+
+    return match
+
+
+def _not_empty(value: Any) -> bool:
+    return not is_empty_value(value)
+
+
+def _value_matcher(condition: str) -> Callable[[Any], bool]:
+    if condition == EMPTY:
+        return is_empty_value
+    if condition == NOT_EMPTY:
+        return _not_empty
+    return _keyword_matcher(condition)
+
+
+def check_condition(value: Any, condition: str) -> bool:
+    """检查字段值是否满足单条规则"""
+    return _value_matcher(condition)(value)
+
+
+class SelectivityStats:
+    """各规则在各表格上观察到的通过率（线程安全，条目数有上限）"""
+
+    def __init__(self, max_entries: int = _STATS_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, key: Hashable, evaluated: int, passed: int) -> None:
+        if evaluated <= 0:
+            return
+        with self._lock:
+            counts = self._entries.get(key)
+            if counts is None:
+                counts = self._entries[key] = [0, 0]
+            counts[0] += evaluated
+            counts[1] += passed
+            if counts[0] > 100000:
+                # 逐步淡化旧的观察，适应数据变化
+                counts[0] //= 2
+                counts[1] //= 2
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pass_rate(self, key: Hashable) -> Optional[float]:
+        with self._lock:
+            counts = self._entries.get(key)
+        if counts is None or counts[0] < _STATS_MIN_SAMPLES:
+            return None
+        return counts[1] / counts[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局共享实例
+selectivity_stats = SelectivityStats()
+
+# 由列统计给出规则通过率的估计：(列名, 规则, 期望结果) -> 通过率或 None
+Estimator = Callable[[str, Any, bool], Optional[float]]
+
+
+class PlannedMatcher:
+    """
+    按执行计划顺序判定记录的函数对象
+
+    前 SELECTIVITY_SAMPLE 条记录完整判定全部规则并统计各自的通过率，用于之后的排序
+    """
+
+    __slots__ = ("keys", "checks", "plan", "_sampled", "_pending", "_passed")
+
+    def __init__(self, compiled: "CompiledFilter", scope: Hashable, order: List[int], plan: str):
+        self.keys = [(scope, compiled.labels[i]) for i in order]
+        self.checks = [compiled._checks[i] for i in order]
+        self.plan = plan
+        self._sampled = 0
+        self._pending = 0
+        self._passed = [0] * len(order)
+
+    def __call__(self, record: Dict) -> bool:
+        get = (record.get('fields') or {}).get
+        if self._sampled < SELECTIVITY_SAMPLE:
+            self._sampled += 1
+            self._pending += 1
+            ok = True
+            for n, (col, matcher, expect) in enumerate(self.checks):
+                if matcher(get(col)) is expect:
+                    self._passed[n] += 1
+                else:
+                    ok = False
+            if self._sampled == SELECTIVITY_SAMPLE:
+                self.flush()
+            return ok
+        for col, matcher, expect in self.checks:
+            if matcher(get(col)) is not expect:
+                return False
+        return True
+
+    def flush(self) -> None:
+        """把已采样的通过率写入统计（可重复调用）"""
+        if not self._pending:
+            return
+        for key, passed in zip(self.keys, self._passed):
+            selectivity_stats.observe(key, self._pending, passed)
+        self._pending = 0
+        self._passed = [0] * len(self.checks)
+
+
+def rule_label(col: str, val: Any, expect: bool) -> str:
+    """规则的可读写法（也用作命中率统计的键）"""
+    if isinstance(val, TypedRule):
+        return f"{col}{val.op}{val.operand}"
+    return f"{col}{'+' if expect else '-'}{val}"
+
+
+class CompiledFilter:
+    """
+    编译后的筛选条件：包含规则、按类型比较的规则全部命中、排除规则均未命中的记录通过（缺失的字段视为空值）
+
+    默认顺序：判空规则最先判定，其次是按类型比较的规则，再按关键词从长到短判定，尽早短路。
+    plan() 会结合观察到的通过率和列统计，按「代价 / 淘汰概率」从小到大重新排序
+    """
+
+    __slots__ = ("include", "exclude", "typed", "columns", "rules", "labels", "_costs", "_checks")
+
+    def __init__(self, include: List[FilterRule], exclude: List[FilterRule], typed: List[TypedRule] = ()):
+        self.include = include
+        self.exclude = exclude
+        self.typed = list(typed)
+        self.columns = list(dict.fromkeys([col for col, _ in include + exclude] + [r.column for r in self.typed]))
+
+        checks = [(col, val, True) for col, val in include] + [(col, val, False) for col, val in exclude]
+        checks.sort(key=lambda c: (c[1] not in (EMPTY, NOT_EMPTY), -len(c[1])))
+        empties = [c for c in checks if c[1] in (EMPTY, NOT_EMPTY)]
+        checks = empties + [(r.column, r, True) for r in self.typed] + checks[len(empties):]
+        # (列名, 关键词/「空值」/「非空值」或 TypedRule, 期望结果)，按判定顺序排列，供列式筛选使用
+        self.rules = tuple(checks)
+        self.labels = tuple(rule_label(col, val, expect) for col, val, expect in checks)
+        self._costs = tuple(_COST_TYPED if isinstance(val, TypedRule)
+                            else _COST_EMPTY if val in (EMPTY, NOT_EMPTY) else _COST_KEYWORD
+                            for _, val, _ in checks)
+        self._checks = tuple((col, val if isinstance(val, TypedRule) else _value_matcher(val), expect)
+                             for col, val, expect in checks)
+
+    def __bool__(self) -> bool:
+        return bool(self._checks)
+
+    def __call__(self, record: Dict) -> bool:
+        get = (record.get('fields') or {}).get
+        for col, matcher, expect in self._checks:
+            if matcher(get(col)) is not expect:
+                return False
+        return True
+
+    def filter(self, records: List[Dict], scope: Hashable = None) -> List[Dict]:
+        if not self._checks:
+            return records
+        if len(self._checks) == 1:
+            return [rec for rec in records if self(rec)]
+        accept = self.matcher(scope)
+        matched = [rec for rec in records if accept(rec)]
+        accept.flush()
+        return matched
+
+    def plan(self, scope: Hashable = None, estimate: Optional[Estimator] = None) -> List[Tuple[int, float]]:
+        """
+        执行计划：[(规则序号, 估计通过率)]，按 代价 / (1 - 通过率) 从小到大排列
+
+        通过率优先取 estimate 给出的估计（来自快照的列统计），其次取 scope（表格）上观察到的通过率
+        """
+        planned = []
+        for i, (col, val, expect) in enumerate(self.rules):
+            rate = estimate(col, val, expect) if estimate is not None else None
+            if rate is None:
+                rate = selectivity_stats.pass_rate((scope, self.labels[i]))
+            planned.append((i, _DEFAULT_PASS_RATE if rate is None else rate))
+        planned.sort(key=lambda p: (self._costs[p[0]] / max(1.0 - p[1], 1e-3), p[0]))
+        return planned
+
+    def describe(self, plan: List[Tuple[int, float]]) -> str:
+        """执行计划的可读描述，如「状态==完成(8%) → 标题+猫(35%)」"""
+        return " → ".join(f"{self.labels[i]}({rate:.0%})" for i, rate in plan)
+
+    def matcher(self, scope: Hashable = None, estimate: Optional[Estimator] = None) -> PlannedMatcher:
+        """按执行计划排序的判定函数"""
+        plan = self.plan(scope, estimate)
+        return PlannedMatcher(self, scope, [i for i, _ in plan], self.describe(plan))
+
+
+@functools.lru_cache(maxsize=FILTER_CACHE_SIZE)
+def compile_filter(filter_condition: str) -> CompiledFilter:
+    """编译筛选条件（相同的条件文本只编译一次）"""
+    return CompiledFilter(*parse_conditions(filter_condition))
+
+
+def filter_records(records: List[Dict], filter_condition: str) -> List[Dict]:
+    """按筛选条件过滤记录；条件为空时原样返回"""
+    if not records or not (filter_condition or "").strip():
+        return records
+    return compile_filter(filter_condition.strip()).filter(records)
+
+
+# 静态分片：(分片序号（0 起）, 分片总数)
+Shard = Tuple[int, int]
+
+
+def shard_of(record_id: str, shards: int) -> int:
+    """记录所属的分片（0 起）：record_id 的 CRC32 对分片总数取模，跨进程、跨机器保持一致"""
+    return zlib.crc32(record_id.encode("utf-8")) % shards
+
+
+def in_shard(record: Dict, shard: Optional[Shard]) -> bool:
+    return shard is None or shard_of(record.get("record_id") or "", shard[1]) == shard[0]
+
+
+def shard_records(records: List[Dict], shard: Optional[Shard]) -> List[Dict]:
+    """只保留属于 shard 的记录；shard 为 None 时原样返回"""
+    if shard is None:
+        return records
+    return [r for r in records if in_shard(r, shard)]
+
+
+def node_shard(shard_index: int, shard_count: int) -> Optional[Shard]:
+    """
+    把节点上的「分片序号 / 分片总数」（序号从 1 起）转换为 Shard；总数不大于 1 表示不分片。
+    序号超出范围时抛出 ValueError
+    """
+    if not isinstance(shard_count, int) or shard_count <= 1:
+        return None
+    if not isinstance(shard_index, int) or not 1 <= shard_index <= shard_count:
+        raise ValueError(f"分片序号应在 1 到 {shard_count} 之间")
+    return shard_index - 1, shard_count
+
+
+def _is_plain_ideograph(ch: str) -> bool:
+    # CJK 统一汉字（基本区与扩展 A 区）：没有大小写，也没有常见的全角/半角变体
+    return '\u4e00' <= ch <= '\u9fff' or '\u3400' <= ch <= '\u4dbf'
+
+
+def _server_condition(col: str, val: str, negate: bool, field_type: Optional[int]) -> Optional[Dict[str, Any]]:
+    """把一条规则翻译为 search 接口的条件；服务端结果可能比本地更少时返回 None"""
+    if field_type is None:
+        # 表格中不存在的列：服务端会报错，本地视为空值
+        return None
+
+    if val in (EMPTY, NOT_EMPTY):
+        if field_type not in _EMPTY_CHECK_TYPES:
+            return None
+        want_empty = (val == EMPTY) != negate
+        if want_empty and field_type in _STRING_TYPES:
+            return None
+        return {"field_name": col, "operator": "isEmpty" if want_empty else "isNotEmpty", "value": []}
+
+    if field_type not in _SUBSTRING_TYPES:
+        return None
+    if negate:
+        # 服务端若区分大小写只会多返回记录，本地复核即可
+        return {"field_name": col, "operator": "doesNotContain", "value": [val]}
+    if not all(_is_plain_ideograph(ch) for ch in val):
+        # 本地匹配忽略大小写并统一全角/半角，服务端不一定如此；只下推纯汉字关键词
+        return None
+    return {"field_name": col, "operator": "contains", "value": [val]}
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _typed_server_conditions(rule: TypedRule, field_type: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    把按类型比较的规则翻译为 search 接口的条件，返回 (条件列表, 是否与本地判定等价)；
+    无法下推时条件列表为空
+    """
+    col, op = rule.column, rule.op
+    if field_type in _NUMBER_TYPES and rule.kind == "number":
+        if op == "==" and rule.number is not None:
+            return [{"field_name": col, "operator": "is", "value": [_format_number(rule.number)]}], True
+        conditions = []
+        if rule.is_range and rule.low is not None:
+            operator = "isGreaterEqual" if rule.low_inclusive else "isGreater"
+            conditions.append({"field_name": col, "operator": operator, "value": [_format_number(rule.low)]})
+        if rule.is_range and rule.high is not None:
+            operator = "isLessEqual" if rule.high_inclusive else "isLess"
+            conditions.append({"field_name": col, "operator": operator, "value": [_format_number(rule.high)]})
+        return conditions, bool(conditions)
+
+    if field_type in _DATE_TYPES and rule.kind == "date" and rule.is_range:
+        # 服务端按天比较：各放宽一天，保证返回本地结果的超集
+        conditions = []
+        if rule.low is not None:
+            conditions.append({"field_name": col, "operator": "isGreater",
+                               "value": ["ExactDate", str(int(rule.low) - _DAY_MS)]})
+        if rule.high is not None:
+            conditions.append({"field_name": col, "operator": "isLess",
+                               "value": ["ExactDate", str(int(rule.high) + _DAY_MS)]})
+        return conditions, False
+
+    if op != "==":
+        return [], False
+    if field_type == _CHECKBOX_TYPE and rule.flag is True:
+        # 未勾选的复选框可能没有值，只下推「已勾选」
+        return [{"field_name": col, "operator": "is", "value": ["true"]}], True
+    if field_type == _SINGLE_SELECT_TYPE:
+        return [{"field_name": col, "operator": "is", "value": [rule.operand]}], True
+    if field_type == _MULTI_SELECT_TYPE:
+        return [{"field_name": col, "operator": "contains", "value": [rule.operand]}], True
+    return [], False
+
+
+def build_search_filter(include: List[FilterRule], exclude: List[FilterRule],
+                        field_types: Dict[str, int],
+                        typed: List[TypedRule] = ()) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    把规则编译为 records/search 的 filter 对象
+
+    返回 (filter, 是否全部规则都已下推)；没有可下推的规则时 filter 为 None。
+    下推的条件只会让服务端返回本地结果的超集，调用方仍需在本地复核
+    """
+    conditions = []
+    exact = True
+    for rules, negate in ((include, False), (exclude, True)):
+        for col, val in rules:
+            condition = _server_condition(col, val, negate, field_types.get(col))
+            if condition is None:
+                exact = False
+            else:
+                conditions.append(condition)
+    for rule in typed:
+        typed_conditions, typed_exact = _typed_server_conditions(rule, field_types.get(rule.column))
+        conditions.extend(typed_conditions)
+        exact = exact and typed_exact
+
+    if not conditions:
+        return None, False
+    return {"conjunction": "and", "conditions": conditions}, exact
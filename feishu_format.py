@@ -0,0 +1,102 @@
+"""
+飞书记录的文本输出格式
+- 「获取结果N&列名***(值)***」标记格式（默认）
+- JSON 数组、JSONL、CSV
+每条记录只格式化一次得到一行，整段输出由各行拼接而成；逐行结果同时作为列表输出。
+供各读取节点（含领取任务、监视变更）与流式读取共用
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .feishu_filter import display_text
+except ImportError:
+    from feishu_filter import display_text
+
+DEFAULT_SEPARATOR = " | "
+
+MARKER_FORMAT = "标记文本"
+OUTPUT_FORMATS = (MARKER_FORMAT, "JSON", "JSONL", "CSV")
+
+# 一行的格式化函数：(字段, 序号) -> 行文本
+RowFormatter = Callable[[Dict[str, Any], Any], str]
+
+
+def normalize_separator(separator: Optional[str]) -> str:
+    """列分隔符：为空时使用默认分隔符，并把输入的 \\n、\\t 转换为换行、制表符"""
+    if separator is None or separator == "":
+        separator = DEFAULT_SEPARATOR
+    return separator.replace('\\n', '\n').replace('\\t', '\t')
+
+
+def marker_line(fields: Dict[str, Any], columns: List[str], separator: str, index: Any) -> str:
+    """一条记录的标记格式输出行：获取结果N&列名***(值)***，各列用 separator 连接"""
+    line_parts = []
+    for col in columns:
+        if col in fields:
+            value = fields[col]
+            if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
+                line_parts.append(f"获取结果{index}&{col}***(空)***")
+            elif isinstance(value, list):
+                content = ', '.join(map(str, value))
+                line_parts.append(f"获取结果{index}&{col}***({content})***")
+            else:
+                line_parts.append(f"获取结果{index}&{col}***({value})***")
+        else:
+            line_parts.append(f"获取结果{index}&{col}***(空)***")
+    return f"{separator.join(line_parts)}&获取结果{index}#"
+
+
+def marker_lines(records: List[Dict], columns: List[str], separator: str, start: int = 1) -> List[str]:
+    """按标记格式格式化多条记录，序号从 start 开始"""
+    return [marker_line(record.get("fields", {}), columns, separator, i)
+            for i, record in enumerate(records, start)]
+
+
+def _json_value(value: Any) -> Any:
+    """JSON 输出中的单元格：数字、布尔值保持原类型，空值为 null，其余取可读文本"""
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, (bool, int, float)):
+        return value
+    return display_text(value)
+
+
+def csv_line(values: List[str]) -> str:
+    """一行 CSV：含逗号、引号、换行或首尾空白的值加双引号，引号写作两个引号"""
+    cells = []
+    for value in values:
+        if any(c in value for c in ',"\r\n') or value != value.strip():
+            value = '"' + value.replace('"', '""') + '"'
+        cells.append(value)
+    return ",".join(cells)
+
+
+def row_formatter(output_format: str, columns: List[str], separator: str = DEFAULT_SEPARATOR) -> RowFormatter:
+    """返回 output_format 下单条记录的格式化函数（只有标记格式用到序号与分隔符）"""
+    if output_format in ("JSON", "JSONL"):
+        return lambda fields, index: json.dumps({col: _json_value(fields.get(col)) for col in columns},
+                                                ensure_ascii=False)
+    if output_format == "CSV":
+        return lambda fields, index: csv_line([display_text(fields.get(col)) for col in columns])
+    return lambda fields, index: marker_line(fields, columns, separator, index)
+
+
+def join_rows(output_format: str, rows: List[str], columns: List[str]) -> str:
+    """把逐行结果拼接为整段输出"""
+    if output_format == "JSON":
+        return "[" + ",\n".join(rows) + "]"
+    if output_format == "JSONL":
+        return "\n".join(rows)
+    if output_format == "CSV":
+        return "\n".join([csv_line(columns)] + rows)
+    return "\n".join(rows) or "[]"
+
+
+def format_records(records: List[Dict], columns: List[str], output_format: str = MARKER_FORMAT,
+                   separator: str = DEFAULT_SEPARATOR) -> Tuple[str, List[str]]:
+    """按 output_format 格式化记录，返回 (整段输出, 逐行结果)"""
+    fmt = row_formatter(output_format, columns, separator)
+    rows = [fmt(record.get("fields", {}), i) for i, record in enumerate(records, 1)]
+    return join_rows(output_format, rows, columns), rows
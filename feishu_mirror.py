@@ -0,0 +1,246 @@
+"""
+飞书多维表格本地镜像
+每张数据表在磁盘上保存一份 SQLite 镜像：
+- 首次使用时全量拉取一次
+- 之后只拉取「修改时间」晚于水位的记录（需要表格中有一个「修改时间」类型的字段）
+- 每隔 FEISHU_MIRROR_RECONCILE 秒核对一次已删除的记录
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .feishu_cache import TableSnapshot
+    from .feishu_client import env_float
+    from .feishu_profile import record_cache_hit
+    from .feishu_records import (FeishuAPIError, fetch_table_fields, iter_record_pages,
+                                 iter_search_pages)
+except ImportError:
+    from feishu_cache import TableSnapshot
+    from feishu_client import env_float
+    from feishu_profile import record_cache_hit
+    from feishu_records import (FeishuAPIError, fetch_table_fields, iter_record_pages,
+                                iter_search_pages)
+
+
+# 镜像文件目录
+MIRROR_DIR = os.environ.get("FEISHU_MIRROR_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "mirror"
+)
+# 核对已删除记录的间隔（秒）
+RECONCILE_INTERVAL = env_float("FEISHU_MIRROR_RECONCILE", 600.0)
+
+# 「修改时间」字段类型
+MODIFIED_TIME_TYPE = 1002
+
+_DAY_MS = 24 * 3600 * 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    modified INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_position ON records(position);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _modified_time_field(fields: Optional[List[Dict]]) -> Optional[str]:
+    for field in fields or []:
+        if field.get("type") == MODIFIED_TIME_TYPE:
+            return field.get("field_name")
+    return None
+
+
+def _modified_ms(record: Dict, field_name: Optional[str]) -> int:
+    value = record.get("last_modified_time")
+    if value is None and field_name:
+        value = (record.get("fields") or {}).get(field_name)
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class TableMirror:
+    """一张数据表的 SQLite 镜像"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+
+    @staticmethod
+    def _set_meta(conn: sqlite3.Connection, **values) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def sync(self, access_token: str, app_token: str, table_id: str) -> bool:
+        """与飞书同步镜像，成功返回 True"""
+        with self._lock:
+            try:
+                with closing(self._connect()) as conn:
+                    meta = self._meta(conn)
+                    modified_field = _modified_time_field(
+                        fetch_table_fields(access_token, app_token, table_id)
+                    )
+                    if not meta.get("initialized") or modified_field is None:
+                        if meta.get("initialized"):
+                            print("⚠️ 表格中没有「修改时间」字段，本地镜像只能全量同步")
+                        self._full_sync(conn, access_token, app_token, table_id, modified_field)
+                        return True
+
+                    self._incremental_sync(conn, access_token, app_token, table_id,
+                                           modified_field, int(meta.get("watermark", 0)))
+                    if time.time() - float(meta.get("reconciled_at", 0)) >= RECONCILE_INTERVAL:
+                        self._reconcile_deletions(conn, access_token, app_token, table_id, modified_field)
+                    return True
+            except FeishuAPIError as e:
+                print(f"同步本地镜像失败: {str(e)}")
+            except Exception as e:
+                print(f"同步本地镜像时发生错误: {str(e)}")
+            return False
+
+    def _full_sync(self, conn: sqlite3.Connection, access_token: str, app_token: str,
+                   table_id: str, modified_field: Optional[str]) -> None:
+        records: List[Dict] = []
+        for items, _ in iter_record_pages(access_token, app_token, table_id, {"automatic_fields": "true"}):
+            records.extend(items)
+
+        watermark = max((_modified_ms(r, modified_field) for r in records), default=0)
+        with conn:
+            conn.execute("DELETE FROM records")
+            conn.executemany(
+                "INSERT OR REPLACE INTO records (record_id, position, modified, data) VALUES (?, ?, ?, ?)",
+                [(r.get("record_id"), i, _modified_ms(r, modified_field), json.dumps(r, ensure_ascii=False))
+                 for i, r in enumerate(records)],
+            )
+            self._set_meta(conn, initialized=1, watermark=watermark, reconciled_at=time.time())
+        print(f"🗄️ 本地镜像已全量同步（{len(records)} 条记录）")
+
+    def _incremental_sync(self, conn: sqlite3.Connection, access_token: str, app_token: str,
+                          table_id: str, modified_field: str, watermark: int) -> None:
+        # 日期条件按天比较：取水位前一天之后的记录，再按精确时间筛掉未变化的
+        body = {
+            "automatic_fields": True,
+            "filter": {
+                "conjunction": "and",
+                "conditions": [{
+                    "field_name": modified_field,
+                    "operator": "isGreater",
+                    "value": ["ExactDate", str(max(watermark - _DAY_MS, 0))],
+                }],
+            },
+        }
+        changed: List[Dict] = []
+        for items, _ in iter_search_pages(access_token, app_token, table_id, body):
+            changed.extend(r for r in items if _modified_ms(r, modified_field) > watermark)
+
+        if changed:
+            self._upsert(conn, changed, modified_field)
+            print(f"🗄️ 本地镜像增量同步 {len(changed)} 条记录")
+
+    def _upsert(self, conn: sqlite3.Connection, records: Iterable[Dict], modified_field: str) -> None:
+        with conn:
+            next_position = conn.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM records").fetchone()[0]
+            watermark = int(self._meta(conn).get("watermark", 0))
+            for record in records:
+                modified = _modified_ms(record, modified_field)
+                watermark = max(watermark, modified)
+                data = json.dumps(record, ensure_ascii=False)
+                updated = conn.execute(
+                    "UPDATE records SET modified = ?, data = ? WHERE record_id = ?",
+                    (modified, data, record.get("record_id")),
+                ).rowcount
+                if not updated:
+                    conn.execute(
+                        "INSERT INTO records (record_id, position, modified, data) VALUES (?, ?, ?, ?)",
+                        (record.get("record_id"), next_position, modified, data),
+                    )
+                    next_position += 1
+            self._set_meta(conn, watermark=watermark)
+
+    def _reconcile_deletions(self, conn: sqlite3.Connection, access_token: str, app_token: str,
+                             table_id: str, modified_field: str) -> None:
+        # 只取一个字段，核对记录 ID 的开销与表格大小相关但响应体很小
+        params = {"field_names": json.dumps([modified_field], ensure_ascii=False)}
+        live = set()
+        for items, _ in iter_record_pages(access_token, app_token, table_id, params):
+            live.update(r.get("record_id") for r in items)
+
+        stored = [row[0] for row in conn.execute("SELECT record_id FROM records")]
+        deleted = [(record_id,) for record_id in stored if record_id not in live]
+        with conn:
+            if deleted:
+                conn.executemany("DELETE FROM records WHERE record_id = ?", deleted)
+            self._set_meta(conn, reconciled_at=time.time())
+        if deleted:
+            print(f"🗄️ 本地镜像删除了 {len(deleted)} 条已不存在的记录")
+
+    def load(self, max_rows: Optional[int] = None) -> Optional[TableSnapshot]:
+        """按表格顺序读取镜像中的记录；镜像尚未初始化时返回 None"""
+        with self._lock, closing(self._connect()) as conn:
+            if not self._meta(conn).get("initialized"):
+                return None
+            sql = "SELECT data FROM records ORDER BY position"
+            if max_rows is not None:
+                rows = conn.execute(sql + " LIMIT ?", (max_rows,)).fetchall()
+            else:
+                rows = conn.execute(sql).fetchall()
+
+        records = [json.loads(row[0]) for row in rows]
+        nbytes = sum(len(row[0]) for row in rows)
+        complete = max_rows is None or len(records) < max_rows
+        return TableSnapshot(records, complete, nbytes)
+
+
+_mirrors: Dict[str, TableMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(app_token: str, table_id: str) -> TableMirror:
+    """返回数据表对应的镜像（每个文件一个实例）"""
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", f"{app_token}_{table_id}")
+    path = os.path.join(MIRROR_DIR, f"{name}.sqlite3")
+    with _mirrors_lock:
+        mirror = _mirrors.get(path)
+        if mirror is None:
+            mirror = _mirrors[path] = TableMirror(path)
+        return mirror
+
+
+def scan_mirror(access_token: str, app_token: str, table_id: str,
+                max_rows: Optional[int] = None) -> Optional[TableSnapshot]:
+    """同步镜像后从镜像读取记录；同步失败时退回到上次同步的数据"""
+    mirror = get_mirror(app_token, table_id)
+    synced = mirror.sync(access_token, app_token, table_id)
+    snapshot = mirror.load(max_rows)
+    if snapshot is None:
+        return None
+    record_cache_hit("本地镜像", len(snapshot.records))
+    if not synced:
+        print("⚠️ 使用上次同步的本地镜像数据")
+        snapshot.complete = False
+    return snapshot
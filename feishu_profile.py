@@ -0,0 +1,193 @@
+"""
+读取节点的执行分析（explain 模式）
+节点打开「执行分析」后，在一次执行内记录：
+- 各阶段耗时（鉴权、拉取、筛选、格式化、下载、转换等）
+- 翻页次数、扫描行数与命中行数、响应字节数
+- 下推到服务端的规则与本地判定的规则、本地判定顺序
+- 快照缓存 / 合并扫描 / 本地镜像的使用情况
+结果附加到节点的状态信息，并写入 FEISHU_PROFILE_DIR 下的 JSON 文件。
+分析对象保存在 contextvar 中，共享线程池（submit_io / run_blocking）里的调用同样会被记录；未开启时各记录函数不做任何事
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# 执行分析 JSON 文件的存放目录
+PROFILE_DIR = os.environ.get("FEISHU_PROFILE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+STAGE_LABELS = {
+    "auth": "鉴权",
+    "fetch": "拉取记录",
+    "stream": "拉取筛选格式化",
+    "filter": "筛选",
+    "format": "格式化",
+    "locate": "定位附件",
+    "download": "下载",
+    "convert": "转换",
+}
+
+
+class QueryProfile:
+    """一次节点执行的计划与耗时统计"""
+
+    def __init__(self, node: str):
+        self.node = node
+        self.started_at = time.time()
+        self._start = self._last = time.perf_counter()
+        self.total = 0.0
+        self.stages: Dict[str, float] = {}
+        self.pages = 0
+        self.rows_scanned = 0
+        self.rows_matched: Optional[int] = None
+        self.bytes = 0
+        self.pushdown: List[str] = []
+        self.local: List[str] = []
+        self.plan = ""
+        self.cache: List[str] = []
+        self.sidecar: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def lap(self, stage: str) -> None:
+        """把上一次 lap 以来的耗时记到 stage 上（同名阶段累加）"""
+        now = time.perf_counter()
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+            self._last = now
+
+    def page(self, rows: int, nbytes: int) -> None:
+        with self._lock:
+            self.pages += 1
+            self.rows_scanned += rows
+            self.bytes += nbytes
+
+    def cache_hit(self, source: str, rows: int) -> None:
+        with self._lock:
+            self.cache.append(source)
+            self.rows_scanned += rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node": self.node,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "total_seconds": round(self.total, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "pages": self.pages,
+            "rows_scanned": self.rows_scanned,
+            "rows_matched": self.rows_matched,
+            "bytes": self.bytes,
+            "pushdown_rules": self.pushdown,
+            "local_rules": self.local,
+            "local_order": self.plan,
+            "cache": self.cache,
+        }
+
+    def finish(self, directory: Optional[str] = None) -> None:
+        """结束计时并写入 JSON 文件（写入失败只打印提示）"""
+        self.total = time.perf_counter() - self._start
+        directory = directory or PROFILE_DIR
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        path = os.path.join(directory, f"{self.node}_{stamp}_{int(self.started_at * 1000) % 1000:03d}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            self.sidecar = path
+        except OSError as e:
+            print(f"写入执行分析文件失败: {str(e)}")
+
+    def report(self) -> str:
+        """附加到状态信息的可读摘要"""
+        stages = " · ".join(f"{STAGE_LABELS.get(name, name)} {seconds:.2f}s" for name, seconds in self.stages.items())
+        matched = "" if self.rows_matched is None else f"，命中 {self.rows_matched} 行"
+        lines = [
+            "—— 执行分析 ——",
+            f"耗时：{stages or '无'}（共 {self.total:.2f}s）",
+            f"分页：{self.pages} 页，扫描 {self.rows_scanned} 行{matched}，传输 {self.bytes / 1024:.1f} KB",
+            f"服务端筛选：{'、'.join(self.pushdown) or '无'}",
+            f"本地筛选：{'、'.join(self.local) or '无'}",
+        ]
+        if self.plan:
+            lines.append(f"本地判定顺序：{self.plan}")
+        lines.append(f"缓存：{'、'.join(self.cache) or '未命中'}")
+        if self.sidecar:
+            lines.append(f"分析文件：{self.sidecar}")
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[QueryProfile]] = contextvars.ContextVar("feishu_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current.get()
+
+
+@contextmanager
+def explain(node: str, enabled: bool = True) -> Iterator[Optional[QueryProfile]]:
+    """enabled 时在 with 块内收集执行分析，退出时写入 JSON 文件；否则产出 None"""
+    if not enabled:
+        yield None
+        return
+    profile = QueryProfile(node)
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+        profile.finish()
+
+
+def attach_profile(result: Any, profile: Optional[QueryProfile], status_index: int = 1) -> Any:
+    """把执行分析摘要追加到节点返回值中的状态信息（支持 {"ui", "result"} 形式的返回值）"""
+    if profile is None:
+        return result
+    if isinstance(result, dict) and "result" in result:
+        return dict(result, result=attach_profile(result["result"], profile, status_index))
+    if isinstance(result, tuple) and len(result) > status_index:
+        status = result[status_index] or ""
+        return result[:status_index] + (f"{status}\n\n{profile.report()}",) + result[status_index + 1:]
+    return result
+
+
+# 以下记录函数在未开启执行分析时直接返回
+
+def lap(stage: str) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.lap(stage)
+
+
+def record_page(rows: int, nbytes: int) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.page(rows, nbytes)
+
+
+def record_cache_hit(source: str, rows: int = 0) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hit(source, rows)
+
+
+def record_rules(pushdown: List[str], local: List[str]) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.pushdown = list(pushdown)
+        profile.local = list(local)
+
+
+def record_plan(plan: str) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.plan = plan
+
+
+def record_matched(rows: int) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.rows_matched = rows
@@ -0,0 +1,1028 @@
+"""
+飞书多维表格记录读取
+所有节点共享的分页拉取逻辑：
+- 同一次执行内相同的记录扫描只请求一次
+- 扫描结果写入带 TTL 的进程内快照缓存，供后续执行复用
+- 可选从本地 SQLite 镜像读取（见 feishu_mirror）
+- 带筛选条件时尽量在服务端（records/search）完成筛选，只拉取命中的记录
+- stream_table_records 以生成器流水线逐条产出记录，调用方停止迭代即停止翻页
+- read_page 按游标分页读取满足筛选条件的记录，每次从上次停下的位置继续
+- table_revision / read_fingerprint 用一次很小的请求探测表格是否变化，供节点的 IS_CHANGED 使用
+"""
+
+import base64
+import hashlib
+import json
+import math
+import threading
+import time
+from typing import AbstractSet, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    from .feishu_async import current_prompt_id
+    from .feishu_cache import SNAPSHOT_TTL, TableSnapshot, snapshot_cache
+    from .feishu_client import env_float, http_get, http_post, token_cache
+    from .feishu_columnar import filter_snapshot
+    from .feishu_filter import CompiledFilter, PlannedMatcher, Shard, build_search_filter, compile_filter, in_shard
+    from .feishu_profile import record_cache_hit, record_page, record_plan, record_rules
+except ImportError:
+    from feishu_async import current_prompt_id
+    from feishu_cache import SNAPSHOT_TTL, TableSnapshot, snapshot_cache
+    from feishu_client import env_float, http_get, http_post, token_cache
+    from feishu_columnar import filter_snapshot
+    from feishu_filter import CompiledFilter, PlannedMatcher, Shard, build_search_filter, compile_filter, in_shard
+    from feishu_profile import record_cache_hit, record_page, record_plan, record_rules
+
+
+RECORDS_URL = "https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records"
+SEARCH_URL = RECORDS_URL + "/search"
+BATCH_UPDATE_URL = RECORDS_URL + "/batch_update"
+BATCH_GET_URL = RECORDS_URL + "/batch_get"
+FIELDS_URL = "https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/fields"
+TABLES_URL = "https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables"
+
+# 飞书记录列表接口单页最多 500 条
+MAX_PAGE_SIZE = 500
+
+# 无法获取 prompt_id 时，已完成的扫描结果在该时间窗口内（秒）供后续节点复用
+COALESCE_WINDOW = env_float("FEISHU_COALESCE_WINDOW", 5.0)
+
+# 流式读取时，命中记录的响应体积不超过该值（MB）的完整扫描仍写入快照缓存
+STREAM_CACHE_MB = env_float("FEISHU_STREAM_CACHE_MB", 16.0)
+
+# 表格版本探测结果的缓存秒数（同一次排队的多个节点共用一次探测）
+REVISION_TTL = env_float("FEISHU_REVISION_TTL", 3.0)
+
+
+class _ScanCall:
+    __slots__ = ("max_rows", "field_names", "scope", "event", "snapshot", "finished_at")
+
+    def __init__(self, max_rows: Optional[int], field_names: Optional[AbstractSet[str]], scope: Optional[str]):
+        self.max_rows = max_rows
+        self.field_names = field_names
+        self.scope = scope
+        self.event = threading.Event()
+        self.snapshot: Optional[TableSnapshot] = None
+        self.finished_at = 0.0
+
+    def covers(self, max_rows: Optional[int], field_names: Optional[AbstractSet[str]]) -> bool:
+        """本次扫描的结果是否足以满足 max_rows 条、包含 field_names 字段的请求"""
+        if self.event.is_set():
+            return self.snapshot is not None and self.snapshot.covers(max_rows, field_names)
+        if self.field_names is not None and (field_names is None or not self.field_names.issuperset(field_names)):
+            return False
+        if self.max_rows is None:
+            return True
+        return max_rows is not None and self.max_rows >= max_rows
+
+
+class SingleFlight:
+    """
+    记录扫描合并器
+
+    - 相同键的并发扫描只发起一次请求，其余调用方等待并共享结果
+    - 已完成的结果在同一 prompt 内（或 COALESCE_WINDOW 秒内）继续供后续节点复用
+    - 过了复用期的结果在下一次 do() 时丢弃，之后只保存在有内存上限的快照缓存中
+    """
+
+    def __init__(self, window: float = COALESCE_WINDOW):
+        self.window = window
+        self._calls: Dict[Hashable, _ScanCall] = {}
+        self._lock = threading.Lock()
+
+    def _reusable(self, call: _ScanCall, scope: Optional[str], max_rows: Optional[int],
+                  field_names: Optional[AbstractSet[str]]) -> bool:
+        if not call.covers(max_rows, field_names):
+            return False
+        if not call.event.is_set():
+            return True
+        if scope is not None and call.scope is not None:
+            return scope == call.scope
+        return time.monotonic() - call.finished_at <= self.window
+
+    def _expired(self, call: _ScanCall, scope: Optional[str], now: float) -> bool:
+        """已完成、且不会再被任何调用方复用（已不在同一 prompt 内且超过窗口期）"""
+        if not call.event.is_set() or now - call.finished_at <= self.window:
+            return False
+        return call.scope is None or call.scope != scope
+
+    def do(self, key: Hashable, max_rows: Optional[int], scan,
+           field_names: Optional[AbstractSet[str]] = None) -> Optional[TableSnapshot]:
+        """执行（或复用）一次扫描，scan 返回 TableSnapshot 或 None"""
+        scope = current_prompt_id()
+        with self._lock:
+            now = time.monotonic()
+            for stale in [k for k, c in self._calls.items() if self._expired(c, scope, now)]:
+                del self._calls[stale]
+            call = self._calls.get(key)
+            owner = call is None or not self._reusable(call, scope, max_rows, field_names)
+            if owner:
+                call = _ScanCall(max_rows, field_names, scope)
+                self._calls[key] = call
+
+        if not owner:
+            call.event.wait()
+            print("♻️ 复用同一执行内的记录扫描结果")
+            if call.snapshot is not None:
+                record_cache_hit("合并扫描", len(call.snapshot.records))
+            return call.snapshot
+
+        try:
+            call.snapshot = scan()
+        finally:
+            call.finished_at = time.monotonic()
+            call.event.set()
+        return call.snapshot
+
+    def forget(self, predicate) -> None:
+        """丢弃键满足 predicate 的已完成结果（写入表格后调用）"""
+        with self._lock:
+            for key in [k for k, c in self._calls.items() if c.event.is_set() and predicate(k)]:
+                del self._calls[key]
+
+
+_single_flight = SingleFlight()
+
+
+class FeishuAPIError(Exception):
+    """飞书接口返回了非 0 的 code"""
+
+
+def _auth_headers(access_token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
+
+
+def _fetch_page(request_page: Callable[[Optional[str]], Any],
+                page_token: Optional[str]) -> Tuple[List[Dict], int, Optional[str]]:
+    """请求一页，返回 (本页记录, 响应字节数, 下一页的 page_token)；没有下一页时 page_token 为 None"""
+    response = request_page(page_token)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != 0:
+        raise FeishuAPIError(data.get("msg", "未知错误"))
+
+    page = data.get("data") or {}
+    next_token = page.get("page_token")
+    if not page.get("has_more", bool(next_token)):
+        next_token = None
+    return page.get("items") or [], len(response.content or b""), next_token or None
+
+
+def _iter_pages(request_page: Callable[[Optional[str]], Any]) -> Iterator[Tuple[List[Dict], int]]:
+    page_token = None
+    while True:
+        items, nbytes, page_token = _fetch_page(request_page, page_token)
+        yield items, nbytes
+        if page_token is None:
+            return
+
+
+# 每页条数：固定值，或在每次请求前调用以得到下一页条数
+PageSize = Union[int, Callable[[], int]]
+
+
+def _page_size_value(page_size: PageSize) -> int:
+    return page_size() if callable(page_size) else page_size
+
+
+class AdaptivePageSize:
+    """
+    根据已观察到的命中率估算下一页需要拉取的条数
+
+    wanted 为还需要的命中条数（None 表示全部），budget 为最多扫描的行数（None 表示不限）
+    """
+
+    def __init__(self, wanted: Optional[int], budget: Optional[int] = None, initial_rate: float = 0.25):
+        self.wanted = wanted
+        self.budget = budget
+        self.initial_rate = initial_rate
+        self.seen = 0
+        self.matched = 0
+
+    def observe(self, seen: int, matched: int) -> None:
+        self.seen += seen
+        self.matched += matched
+
+    def __call__(self) -> int:
+        size = MAX_PAGE_SIZE
+        if self.wanted is not None:
+            remaining = max(self.wanted - self.matched, 1)
+            rate = self.matched / self.seen if self.seen else self.initial_rate
+            if rate > 0:
+                # 命中率不足 1 时多取两成，减少因估计偏低而多发的请求
+                slack = 1.0 if rate >= 1 else 1.2
+                size = math.ceil(remaining / min(rate, 1.0) * slack)
+        if self.budget is not None:
+            size = min(size, self.budget - self.seen)
+        return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _record_page_request(access_token: str, app_token: str, table_id: str,
+                         params: Optional[Dict[str, Any]], page_size: PageSize) -> Callable[[Optional[str]], Any]:
+    url = RECORDS_URL.format(app_token=app_token, table_id=table_id)
+    query = dict(params or {})
+
+    def request_page(page_token: Optional[str]):
+        query["page_size"] = _page_size_value(page_size)
+        if page_token:
+            query["page_token"] = page_token
+        return http_get(url, headers=_auth_headers(access_token), params=query, timeout=30)
+
+    return request_page
+
+
+def _search_page_request(access_token: str, app_token: str, table_id: str,
+                         body: Dict[str, Any], page_size: PageSize) -> Callable[[Optional[str]], Any]:
+    url = SEARCH_URL.format(app_token=app_token, table_id=table_id)
+
+    def request_page(page_token: Optional[str]):
+        params: Dict[str, Any] = {"page_size": _page_size_value(page_size)}
+        if page_token:
+            params["page_token"] = page_token
+        return http_post(url, headers=_auth_headers(access_token), params=params, json=body, timeout=30)
+
+    return request_page
+
+
+def iter_record_pages(access_token: str, app_token: str, table_id: str,
+                      params: Optional[Dict[str, Any]] = None,
+                      page_size: PageSize = MAX_PAGE_SIZE) -> Iterator[Tuple[List[Dict], int]]:
+    """逐页调用记录列表接口，产出 (本页记录, 响应字节数)；接口报错时抛出 FeishuAPIError"""
+    request_page = _record_page_request(access_token, app_token, table_id, params, page_size)
+    for items, nbytes in _iter_pages(request_page):
+        record_page(len(items), nbytes)
+        yield items, nbytes
+
+
+def iter_search_pages(access_token: str, app_token: str, table_id: str, body: Dict[str, Any],
+                      page_size: PageSize = MAX_PAGE_SIZE) -> Iterator[Tuple[List[Dict], int]]:
+    """逐页调用记录查询（search）接口，产出 (本页记录, 响应字节数)；记录格式已与列表接口对齐"""
+    request_page = _search_page_request(access_token, app_token, table_id, body, page_size)
+    for items, nbytes in _iter_pages(request_page):
+        record_page(len(items), nbytes)
+        yield [normalize_search_record(item) for item in items], nbytes
+
+
+def _is_plain_text_segments(value: Any) -> bool:
+    return (isinstance(value, list) and bool(value)
+            and all(isinstance(seg, dict) and seg.get("type") == "text" and "text" in seg for seg in value))
+
+
+def normalize_search_record(record: Dict) -> Dict:
+    """
+    search 接口把文本字段返回为 [{"type": "text", "text": ...}] 片段列表，
+    而列表接口对纯文本直接返回字符串；这里统一成列表接口的格式
+    """
+    fields = record.get("fields")
+    if isinstance(fields, dict):
+        for name, value in fields.items():
+            if _is_plain_text_segments(value):
+                fields[name] = "".join(seg["text"] for seg in value)
+    return record
+
+
+def _post_json(url: str, access_token: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    response = http_post(url, headers=_auth_headers(access_token), json=body, timeout=30)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != 0:
+        raise FeishuAPIError(data.get("msg", "未知错误"))
+    return data.get("data") or {}
+
+
+def batch_update_records(access_token: str, app_token: str, table_id: str, updates: List[Dict]) -> None:
+    """批量更新记录（每项为 {"record_id", "fields"}，每次请求最多 500 条）；接口报错时抛出 FeishuAPIError"""
+    url = BATCH_UPDATE_URL.format(app_token=app_token, table_id=table_id)
+    for start in range(0, len(updates), MAX_PAGE_SIZE):
+        _post_json(url, access_token, {"records": updates[start:start + MAX_PAGE_SIZE]})
+
+
+def batch_get_records(access_token: str, app_token: str, table_id: str, record_ids: List[str]) -> List[Dict]:
+    """按记录 ID 批量读取最新内容（绕过快照缓存，每次请求最多 100 条）；接口报错时抛出 FeishuAPIError"""
+    url = BATCH_GET_URL.format(app_token=app_token, table_id=table_id)
+    records: List[Dict] = []
+    for start in range(0, len(record_ids), 100):
+        data = _post_json(url, access_token, {"record_ids": record_ids[start:start + 100]})
+        records.extend(normalize_search_record(r) for r in data.get("records") or [])
+    return records
+
+
+_fields_cache: Dict[Tuple, Tuple[float, List[Dict]]] = {}
+_fields_lock = threading.Lock()
+
+
+def fetch_table_fields(access_token: str, app_token: str, table_id: str) -> Optional[List[Dict]]:
+    """获取数据表的字段列表（field_name、type 等），短时间内缓存；失败时返回 None"""
+    key = (app_token, table_id)
+    with _fields_lock:
+        cached = _fields_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] <= SNAPSHOT_TTL:
+        return cached[1]
+
+    url = FIELDS_URL.format(app_token=app_token, table_id=table_id)
+    fields: List[Dict] = []
+    try:
+        query: Dict[str, Any] = {"page_size": 100}
+
+        def request_page(page_token: Optional[str]):
+            if page_token:
+                query["page_token"] = page_token
+            return http_get(url, headers=_auth_headers(access_token), params=query, timeout=30)
+
+        for items, _ in _iter_pages(request_page):
+            fields.extend(items)
+    except Exception as e:
+        print(f"获取字段列表失败: {str(e)}")
+        return None
+
+    with _fields_lock:
+        _fields_cache[key] = (time.monotonic(), fields)
+    return fields
+
+
+_revision_cache: Dict[Tuple, Tuple[float, str]] = {}
+_revision_lock = threading.Lock()
+_MODIFIED_TIME_TYPE = 1002
+
+
+def _probe_revision(access_token: str, app_token: str, table_id: str) -> Optional[str]:
+    """数据表列表中的 revision；没有时退回「最新修改时间 + 总行数」（只请求 1 行）"""
+    url = TABLES_URL.format(app_token=app_token, table_id=table_id)
+    query: Dict[str, Any] = {"page_size": 100}
+
+    def request_page(page_token: Optional[str]):
+        if page_token:
+            query["page_token"] = page_token
+        return http_get(url, headers=_auth_headers(access_token), params=query, timeout=30)
+
+    for items, _ in _iter_pages(request_page):
+        for table in items:
+            if table.get("table_id") == table_id and table.get("revision") is not None:
+                return f"rev:{table['revision']}"
+
+    column = next((f.get("field_name") for f in fetch_table_fields(access_token, app_token, table_id) or []
+                   if f.get("type") == _MODIFIED_TIME_TYPE), None)
+    if column is None:
+        return None
+    body = {"sort": [{"field_name": column, "desc": True}], "field_names": [column]}
+    response = _search_page_request(access_token, app_token, table_id, body, 1)(None)
+    response.raise_for_status()
+    data = response.json()
+    if data.get("code") != 0:
+        raise FeishuAPIError(data.get("msg", "未知错误"))
+    page = data.get("data") or {}
+    newest = [(item.get("fields") or {}).get(column) for item in page.get("items") or []]
+    return f"mod:{newest[0] if newest else ''}/{page.get('total', '')}"
+
+
+def table_revision(access_token: str, app_token: str, table_id: str) -> Optional[str]:
+    """
+    表格当前的版本标识（内容变化后随之改变），在 REVISION_TTL 秒内复用上次的探测结果；
+    探测失败或无法判断时返回 None
+    """
+    key = (app_token, table_id)
+    with _revision_lock:
+        cached = _revision_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] <= REVISION_TTL:
+        return cached[1]
+    try:
+        revision = _probe_revision(access_token, app_token, table_id)
+    except Exception as e:
+        print(f"探测表格版本失败: {str(e)}")
+        return None
+    if revision is not None:
+        with _revision_lock:
+            _revision_cache[key] = (time.monotonic(), revision)
+    return revision
+
+
+_node_configs: Dict[Tuple, Dict[str, Any]] = {}
+_node_configs_lock = threading.Lock()
+
+
+def remember_config(node_key: Tuple, config: Any) -> None:
+    """
+    记录节点最近一次执行时用到的飞书配置。
+    ComfyUI 计算 IS_CHANGED 时只传入控件上的常量，连线传入的「飞书配置」总是缺失，只能用这里记下的配置探测表格版本
+    """
+    if isinstance(config, dict) and node_key[-1] not in (None, ""):
+        with _node_configs_lock:
+            _node_configs[node_key] = config
+
+
+def read_fingerprint(node_key: Tuple, config: Any, inputs: Dict[str, Any]) -> Union[str, float]:
+    """
+    读取节点 IS_CHANGED 的返回值：表格版本与节点其余输入的指纹。
+    config 缺失时（连线输入）使用该节点上次执行时的配置；配置本身改变时 ComfyUI 会因上游输入变化而重新执行，无需在此判断。
+    表格与输入都未变化时指纹不变，ComfyUI 直接复用上次的输出；无法探测时返回 NaN（总是重新执行）
+    """
+    if not isinstance(config, dict):
+        with _node_configs_lock:
+            config = _node_configs.get(node_key)
+    config = config if isinstance(config, dict) else {}
+    app_id, app_secret = config.get("app_id", ""), config.get("app_secret", "")
+    app_token, table_id = config.get("url_app_id", ""), config.get("table_id", "")
+    if not app_id or not app_secret or not app_token or not table_id:
+        return float("nan")
+    access_token = token_cache.get_token(app_id, app_secret)
+    revision = table_revision(access_token, app_token, table_id) if access_token else None
+    if revision is None:
+        return float("nan")
+    payload = json.dumps([app_token, table_id, revision, inputs], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _scan_records(access_token: str, app_token: str, table_id: str, view_id: Optional[str],
+                  max_rows: Optional[int],
+                  field_names: Optional[AbstractSet[str]] = None) -> Optional[TableSnapshot]:
+    """逐页拉取记录；首页即失败时返回 None，中途失败时返回不完整的快照"""
+    params: Dict[str, Any] = {}
+    if view_id:
+        params["view_id"] = view_id
+    if field_names is not None:
+        params["field_names"] = json.dumps(sorted(field_names), ensure_ascii=False)
+    page_size = min(max_rows, MAX_PAGE_SIZE) if max_rows else MAX_PAGE_SIZE
+
+    all_records: List[Dict] = []
+    nbytes = 0
+    try:
+        for items, size in iter_record_pages(access_token, app_token, table_id, params, page_size):
+            all_records.extend(items)
+            nbytes += size
+            if max_rows is not None and len(all_records) >= max_rows:
+                return TableSnapshot(all_records[:max_rows], False, nbytes, field_names)
+        return TableSnapshot(all_records, True, nbytes, field_names)
+
+    except FeishuAPIError as e:
+        print(f"获取表格记录失败: {str(e)}")
+    except Exception as e:
+        print(f"获取表格记录时发生错误: {str(e)}")
+
+    return TableSnapshot(all_records, False, nbytes, field_names) if all_records else None
+
+
+def _search_scan(access_token: str, app_token: str, table_id: str, view_id: Optional[str],
+                 search_filter: Dict[str, Any], accept: Callable[[Dict], bool],
+                 max_rows: Optional[int], field_names: Optional[AbstractSet[str]] = None,
+                 exact: bool = False) -> Optional[TableSnapshot]:
+    """按服务端筛选逐页拉取，并在本地复核；凑够 max_rows 条命中记录后停止"""
+    body: Dict[str, Any] = {"filter": search_filter}
+    if view_id:
+        body["view_id"] = view_id
+    if field_names is not None:
+        body["field_names"] = sorted(field_names)
+    # 全部规则都已下推时，返回的记录几乎都会命中
+    page_size = AdaptivePageSize(max_rows, initial_rate=1.0 if exact else 0.5)
+
+    matched: List[Dict] = []
+    nbytes = 0
+    try:
+        for items, size in iter_search_pages(access_token, app_token, table_id, body, page_size):
+            nbytes += size
+            hits = [r for r in items if accept(r)]
+            page_size.observe(len(items), len(hits))
+            matched.extend(hits)
+            if max_rows is not None and len(matched) >= max_rows:
+                return TableSnapshot(matched[:max_rows], False, nbytes, field_names)
+        return TableSnapshot(matched, True, nbytes, field_names)
+
+    except FeishuAPIError as e:
+        print(f"服务端筛选失败: {str(e)}")
+    except Exception as e:
+        print(f"服务端筛选时发生错误: {str(e)}")
+
+    return TableSnapshot(matched, False, nbytes, field_names) if matched else None
+
+
+def _projection(fields: Optional[List[Dict]],
+                field_names: Optional[Iterable[str]]) -> Optional[AbstractSet[str]]:
+    """与表格中实际存在的字段取交集（不存在的字段名会使接口报错）；None 表示拉取全部字段"""
+    if field_names is None or fields is None:
+        return None
+    known = {f.get("field_name") for f in fields}
+    projected = frozenset(name for name in field_names if name in known)
+    return projected or None
+
+
+def _scan_matching(access_token: str, app_token: str, table_id: str, view_id: Optional[str],
+                   accept: Callable[[Dict], bool], limit: int, max_scan: Optional[int],
+                   field_names: Optional[AbstractSet[str]] = None) -> Optional[TableSnapshot]:
+    """
+    逐页拉取并在本地筛选：凑够 limit 条命中记录或扫描满 max_scan 行后停止
+
+    快照的 complete 表示前 max_scan 行中的命中记录已全部找到
+    """
+    params: Dict[str, Any] = {}
+    if view_id:
+        params["view_id"] = view_id
+    if field_names is not None:
+        params["field_names"] = json.dumps(sorted(field_names), ensure_ascii=False)
+    page_size = AdaptivePageSize(limit, max_scan)
+
+    matched: List[Dict] = []
+    nbytes = 0
+    try:
+        for items, size in iter_record_pages(access_token, app_token, table_id, params, page_size):
+            nbytes += size
+            if max_scan is not None:
+                items = items[:max_scan - page_size.seen]
+            hits = [r for r in items if accept(r)]
+            page_size.observe(len(items), len(hits))
+            matched.extend(hits)
+            if len(matched) >= limit:
+                return TableSnapshot(matched[:limit], False, nbytes, field_names)
+            if max_scan is not None and page_size.seen >= max_scan:
+                break
+        return TableSnapshot(matched, True, nbytes, field_names)
+
+    except FeishuAPIError as e:
+        print(f"获取表格记录失败: {str(e)}")
+    except Exception as e:
+        print(f"获取表格记录时发生错误: {str(e)}")
+
+    return TableSnapshot(matched, False, nbytes, field_names) if matched else None
+
+
+def _cached_scan(key: Tuple, max_rows: Optional[int], field_names: Optional[AbstractSet[str]],
+                 scan: Callable[[], Optional[TableSnapshot]]) -> Optional[TableSnapshot]:
+    """依次尝试快照缓存、合并中的扫描，最后才真正执行 scan"""
+    snapshot = snapshot_cache.get(key, max_rows, field_names)
+    if snapshot is not None:
+        print(f"⚡ 使用缓存的表格快照（{len(snapshot.records)} 条记录）")
+        record_cache_hit("快照缓存", len(snapshot.records))
+        return snapshot
+
+    snapshot = _single_flight.do(key, max_rows, scan, field_names)
+    # 中途失败的扫描不进入快照缓存
+    if snapshot is not None and (snapshot.complete or (max_rows is not None and len(snapshot.records) >= max_rows)):
+        snapshot_cache.put(key, snapshot)
+    return snapshot
+
+
+def _head(records: List[Dict], count: Optional[int]) -> List[Dict]:
+    return records[:count] if count is not None else list(records)
+
+
+def _planned_matcher(accept: CompiledFilter, key: Tuple) -> PlannedMatcher:
+    """按该表格上观察到的通过率排序规则，并输出执行计划"""
+    check = accept.matcher(key)
+    if len(accept.rules) > 1:
+        print(f"🧭 筛选顺序：{check.plan}")
+    record_plan(check.plan)
+    return check
+
+
+def _describe_rules(accept: CompiledFilter, search_filter: Optional[Dict[str, Any]]) -> None:
+    """记录下推到服务端的条件与本地判定的规则（执行分析用）"""
+    pushdown = []
+    for cond in (search_filter or {}).get("conditions", []):
+        value = ",".join(map(str, cond.get("value") or []))
+        pushdown.append(f"{cond.get('field_name')} {cond.get('operator')}" + (f" {value}" if value else ""))
+    record_rules(pushdown, list(accept.labels))
+
+
+def _fetch_filtered(access_token: str, app_token: str, table_id: str, key: Tuple,
+                    max_rows: Optional[int], limit: Optional[int], view_id: Optional[str],
+                    filter_condition: str, field_names: Optional[Iterable[str]]) -> Optional[List[Dict]]:
+    """
+    返回满足筛选条件的前 min(max_rows, limit) 条记录（max_rows 与 limit 限制的都是命中条数，
+    与规则能否下推到服务端无关）：能下推时由服务端筛选，否则逐页拉取并在本地筛选，凑够即停止。
+    两者都为 None 时返回 None，由调用方拉取全部记录后在本地筛选
+    """
+    accept = compile_filter(filter_condition)
+    if not accept:
+        return None
+
+    wanted = limit if max_rows is None else max_rows if limit is None else min(max_rows, limit)
+
+    # 本地复核需要筛选条件中的列
+    if field_names is not None:
+        field_names = set(field_names) | set(accept.columns)
+
+    # 已有完整快照时直接在本地筛选
+    full = snapshot_cache.get(key, None, field_names)
+    if full is not None:
+        print(f"⚡ 在缓存的表格快照中筛选（{len(full.records)} 条记录）")
+        record_cache_hit("完整快照", len(full.records))
+        _describe_rules(accept, None)
+        # 大快照使用列式视图向量化筛选
+        matched = filter_snapshot(full, accept, wanted, key)
+        if matched is not None:
+            return matched
+        check = _planned_matcher(accept, key)
+        matched = []
+        for record in full.records:
+            if check(record):
+                matched.append(record)
+                if wanted is not None and len(matched) >= wanted:
+                    break
+        check.flush()
+        return matched
+
+    fields = fetch_table_fields(access_token, app_token, table_id)
+    projection = _projection(fields, field_names)
+    search_filter, exact = None, False
+    if fields is not None:
+        field_types = {f.get("field_name"): f.get("type") for f in fields}
+        search_filter, exact = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+    _describe_rules(accept, search_filter)
+
+    check = _planned_matcher(accept, key)
+    if search_filter is not None:
+        snapshot = _cached_scan(
+            key + ("filter", filter_condition), wanted, projection,
+            lambda: _search_scan(access_token, app_token, table_id, view_id, search_filter, check,
+                                 wanted, projection, exact),
+        )
+        check.flush()
+        if snapshot is not None:
+            print(f"🔎 服务端筛选命中 {len(snapshot.records)} 条记录" + ("" if exact else "（部分条件在本地判定）"))
+            return _head(snapshot.records, wanted)
+        print("⚠️ 服务端筛选不可用，改为拉取记录后在本地筛选")
+
+    if wanted is None:
+        return None
+
+    snapshot = _cached_scan(
+        key + ("scan", filter_condition), wanted, projection,
+        lambda: _scan_matching(access_token, app_token, table_id, view_id, check, wanted, None, projection),
+    )
+    check.flush()
+    if snapshot is None:
+        return None
+    print(f"🔎 逐页筛选得到 {len(snapshot.records)} 条记录")
+    return _head(snapshot.records, wanted)
+
+
+def _table_key(access_token: str, app_token: str, table_id: str, view_id: Optional[str]) -> Tuple:
+    return (token_cache.owner_of(access_token), app_token, table_id, view_id or "")
+
+
+def _mirror_scan(access_token: str, app_token: str, table_id: str,
+                 max_rows: Optional[int]) -> Optional[TableSnapshot]:
+    try:
+        from .feishu_mirror import scan_mirror
+    except ImportError:
+        from feishu_mirror import scan_mirror
+    return scan_mirror(access_token, app_token, table_id, max_rows)
+
+
+def fetch_table_records(access_token: str, app_token: str, table_id: str,
+                        max_rows: Optional[int] = None, view_id: Optional[str] = None,
+                        use_mirror: bool = False, filter_condition: str = "",
+                        field_names: Optional[Iterable[str]] = None,
+                        limit: Optional[int] = None) -> Optional[List[Dict]]:
+    """
+    获取表格记录（最多 max_rows 条，None 表示全部）
+
+    优先使用有效期内的快照；否则扫描表格（use_mirror 时先增量同步本地镜像再从镜像读取），
+    同一次执行内的相同扫描会被合并。失败时返回 None
+
+    传入 filter_condition 时，max_rows（以及 limit）限制的是满足条件的记录数：返回满足条件的前 max_rows 条记录，
+    无论规则是下推到服务端（records/search）还是在本地判定，凑够即停止分页；
+    max_rows 与 limit 都为 None 时返回全部记录，由调用方筛选
+
+    传入 field_names 时只请求这些字段（返回记录中可能包含更多字段）
+    """
+    key = _table_key(access_token, app_token, table_id, view_id)
+    if field_names is not None:
+        field_names = frozenset(field_names)
+    accept = compile_filter(filter_condition.strip()) if filter_condition.strip() else None
+    if accept and not use_mirror:
+        records = _fetch_filtered(access_token, app_token, table_id, key, max_rows, limit, view_id,
+                                  filter_condition.strip(), field_names)
+        if records is not None:
+            return records
+    if limit is not None:
+        max_rows = limit if max_rows is None else min(max_rows, limit)
+    wanted = max_rows
+    if accept:
+        # 镜像中的记录全部在本地筛选；max_rows 限制命中条数，因此读取全部记录
+        _describe_rules(accept, None)
+        max_rows = None
+
+    # 镜像按整张数据表保存全部字段，指定视图时仍直接扫描
+    if use_mirror and not view_id:
+        projection = None
+        scan = lambda: _mirror_scan(access_token, app_token, table_id, max_rows)
+    else:
+        projection = field_names
+        if field_names is not None and snapshot_cache.get(key, max_rows, field_names) is None:
+            projection = _projection(fetch_table_fields(access_token, app_token, table_id), field_names)
+        scan = lambda: _scan_records(access_token, app_token, table_id, view_id, max_rows, projection)
+
+    snapshot = _cached_scan(key, max_rows, projection, scan)
+    if snapshot is None:
+        return None
+    if accept and wanted is not None:
+        return accept.filter(snapshot.records)[:wanted]
+    return _head(snapshot.records, max_rows)
+
+
+def stream_table_records(access_token: str, app_token: str, table_id: str,
+                         max_rows: Optional[int] = None, view_id: Optional[str] = None,
+                         use_mirror: bool = False, filter_condition: str = "",
+                         field_names: Optional[Iterable[str]] = None,
+                         limit: Optional[int] = None, shard: Optional[Shard] = None) -> Iterator[Dict]:
+    """
+    流式读取：分页 → 筛选 → 分片 → 数量限制，逐条产出满足筛选条件（且属于 shard 分片）的记录
+
+    max_rows、limit 的含义与 fetch_table_records 相同（有筛选条件或分片时都限制产出的记录数，而不是扫描行数），
+    产出的记录已经过筛选；分片时计的是分片内的记录数。
+    内存中只保留当前页；调用方停止迭代时不再请求后续页面。
+    有效期内的快照直接迭代；命中记录体积不超过 STREAM_CACHE_MB 的完整扫描写入快照缓存，供后续执行复用。
+    第一页即失败时抛出 FeishuAPIError，中途失败时在已产出的记录处结束
+    """
+    condition = (filter_condition or "").strip()
+    accept = compile_filter(condition) if condition else None
+    if not accept:
+        accept = None
+        if limit is not None and shard is None:
+            max_rows = limit if max_rows is None else min(max_rows, limit)
+    wanted = limit if max_rows is None else max_rows if limit is None else min(max_rows, limit)
+    key = _table_key(access_token, app_token, table_id, view_id)
+    if field_names is not None:
+        field_names = frozenset(field_names) | frozenset(accept.columns if accept else ())
+    # 有筛选条件或分片时，产出的只是扫描到的记录的一部分
+    selective = accept is not None or shard is not None
+    shard_key = () if shard is None else ("shard",) + tuple(shard)
+
+    # 镜像与完整快照已在本地，直接筛选
+    full = None
+    if use_mirror and not view_id:
+        records = fetch_table_records(access_token, app_token, table_id, None if selective else max_rows,
+                                      use_mirror=True)
+        if records is None:
+            raise FeishuAPIError("无法读取本地镜像")
+        source, budget = records, None
+    else:
+        full = snapshot_cache.get(key, None, field_names)
+        source, budget = (full.records, None) if full is not None else (None, None)
+        if full is not None:
+            print(f"⚡ 在缓存的表格快照中读取（{len(full.records)} 条记录）")
+            record_cache_hit("完整快照", len(full.records))
+    if source is not None:
+        check = None
+        if accept is not None:
+            _describe_rules(accept, None)
+            # 大快照使用列式视图向量化筛选（分片在筛选之后判定，此时不能提前截断）
+            matched = filter_snapshot(full, accept, wanted if shard is None else None, key) if full else None
+            if matched is not None:
+                source = matched
+            else:
+                check = _planned_matcher(accept, key)
+        count = 0
+        try:
+            for record in source:
+                if in_shard(record, shard) and (check is None or check(record)):
+                    count += 1
+                    yield record
+                    if wanted is not None and count >= wanted:
+                        return
+        finally:
+            if check is not None:
+                check.flush()
+        return
+
+    fields = fetch_table_fields(access_token, app_token, table_id)
+    projection = _projection(fields, field_names) if field_names is not None else None
+    search_filter, exact = None, False
+    if accept is not None and fields is not None:
+        field_types = {f.get("field_name"): f.get("type") for f in fields}
+        search_filter, exact = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+    if accept is not None:
+        _describe_rules(accept, search_filter)
+
+    if search_filter is not None:
+        # 服务端筛选
+        cache_key, cache_rows = key + ("filter", condition) + shard_key, wanted
+        body: Dict[str, Any] = {"filter": search_filter}
+        if view_id:
+            body["view_id"] = view_id
+        if projection is not None:
+            body["field_names"] = sorted(projection)
+        page_size: PageSize = AdaptivePageSize(wanted, initial_rate=1.0 if exact else 0.5)
+        pages = iter_search_pages(access_token, app_token, table_id, body, page_size)
+    else:
+        # 列表接口：有筛选条件或分片时逐页在本地判定，同样凑够 wanted 条命中记录即停止
+        if selective:
+            cache_key, cache_rows = key + ("scan", condition) + shard_key, wanted
+            page_size = AdaptivePageSize(wanted)
+        else:
+            budget = max_rows
+            cache_key, cache_rows = key, max_rows
+            page_size = min(max_rows, MAX_PAGE_SIZE) if max_rows else MAX_PAGE_SIZE
+        params: Dict[str, Any] = {}
+        if view_id:
+            params["view_id"] = view_id
+        if projection is not None:
+            params["field_names"] = json.dumps(sorted(projection), ensure_ascii=False)
+        pages = iter_record_pages(access_token, app_token, table_id, params, page_size)
+
+    cached = snapshot_cache.get(cache_key, cache_rows, projection)
+    if cached is not None:
+        print(f"⚡ 使用缓存的表格快照（{len(cached.records)} 条记录）")
+        record_cache_hit("快照缓存", len(cached.records))
+        yield from cached.records[:wanted] if wanted is not None else cached.records
+        return
+
+    check = _planned_matcher(accept, key) if accept else None
+    buffer: Optional[List[Dict]] = [] if snapshot_cache.enabled else None
+    nbytes = seen = matched = 0
+    stopped = False
+    try:
+        for items, size in pages:
+            nbytes += size
+            if budget is not None:
+                items = items[:budget - seen]
+            seen += len(items)
+            hits = 0
+            for record in items:
+                if in_shard(record, shard) and (check is None or check(record)):
+                    hits += 1
+                    matched += 1
+                    if buffer is not None:
+                        buffer.append(record)
+                    yield record
+                    if wanted is not None and matched >= wanted:
+                        stopped = True
+                        break
+            if isinstance(page_size, AdaptivePageSize):
+                page_size.observe(len(items), hits)
+            if buffer is not None and nbytes > STREAM_CACHE_MB * 1024 * 1024:
+                buffer = None
+            if stopped or (budget is not None and seen >= budget):
+                break
+    except FeishuAPIError as e:
+        if not seen:
+            raise
+        print(f"获取表格记录失败: {str(e)}")
+        return
+    except Exception as e:
+        # 网络中断、超时或 HTTP 错误：已产出的记录照常返回（不写入快照缓存）
+        if not seen:
+            raise
+        print(f"获取表格记录时发生错误: {str(e)}")
+        return
+    finally:
+        if check is not None:
+            check.flush()
+
+    if buffer is not None:
+        exhausted = not stopped and (budget is None or seen < budget)
+        snapshot_cache.put(cache_key, TableSnapshot(buffer, exhausted, nbytes, projection))
+
+
+def _encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("游标格式无效，请清空游标后重新开始")
+    if not isinstance(state, dict) or not isinstance(state.get("o"), int) or not isinstance(state.get("n"), int):
+        raise ValueError("游标格式无效，请清空游标后重新开始")
+    return state
+
+
+def read_page(access_token: str, app_token: str, table_id: str, cursor: str = "", page_size: int = 20,
+              view_id: Optional[str] = None, filter_condition: str = "",
+              field_names: Optional[Iterable[str]] = None) -> Tuple[List[Dict], str]:
+    """
+    游标分页读取：从 cursor 处继续，返回 (最多 page_size 条满足筛选条件的记录, 下一页游标)；
+    cursor 为空表示从头开始，返回的游标为空表示已读完
+
+    游标内含飞书的 page_token、该页请求的条数与页内偏移（上次停在页中间时），以及表格与筛选条件的指纹。
+    每次只从上次停下的位置继续，逐批读完整张表的总代价与表格行数成正比；
+    停在页中间时该页写入快照缓存，下一批通常无需重新请求。接口报错时抛出 FeishuAPIError，游标不匹配时抛出 ValueError
+    """
+    condition = (filter_condition or "").strip()
+    accept = compile_filter(condition) if condition else None
+    if not accept:
+        accept = None
+    key = _table_key(access_token, app_token, table_id, view_id)
+    if field_names is not None:
+        field_names = frozenset(field_names) | frozenset(accept.columns if accept else ())
+
+    fields = fetch_table_fields(access_token, app_token, table_id)
+    projection = _projection(fields, field_names) if field_names is not None else None
+    search_filter, exact = None, False
+    if accept is not None and fields is not None:
+        field_types = {f.get("field_name"): f.get("type") for f in fields}
+        search_filter, exact = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+        _describe_rules(accept, search_filter)
+    mode = "search" if search_filter is not None else "list"
+
+    # 两种接口的 page_token 不通用，游标只能在同一表格、同一筛选条件与读取方式下继续
+    fingerprint = hashlib.sha1(f"{app_token}/{table_id}/{view_id or ''}/{condition}/{mode}".encode("utf-8")).hexdigest()[:16]
+    state = _decode_cursor(cursor) if cursor else {"q": fingerprint, "t": None, "n": 0, "o": 0}
+    if state.get("q") != fingerprint:
+        raise ValueError("游标与当前表格或筛选条件不匹配，请清空游标后重新开始")
+
+    if accept is None:
+        sizes: PageSize = page_size
+    elif search_filter is not None:
+        sizes = AdaptivePageSize(page_size, initial_rate=1.0 if exact else 0.5)
+    else:
+        sizes = AdaptivePageSize(page_size)
+
+    check = _planned_matcher(accept, key) if accept else None
+    # next_hint 为游标记下的该页之后的 page_token（"" 表示该页是最后一页，None 表示未知）
+    token, size, offset, next_hint = state.get("t"), state["n"], state["o"], state.get("x")
+    matched: List[Dict] = []
+    try:
+        while True:
+            if size <= 0:
+                size = min(MAX_PAGE_SIZE, max(1, _page_size_value(sizes)))
+            page_key = key + ("page", mode, condition, token, size)
+            cached = snapshot_cache.get(page_key, None, projection) if next_hint is not None else None
+            if cached is not None:
+                items, next_token = cached.records, next_hint or None
+                record_cache_hit("分页缓存", len(items) - offset)
+            else:
+                if search_filter is not None:
+                    body: Dict[str, Any] = {"filter": search_filter}
+                    if view_id:
+                        body["view_id"] = view_id
+                    if projection is not None:
+                        body["field_names"] = sorted(projection)
+                    request_page = _search_page_request(access_token, app_token, table_id, body, size)
+                else:
+                    params: Dict[str, Any] = {}
+                    if view_id:
+                        params["view_id"] = view_id
+                    if projection is not None:
+                        params["field_names"] = json.dumps(sorted(projection), ensure_ascii=False)
+                    request_page = _record_page_request(access_token, app_token, table_id, params, size)
+                items, nbytes, next_token = _fetch_page(request_page, token)
+                record_page(len(items), nbytes)
+                if search_filter is not None:
+                    items = [normalize_search_record(item) for item in items]
+                page = TableSnapshot(items, True, nbytes, projection)
+
+            hits = 0
+            stop_at = None
+            for index in range(offset, len(items)):
+                record = items[index]
+                if check is None or check(record):
+                    hits += 1
+                    matched.append(record)
+                    if len(matched) >= page_size:
+                        stop_at = index + 1
+                        break
+            if isinstance(sizes, AdaptivePageSize):
+                sizes.observe((stop_at or len(items)) - offset, hits)
+
+            if stop_at is not None and stop_at < len(items):
+                # 停在页中间：下一批从该页的 stop_at 处继续
+                if cached is None:
+                    snapshot_cache.put(page_key, page)
+                return matched, _encode_cursor({"q": fingerprint, "t": token, "n": size, "o": stop_at,
+                                                "x": next_token or ""})
+            if next_token is None:
+                return matched, ""
+            if stop_at is not None:
+                return matched, _encode_cursor({"q": fingerprint, "t": next_token, "n": 0, "o": 0})
+            token, size, offset, next_hint = next_token, 0, 0, None
+    finally:
+        if check is not None:
+            check.flush()
+
+
+def invalidate_table(app_token: str, table_id: str) -> None:
+    """表格被本插件写入后调用，使已读取的记录结果和快照失效"""
+    def matches(key) -> bool:
+        return key[1] == app_token and key[2] == table_id
+
+    _single_flight.forget(matches)
+    snapshot_cache.invalidate(matches)
+    with _revision_lock:
+        _revision_cache.pop((app_token, table_id), None)
+
+
+def fetch_update_targets(access_token: str, app_token: str, table_id: str, max_scan: Optional[int],
+                         filter_condition: str = "",
+                         field_names: Optional[Iterable[str]] = None) -> Optional[List[Dict]]:
+    """
+    读取即将被更新（覆盖写入）的记录：先使该表缓存的快照与合并中的扫描失效，再直接读取表格，不使用本地镜像。
+    要覆盖哪些行必须按表格的当前内容决定，否则可能改写已不再满足条件的行，或漏掉新增的行
+
+    max_scan 限制的是扫描的行数：只在表格（按表格顺序）前 max_scan 行中筛选，筛选条件不下推到服务端，
+    以免更新范围随规则能否下推而扩大到整张表
+    """
+    invalidate_table(app_token, table_id)
+    condition = (filter_condition or "").strip()
+    accept = compile_filter(condition) if condition else None
+    if accept and field_names is not None:
+        field_names = set(field_names) | set(accept.columns)
+    records = fetch_table_records(access_token, app_token, table_id, max_scan, field_names=field_names)
+    if records is None or not accept:
+        return records
+    return accept.filter(records)
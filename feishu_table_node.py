@@ -5,10 +5,24 @@
 
 import json
 import re
-import requests
 from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from .feishu_client import get_tenant_access_token, http_get
+    from .feishu_filter import Shard, condition_columns, filter_records, node_shard, shard_records, split_column_names
+    from .feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, join_rows, normalize_separator, row_formatter
+    from .feishu_profile import attach_profile, explain, lap, record_matched
+    from .feishu_records import fetch_table_records, read_fingerprint, remember_config, stream_table_records
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from feishu_client import get_tenant_access_token, http_get
+    from feishu_filter import Shard, condition_columns, filter_records, node_shard, shard_records, split_column_names
+    from feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, join_rows, normalize_separator, row_formatter
+    from feishu_profile import attach_profile, explain, lap, record_matched
+    from feishu_records import fetch_table_records, read_fingerprint, remember_config, stream_table_records
+
 
 class FeishuTableNode:
     """
@@ -20,10 +34,6 @@ class FeishuTableNode:
     3. 支持按条件筛选行（文本、图片、复选框等）
     """
     
-    def __init__(self):
-        self.access_token = None
-        self.token_expires_at = 0
-        
     @classmethod
     def INPUT_TYPES(s):
         """
@@ -48,7 +58,8 @@ class FeishuTableNode:
                     "default": 1000,
                     "min": 1,
                     "max": 10000,
-                    "step": 1
+                    "step": 1,
+                    "tooltip": "最多获取的记录数；填写了筛选条件时为满足条件的记录数（无论在服务端还是本地筛选）"
                 }),
                 "结果限制": ("INT", {
                     "default": 0,
@@ -60,40 +71,51 @@ class FeishuTableNode:
                     "multiline": True,
                     "default": " | ",
                     "placeholder": "自定义列分隔符，默认为 ' | '。例如：\n- 使用逗号：, \n- 使用分号：; \n- 使用制表符：\\t\n- 使用换行：\\n\n- 使用自定义符号：→\n- 使用多个字符：---\n- 留空则使用默认分隔符"
+                }),
+                "执行分析": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "附加执行分析",
+                    "label_off": "关闭"
+                }),
+                "输出格式": (list(OUTPUT_FORMATS), {
+                    "default": MARKER_FORMAT
+                }),
+                "分片序号": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
+                }),
+                "分片总数": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 64,
+                    "step": 1
                 })
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
             }
         }
     
-    RETURN_TYPES = ("STRING", "STRING", "IMAGE")
-    RETURN_NAMES = ("表格数据", "状态信息", "使用说明")
+    RETURN_TYPES = ("STRING", "STRING", "IMAGE", "STRING")
+    RETURN_NAMES = ("表格数据", "状态信息", "使用说明", "逐行数据")
+    # 逐行数据：每条记录一个 STRING（按输出格式格式化），供下游节点逐条处理
+    OUTPUT_IS_LIST = (False, False, False, True)
     
-    FUNCTION = "get_table_data"
+    FUNCTION = "get_table_data_async" if ASYNC_NODES_SUPPORTED else "get_table_data"
     CATEGORY = "飞书工具"
+
+    @classmethod
+    def IS_CHANGED(s, 飞书配置=None, unique_id=None, **kwargs):
+        # 表格内容与其余输入都未变化时复用上次的输出；表格被修改后重新执行
+        return read_fingerprint((s.__name__, unique_id), 飞书配置, kwargs)
     
     def get_access_token(self, app_id: str, app_secret: str) -> Optional[str]:
         """
-        获取飞书访问令牌
+        获取飞书访问令牌（进程内共享缓存，到期前自动刷新）
         """
-        try:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            payload = {
-                "app_id": app_id,
-                "app_secret": app_secret
-            }
-            
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("code") == 0:
-                return data.get("tenant_access_token")
-            else:
-                print(f"获取访问令牌失败: {data.get('msg', '未知错误')}")
-                return None
-                
-        except Exception as e:
-            print(f"获取访问令牌时发生错误: {str(e)}")
-            return None
+        return get_tenant_access_token(app_id, app_secret)
     
     def extract_table_info(self, table_url: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -140,7 +162,7 @@ class FeishuTableNode:
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = http_get(url, headers=headers, timeout=30)
             response.raise_for_status()
             
             data = response.json()
@@ -154,162 +176,46 @@ class FeishuTableNode:
             print(f"获取表格元数据时发生错误: {str(e)}")
             return None
     
-    def get_table_records(self, access_token: str, app_id: str, table_id: str, max_rows: int = 1000) -> Optional[List[Dict]]:
+    def get_table_records(self, access_token: str, app_id: str, table_id: str, max_rows: int = 1000,
+                          use_mirror: bool = False, filter_condition: str = "",
+                          field_names: Optional[List[str]] = None, limit: Optional[int] = None) -> Optional[List[Dict]]:
         """
-        获取表格记录
+        获取表格记录（同一次执行内与其它节点共享相同的扫描结果）
+        传入筛选条件时尽量由服务端筛选，只返回命中的记录；传入 field_names 时只拉取这些列；
+        同时传入 limit 时，凑够 limit 条命中记录后即停止分页
         """
-        try:
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_id}/tables/{table_id}/records"
-            params = {
-                "page_size": min(max_rows, 100),  # 飞书API单次最多100条
-                "page_token": ""
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
-            
-            all_records = []
-            
-            while len(all_records) < max_rows:
-                response = requests.get(url, headers=headers, params=params, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                if data.get("code") != 0:
-                    print(f"获取表格记录失败: {data.get('msg', '未知错误')}")
-                    break
-                
-                records = data.get("data", {}).get("items", [])
-                if not records:
-                    break
-                
-                all_records.extend(records)
-                
-                # 检查是否有下一页
-                page_token = data.get("data", {}).get("page_token")
-                if not page_token:
-                    break
-                    
-                params["page_token"] = page_token
-                
-                # 防止无限循环
-                if len(all_records) >= max_rows:
-                    break
-            
-            return all_records[:max_rows]
-            
-        except Exception as e:
-            print(f"获取表格记录时发生错误: {str(e)}")
-            return None
+        return fetch_table_records(access_token, app_id, table_id, max_rows, use_mirror=use_mirror,
+                                   filter_condition=filter_condition, field_names=field_names, limit=limit)
+    
+    def stream_output(self, access_token: str, app_id: str, table_id: str, max_rows: int, use_mirror: bool,
+                      filter_condition: str, field_names: List[str], limit: Optional[int],
+                      columns: List[str], column_separator: str,
+                      output_format: str = MARKER_FORMAT, shard: Optional[Shard] = None) -> List[str]:
+        """
+        流式读取并逐行格式化：分页 → 筛选 → 分片 → 数量限制 → 格式化，凑够 limit 条后即停止分页
+        """
+        records = stream_table_records(access_token, app_id, table_id, max_rows, use_mirror=use_mirror,
+                                       filter_condition=filter_condition, field_names=field_names, limit=limit,
+                                       shard=shard)
+        fmt = row_formatter(output_format, columns, column_separator)
+        return [fmt(record.get("fields", {}), i) for i, record in enumerate(records, 1)]
     
     def filter_records(self, records: List[Dict], filter_columns: str, filter_condition: str) -> List[Dict]:
         """
         根据条件筛选记录（支持语法：列名+关键词 / 列名-关键词，按行一条规则）
         """
-        if not records:
-            return []
-
-        # 解析条件语法
-        include_conditions: List[Tuple[str, str]] = []
-        exclude_conditions: List[Tuple[str, str]] = []
-
-        if filter_condition.strip():
-            for raw_line in filter_condition.strip().split('\n'):
-                line = raw_line.strip()
-                if not line:
-                    continue
-                # 优先解析 + / - 语法
-                m = re.match(r"^\s*([^+\-=\s]+)\s*([+-])\s*(.+?)\s*$", line)
-                if m:
-                    col = m.group(1).strip()
-                    op = m.group(2)
-                    val = m.group(3).strip()
-                    if op == '+':
-                        include_conditions.append((col, val))
-                    else:
-                        exclude_conditions.append((col, val))
-                    continue
-                # 兼容旧格式：列名=值
-                if '=' in line:
-                    col, val = line.split('=', 1)
-                    include_conditions.append((col.strip(), val.strip()))
-
-        def value_contains(field_val: Any, needle: str) -> bool:
-            """判断字段值是否包含子串（大小写不敏感）。支持标量/列表。"""
-            if field_val is None:
-                return False
-            needle_l = str(needle).lower()
-            if isinstance(field_val, list):
-                for v in field_val:
-                    if needle_l in str(v).lower():
-                        return True
-                return False
-            return needle_l in str(field_val).lower()
-        
-        def is_empty_value(field_val: Any) -> bool:
-            """判断字段值是否为空"""
-            if field_val is None:
-                return True
-            if isinstance(field_val, str) and not field_val.strip():
-                return True
-            if isinstance(field_val, list) and len(field_val) == 0:
-                return True
-            return False
-        
-        def check_condition(field_val: Any, condition: str) -> bool:
-            """检查字段值是否满足条件"""
-            if condition == "空值":
-                return is_empty_value(field_val)
-            elif condition == "非空值":
-                return not is_empty_value(field_val)
-            else:
-                # 普通关键词匹配
-                return value_contains(field_val, condition)
-
-        filtered: List[Dict] = []
-        for rec in records:
-            fields = rec.get('fields', {})
-
-            # include 判定：若无 include 条件，则视为通过；否则要求全部命中
-            include_ok = True
-            if include_conditions:
-                include_ok = True
-                for col, val in include_conditions:
-                    # 当字段缺失时，将其视为"空值"
-                    field_value = fields.get(col, None)
-                    if not check_condition(field_value, val):
-                        include_ok = False
-                        break
-
-            # exclude 判定：任一命中即排除
-            # 注意：当字段缺失时将其视为“空值”，以便条件如 列名-空值 能排除该记录
-            exclude_hit = False
-            for col, val in exclude_conditions:
-                field_value = fields.get(col, None)
-                if check_condition(field_value, val):
-                    exclude_hit = True
-                    break
-
-            if include_ok and not exclude_hit:
-                filtered.append(rec)
-
-        return filtered
+        return filter_records(records, filter_condition)
     
-    def format_output(self, records: List[Dict], filter_columns: str, column_separator: str = " | ") -> str:
+    def format_output(self, records: List[Dict], filter_columns: str, column_separator: str = " | ",
+                      output_format: str = MARKER_FORMAT) -> str:
         """
-        格式化输出数据（使用详细格式和自定义分隔符，字段内容用***标记）
+        格式化输出数据（默认使用详细格式和自定义分隔符，字段内容用***标记；也可输出 JSON / JSONL / CSV）
         """
-        if not records:
+        if not records and output_format == MARKER_FORMAT:
             return "[]"
         
-        # 处理自定义分隔符，如果为空则使用默认分隔符
-        if column_separator is None or column_separator == "":
-            column_separator = " | "
-        
-        # 处理特殊字符转义
-        column_separator = column_separator.replace('\\n', '\n').replace('\\t', '\t')
+        # 处理自定义分隔符（为空则使用默认分隔符）与特殊字符转义
+        column_separator = normalize_separator(column_separator)
         
         # 解析要筛选的列（未填写列名则不返回任何数据）
         if not filter_columns.strip():
@@ -321,79 +227,100 @@ class FeishuTableNode:
         if not target_columns:
             return "[]"
         
-        # 使用详细格式进行格式化，字段内容用***标记
-        lines = []
-        for i, record in enumerate(records, 1):
-            fields = record.get("fields", {})
-            line_parts = []
-            for col in target_columns:
-                if col in fields:
-                    value = fields[col]
-                    if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
-                        line_parts.append(f"获取结果{i}&{col}***(空)***")
-                    elif isinstance(value, list):
-                        content = ', '.join(map(str, value))
-                        line_parts.append(f"获取结果{i}&{col}***({content})***")
-                    else:
-                        line_parts.append(f"获取结果{i}&{col}***({value})***")
-                else:
-                    line_parts.append(f"获取结果{i}&{col}***(空)***")
-            
-            # 使用自定义分隔符连接各列数据
-            line_content = column_separator.join(line_parts)
-            lines.append(f"{line_content}&获取结果{i}#")
-        
-        return "\n".join(lines)
+        # 每条记录格式化一次，再整体拼接
+        return format_records(records, target_columns, output_format, column_separator)[0]
+    
+    async def get_table_data_async(self, **kwargs):
+        """
+        协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环
+        """
+        return await run_blocking(self.get_table_data, **kwargs)
     
     def get_table_data(self, 飞书配置: dict, 筛选列名: str, 筛选条件: str, 
-                      最大行数: int = 1000, 结果限制: int = 0, 列分隔符: str = " | ") -> Tuple[str, str, Any]:
+                      最大行数: int = 1000, 结果限制: int = 0, 列分隔符: str = " | ",
+                      执行分析: bool = False, 输出格式: str = MARKER_FORMAT,
+                      分片序号: int = 1, 分片总数: int = 1, unique_id=None) -> Tuple[str, str, Any, List[str]]:
         """
-        主要的执行方法
+        主要的执行方法（打开执行分析时，在状态信息末尾附加执行计划与各阶段耗时）
+        分片总数大于 1 时，只保留 record_id 哈希到第「分片序号」片的记录，多个实例可无协调地分担一张表
         """
+        remember_config((type(self).__name__, unique_id), 飞书配置)
+        with explain("FeishuTableNode", 执行分析) as profile:
+            result = self._get_table_data(飞书配置, 筛选列名, 筛选条件, 最大行数, 结果限制, 列分隔符, 输出格式,
+                                          分片序号, 分片总数)
+        return attach_profile(result, profile)
+    
+    def _get_table_data(self, 飞书配置: dict, 筛选列名: str, 筛选条件: str,
+                        最大行数: int, 结果限制: int, 列分隔符: str,
+                        输出格式: str, 分片序号: int = 1, 分片总数: int = 1) -> Tuple[str, str, Any, List[str]]:
         try:
+            shard = node_shard(分片序号, 分片总数)
             # 从配置中获取认证信息
             app_id = 飞书配置.get("app_id", "")
             app_secret = 飞书配置.get("app_secret", "")
             table_url = 飞书配置.get("table_url", "")
             url_app_id = 飞书配置.get("url_app_id", "")
             table_id = 飞书配置.get("table_id", "")
+            use_mirror = 飞书配置.get("local_mirror", False)
             
             # 验证配置
             if not app_id or not app_secret or not table_url:
                 usage_image = self._load_usage_image()
-                return "", "错误：配置信息不完整，请检查飞书配置节点", usage_image
+                return "", "错误：配置信息不完整，请检查飞书配置节点", usage_image, []
             
             if not url_app_id or not table_id:
                 usage_image = self._load_usage_image()
-                return "", "错误：表格链接格式无效，请检查飞书配置节点", usage_image
+                return "", "错误：表格链接格式无效，请检查飞书配置节点", usage_image, []
             
             # 1. 获取访问令牌
             print("正在获取飞书访问令牌...")
             access_token = self.get_access_token(app_id, app_secret)
             if not access_token:
                 usage_image = self._load_usage_image()
-                return "", "错误：无法获取访问令牌，请检查App ID和App Secret", usage_image
+                return "", "错误：无法获取访问令牌，请检查App ID和App Secret", usage_image, []
+            lap("auth")
             
             print(f"应用ID: {url_app_id}")
             print(f"表格ID: {table_id}")
             
             # 2. 获取表格记录
             print("正在获取表格数据...")
-            records = self.get_table_records(access_token, url_app_id, table_id, 最大行数)
-            if records is None:
-                usage_image = self._load_usage_image()
-                return "", "错误：无法获取表格数据", usage_image
-            
-            print(f"成功获取 {len(records)} 条记录")
+            # 只拉取输出列与筛选条件中的列
+            needed_fields = split_column_names(筛选列名) + condition_columns(筛选条件)
+            # 设置了结果限制时，凑够结果后即停止分页
+            limit = 结果限制 if isinstance(结果限制, int) and 结果限制 > 0 else None
+            output_columns = split_column_names(筛选列名)
+            output_lines = None
+            if output_columns:
+                # 流式读取：逐页筛选、限制数量并格式化，内存中只保留当前页与输出
+                output_lines = self.stream_output(access_token, url_app_id, table_id, 最大行数, use_mirror,
+                                                  筛选条件, needed_fields, limit, output_columns,
+                                                  normalize_separator(列分隔符), 输出格式, shard)
+                print(f"成功获取 {len(output_lines)} 条记录")
+                lap("stream")
+            else:
+                records = self.get_table_records(access_token, url_app_id, table_id, 最大行数,
+                                                 use_mirror=use_mirror, filter_condition=筛选条件,
+                                                 field_names=needed_fields,
+                                                 limit=limit if shard is None else None)
+                if records is None:
+                    usage_image = self._load_usage_image()
+                    return "", "错误：无法获取表格数据", usage_image, []
+                # 分片在数量限制之前进行（与筛选的先后不影响结果）
+                records = shard_records(records, shard)
+                
+                print(f"成功获取 {len(records)} 条记录")
+                lap("fetch")
             
             # 3. 筛选记录
-            if 筛选条件.strip():
+            if output_lines is None and 筛选条件.strip():
                 print("正在根据条件筛选记录...")
                 records = self.filter_records(records, 筛选列名, 筛选条件)
                 print(f"筛选后剩余 {len(records)} 条记录")
+                lap("filter")
             
             # 3.1 数量限制（0 表示不限制）
-            if isinstance(结果限制, int) and 结果限制 > 0:
+            if output_lines is None and isinstance(结果限制, int) and 结果限制 > 0:
                 original_count = len(records)
                 records = records[:结果限制]
                 print(f"已按数量限制从 {original_count} 截取为 {len(records)} 条")
@@ -404,14 +331,14 @@ class FeishuTableNode:
             # 解析要筛选的列（未填写列名则不返回任何数据）
             if not 筛选列名.strip():
                 usage_image = self._load_usage_image()
-                return "", "提示：未填写列名（第一个框），本次不返回任何数据。请填写要输出的列名，每行一个。", usage_image
+                return "", "提示：未填写列名（第一个框），本次不返回任何数据。请填写要输出的列名，每行一个。", usage_image, []
             
             # 兼容多种分隔符：英文逗号, 中文逗号，顿号、英文/中文分号，以及换行/回车
             parts = re.split(r"[\,\uFF0C\u3001;\uFF1B\n\r]+", 筛选列名.strip())
             target_columns = [col.strip() for col in parts if col.strip()]
             if not target_columns:
                 usage_image = self._load_usage_image()
-                return "", "提示：解析列名为空，请检查第一个框的内容。", usage_image
+                return "", "提示：解析列名为空，请检查第一个框的内容。", usage_image, []
             
             print(f"将只显示以下列: {', '.join(target_columns)}")
             
@@ -420,26 +347,35 @@ class FeishuTableNode:
             if 列分隔符 is None or 列分隔符 == "":
                 列分隔符 = " | "
             
-            output_data = self.format_output(records, 筛选列名, 列分隔符)
+            if output_lines is None:
+                output_data, output_lines = format_records(records, target_columns, 输出格式,
+                                                           normalize_separator(列分隔符))
+            else:
+                output_data = join_rows(输出格式, output_lines, target_columns)
+            result_count = len(output_lines)
+            lap("format")
+            record_matched(result_count)
             
-            status_msg = f"成功获取表格数据，共 {len(records)} 条记录"
+            status_msg = f"成功获取表格数据，共 {result_count} 条记录"
             if target_columns:
                 status_msg += f"，显示列: {', '.join(target_columns)}"
             if 筛选条件.strip():
                 status_msg += "，已应用筛选规则"
+            if shard is not None:
+                status_msg += f"，分片 {分片序号}/{分片总数}"
             if isinstance(结果限制, int) and 结果限制 > 0:
                 status_msg += f"，已限制返回 {结果限制} 条"
             
             # 加载使用说明图片
             usage_image = self._load_usage_image()
             
-            return output_data, status_msg, usage_image
+            return output_data, status_msg, usage_image, output_lines
             
         except Exception as e:
             error_msg = f"执行过程中发生错误: {str(e)}"
             print(error_msg)
             usage_image = self._load_usage_image()
-            return "", error_msg, usage_image
+            return "", error_msg, usage_image, []
             
         except Exception as e:
             error_msg = f"执行过程中发生错误: {str(e)}"
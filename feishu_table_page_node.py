@@ -0,0 +1,136 @@
+"""
+飞书多维表格分页读取节点
+按游标逐批读取满足筛选条件的记录，适合批量处理大表：每次只从上一批停下的位置继续，不必重新翻页到同一偏移
+"""
+
+from typing import List, Tuple
+
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from .feishu_client import get_tenant_access_token
+    from .feishu_filter import condition_columns, split_column_names
+    from .feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from .feishu_records import FeishuAPIError, read_fingerprint, read_page, remember_config
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from feishu_client import get_tenant_access_token
+    from feishu_filter import condition_columns, split_column_names
+    from feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from feishu_records import FeishuAPIError, read_fingerprint, read_page, remember_config
+
+
+class FeishuTablePageNode:
+    """
+    飞书多维表格分页读取节点
+
+    功能：
+    1. 传入游标与每页行数，返回下一批满足筛选条件的记录
+    2. 同时返回下一页游标（把它接回本节点的「游标」即可继续读取），读完时游标为空
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "飞书配置": ("FEISHU_CONFIG",),
+                "筛选列名": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "placeholder": "必填：输出的列名（每行一个）。例：\n文本\n内容\n进度"
+                }),
+                "筛选条件": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "placeholder": "可选：行筛选规则（每行一条），语法与「获取文本」节点相同"
+                }),
+                "游标": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "留空从第一批开始；继续读取时填入上一次输出的「下一页游标」"
+                }),
+                "每页行数": ("INT", {
+                    "default": 20,
+                    "min": 1,
+                    "max": 500,
+                    "step": 1
+                }),
+            },
+            "optional": {
+                "列分隔符": ("STRING", {
+                    "multiline": True,
+                    "default": " | ",
+                    "placeholder": "自定义列分隔符（仅标记文本格式使用），默认为 ' | '"
+                }),
+                "输出格式": (list(OUTPUT_FORMATS), {
+                    "default": MARKER_FORMAT
+                })
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "BOOLEAN", "STRING", "STRING")
+    RETURN_NAMES = ("表格数据", "下一页游标", "已读完", "状态信息", "逐行数据")
+    OUTPUT_IS_LIST = (False, False, False, False, True)
+
+    FUNCTION = "read_page_async" if ASYNC_NODES_SUPPORTED else "read_page"
+    CATEGORY = "飞书工具"
+
+    @classmethod
+    def IS_CHANGED(s, 飞书配置=None, unique_id=None, **kwargs):
+        # 表格内容与其余输入都未变化时复用上次的输出；表格被修改后重新执行
+        return read_fingerprint((s.__name__, unique_id), 飞书配置, kwargs)
+
+    async def read_page_async(self, **kwargs):
+        """协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环"""
+        return await run_blocking(self.read_page, **kwargs)
+
+    def read_page(self, 飞书配置: dict, 筛选列名: str, 筛选条件: str, 游标: str, 每页行数: int,
+                  列分隔符: str = " | ", 输出格式: str = MARKER_FORMAT,
+                  unique_id=None) -> Tuple[str, str, bool, str, List[str]]:
+        remember_config((type(self).__name__, unique_id), 飞书配置)
+        app_id = 飞书配置.get("app_id", "")
+        app_secret = 飞书配置.get("app_secret", "")
+        url_app_id = 飞书配置.get("url_app_id", "")
+        table_id = 飞书配置.get("table_id", "")
+        cursor = (游标 or "").strip()
+
+        if not app_id or not app_secret or not url_app_id or not table_id:
+            return "", cursor, False, "错误：配置信息不完整，请检查飞书配置节点", []
+        columns = split_column_names(筛选列名)
+        if not columns:
+            return "", cursor, False, "提示：未填写列名（第一个框），本次不返回任何数据。", []
+
+        access_token = get_tenant_access_token(app_id, app_secret)
+        if not access_token:
+            return "", cursor, False, "错误：无法获取访问令牌，请检查App ID和App Secret", []
+
+        try:
+            records, next_cursor = read_page(access_token, url_app_id, table_id, cursor, 每页行数,
+                                             filter_condition=筛选条件,
+                                             field_names=columns + condition_columns(筛选条件))
+        except (FeishuAPIError, ValueError) as e:
+            error_msg = f"分页读取失败: {str(e)}"
+            print(error_msg)
+            return "", cursor, False, error_msg, []
+        except Exception as e:
+            error_msg = f"执行过程中发生错误: {str(e)}"
+            print(error_msg)
+            return "", cursor, False, error_msg, []
+
+        output_data, rows = format_records(records, columns, 输出格式, normalize_separator(列分隔符))
+        finished = not next_cursor
+        status_msg = f"本批读取 {len(records)} 条记录" + ("，已读完全部记录" if finished else "，可用下一页游标继续")
+        print(f"📄 {status_msg}")
+        return output_data, next_cursor, finished, status_msg, rows
+
+
+# 节点注册映射（由 __init__.py 汇总导出）
+NODE_CLASS_MAPPINGS = {
+    "FeishuTablePageNode": FeishuTablePageNode,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "FeishuTablePageNode": "分页读取（飞书多维表格）",
+}
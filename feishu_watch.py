@@ -0,0 +1,151 @@
+"""
+监视多维表格中新增或修改的行（轮询代价与表格行数无关）
+- 每次轮询只发一个按「修改时间」列倒序排序、page_size 条的 search 请求，
+  从最新的行往旧读，遇到高水位以前（或已见过）的行即停止；只有一次改动的行超过 page_size 条时才继续翻页
+- 高水位 = 已报告过的最新修改时间 + 该时刻上已报告的 record_id（同一毫秒内修改的多行不会漏报或重复报告）
+- 筛选条件能下推的部分随同一请求发给服务端，其余在本地判定；不满足条件的改动行只推进高水位，不输出
+- 高水位保存在进程内存中，ComfyUI 重启后第一次轮询重新建立
+- 每次变更最多送达一次：返回记录时高水位即已前进，调用方（或下游节点）处理失败时这些变更不会再次返回
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .feishu_filter import build_search_filter, compile_filter, display_text, parse_number
+    from .feishu_records import fetch_table_fields, iter_search_pages
+except ImportError:
+    from feishu_filter import build_search_filter, compile_filter, display_text, parse_number
+    from feishu_records import fetch_table_fields, iter_search_pages
+
+
+_MODIFIED_TIME_TYPE = 1002
+
+
+class WatchMark:
+    """高水位：since 为已报告的最新修改时间（毫秒），seen 为修改时间等于 since 的已报告 record_id"""
+
+    __slots__ = ("since", "seen")
+
+    def __init__(self, since: int, seen: Iterable[str] = ()):
+        self.since = since
+        self.seen = frozenset(seen)
+
+    def covers(self, modified: int, record_id: str) -> bool:
+        """该行的这次修改是否已经报告过（或早于高水位）"""
+        return modified < self.since or (modified == self.since and record_id in self.seen)
+
+    def advance(self, changes: List[Tuple[int, str]]) -> "WatchMark":
+        """吸收本次发现的 (修改时间, record_id)，返回新的高水位"""
+        if not changes:
+            return self
+        newest = max(modified for modified, _ in changes)
+        if newest < self.since:
+            return self
+        seen = {record_id for modified, record_id in changes if modified == newest}
+        return WatchMark(newest, seen | self.seen if newest == self.since else seen)
+
+
+_marks: Dict[Tuple, WatchMark] = {}
+_marks_lock = threading.Lock()
+
+
+def modified_time_column(fields: Optional[List[Dict]], column: str = "") -> str:
+    """指定的修改时间列，或表格中第一个「最后更新时间」类型的列；找不到时抛出 ValueError"""
+    if fields is None:
+        raise ValueError("无法获取表格字段列表")
+    if column:
+        if not any(f.get("field_name") == column for f in fields):
+            raise ValueError(f"表格中没有名为「{column}」的列")
+        return column
+    for f in fields:
+        if f.get("type") == _MODIFIED_TIME_TYPE:
+            return f.get("field_name")
+    raise ValueError("表格中没有「最后更新时间」类型的列，请先在表格中添加一列")
+
+
+def modified_ms(value: Any) -> Optional[int]:
+    """修改时间列的毫秒时间戳；为空或无法解析时返回 None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    number = parse_number(display_text(value).strip()) if value else None
+    return int(number) if number is not None else None
+
+
+def reset_watch(key: Optional[Tuple] = None) -> None:
+    """清除高水位（key 为 None 时清除全部），下一次轮询重新建立"""
+    with _marks_lock:
+        if key is None:
+            _marks.clear()
+        else:
+            _marks.pop(key, None)
+
+
+def poll_changes(access_token: str, app_token: str, table_id: str, watch_key: Tuple = (),
+                 filter_condition: str = "", page_size: int = 20, modified_column: str = "",
+                 field_names: Optional[Iterable[str]] = None, view_id: Optional[str] = None,
+                 emit_existing: bool = False) -> Tuple[List[Dict], bool]:
+    """
+    返回 (自上次轮询以来新增或修改、且满足筛选条件的记录（按修改时间从旧到新）, 是否为首次轮询)
+
+    首次轮询只建立高水位、不返回记录（emit_existing 为 True 时返回最近修改的 page_size 条）。
+    接口报错时抛出 FeishuAPIError，找不到修改时间列时抛出 ValueError
+    """
+    fields = fetch_table_fields(access_token, app_token, table_id)
+    column = modified_time_column(fields, (modified_column or "").strip())
+    condition = (filter_condition or "").strip()
+    accept = compile_filter(condition) if condition else None
+    if not accept:
+        accept = None
+
+    key = (app_token, table_id, view_id or "", condition, column) + tuple(watch_key)
+    with _marks_lock:
+        mark = _marks.get(key)
+    first = mark is None
+
+    body: Dict[str, Any] = {"sort": [{"field_name": column, "desc": True}]}
+    if accept is not None:
+        field_types = {f.get("field_name"): f.get("type") for f in fields}
+        search_filter, _ = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+        if search_filter is not None:
+            body["filter"] = search_filter
+    if view_id:
+        body["view_id"] = view_id
+    if field_names is not None:
+        known = {f.get("field_name") for f in fields}
+        wanted = set(field_names) | {column} | set(accept.columns if accept else ())
+        body["field_names"] = sorted(name for name in wanted if name in known)
+
+    changes: List[Tuple[int, str]] = []
+    changed: List[Dict] = []
+    done = False
+    for items, _ in iter_search_pages(access_token, app_token, table_id, body, page_size):
+        for record in items:
+            record_id = record.get("record_id") or ""
+            modified = modified_ms(record.get("fields", {}).get(column))
+            if modified is None:
+                # 倒序排序时空值排在最后，之后都没有可比较的修改时间
+                done = True
+                break
+            if mark is not None and mark.covers(modified, record_id):
+                # 与高水位同一毫秒的行排序不确定，已报告过的跳过即可，更早的行才说明已经读到底
+                if modified < mark.since:
+                    done = True
+                    break
+                continue
+            changes.append((modified, record_id))
+            if accept is None or accept(record):
+                changed.append(record)
+        # 首次轮询只需要最新的一页来建立高水位
+        if done or first:
+            break
+
+    with _marks_lock:
+        _marks[key] = (_marks.get(key) or WatchMark(-1)).advance(changes)
+
+    if first and not emit_existing:
+        return [], True
+    changed.reverse()
+    return changed, first
@@ -0,0 +1,157 @@
+"""
+飞书多维表格变更监视节点
+轮询时只返回自上次执行以来新增或修改的行；没有变更时不输出，下游节点不会执行（见 feishu_watch）
+"""
+
+from typing import List, Tuple
+
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from .feishu_client import get_tenant_access_token
+    from .feishu_filter import split_column_names
+    from .feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from .feishu_records import FeishuAPIError
+    from .feishu_watch import poll_changes
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from feishu_client import get_tenant_access_token
+    from feishu_filter import split_column_names
+    from feishu_format import MARKER_FORMAT, OUTPUT_FORMATS, format_records, normalize_separator
+    from feishu_records import FeishuAPIError
+    from feishu_watch import poll_changes
+
+try:
+    # 较新的 ComfyUI 支持用 ExecutionBlocker 阻止下游节点执行
+    from comfy_execution.graph import ExecutionBlocker
+except Exception:
+    ExecutionBlocker = None
+
+
+class FeishuWatchNode:
+    """
+    飞书多维表格变更监视节点
+
+    功能：
+    1. 记住上次看到的最新修改时间，每次执行只用一个按修改时间倒序、每页行数条的请求查看最近的改动
+    2. 返回新增或修改且满足筛选条件的行（按修改时间从旧到新）
+    3. 没有变更时表格数据与逐行数据不输出（支持时阻止下游节点执行），配合自动队列即可低成本轮询
+
+    每次变更最多输出一次：本节点执行成功即视为已送达，下游节点失败时这批变更不会再次输出。
+    需要保证处理成功的场景，请在表格中用进度列标记结果，或改用「领取任务」节点
+    """
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "飞书配置": ("FEISHU_CONFIG",),
+                "筛选列名": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "placeholder": "必填：输出的列名（每行一个）。例：\n提示词\n进度"
+                }),
+                "筛选条件": ("STRING", {
+                    "multiline": True,
+                    "default": "",
+                    "placeholder": "可选：只关注满足条件的行（每行一条），语法与「获取文本」节点相同"
+                }),
+                "每页行数": ("INT", {
+                    "default": 20,
+                    "min": 1,
+                    "max": 500,
+                    "step": 1
+                }),
+            },
+            "optional": {
+                "修改时间列名": ("STRING", {
+                    "multiline": False,
+                    "default": "",
+                    "placeholder": "留空自动使用表格中的「最后更新时间」列"
+                }),
+                "首次返回现有行": ("BOOLEAN", {
+                    "default": False
+                }),
+                "列分隔符": ("STRING", {
+                    "multiline": True,
+                    "default": " | ",
+                    "placeholder": "自定义列分隔符（仅标记文本格式使用），默认为 ' | '"
+                }),
+                "输出格式": (list(OUTPUT_FORMATS), {
+                    "default": MARKER_FORMAT
+                })
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "INT", "STRING", "STRING")
+    RETURN_NAMES = ("表格数据", "变更行数", "状态信息", "逐行数据")
+    OUTPUT_IS_LIST = (False, False, False, True)
+
+    FUNCTION = "watch_async" if ASYNC_NODES_SUPPORTED else "watch"
+    CATEGORY = "飞书工具"
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        # 每次执行都要查看是否有新的变更
+        return float("nan")
+
+    async def watch_async(self, **kwargs):
+        """协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环"""
+        return await run_blocking(self.watch, **kwargs)
+
+    def watch(self, 飞书配置: dict, 筛选列名: str, 筛选条件: str, 每页行数: int, 修改时间列名: str = "",
+              首次返回现有行: bool = False, 列分隔符: str = " | ", 输出格式: str = MARKER_FORMAT,
+              unique_id=None) -> Tuple[str, int, str, List[str]]:
+        app_id = 飞书配置.get("app_id", "")
+        app_secret = 飞书配置.get("app_secret", "")
+        url_app_id = 飞书配置.get("url_app_id", "")
+        table_id = 飞书配置.get("table_id", "")
+
+        if not app_id or not app_secret or not url_app_id or not table_id:
+            return "", 0, "错误：配置信息不完整，请检查飞书配置节点", []
+        columns = split_column_names(筛选列名)
+        if not columns:
+            return "", 0, "提示：未填写列名（第一个框），本次不返回任何数据。", []
+
+        access_token = get_tenant_access_token(app_id, app_secret)
+        if not access_token:
+            return "", 0, "错误：无法获取访问令牌，请检查App ID和App Secret", []
+
+        try:
+            records, first = poll_changes(access_token, url_app_id, table_id, (str(unique_id or ""),),
+                                          filter_condition=筛选条件, page_size=每页行数,
+                                          modified_column=修改时间列名, field_names=columns,
+                                          emit_existing=首次返回现有行)
+        except (FeishuAPIError, ValueError) as e:
+            error_msg = f"监视变更失败: {str(e)}"
+            print(error_msg)
+            return "", 0, error_msg, []
+        except Exception as e:
+            error_msg = f"执行过程中发生错误: {str(e)}"
+            print(error_msg)
+            return "", 0, error_msg, []
+
+        if not records:
+            status_msg = "已记录当前进度，之后只返回新增或修改的行" if first else "没有新增或修改的行"
+            print(f"👀 {status_msg}")
+            if ExecutionBlocker is not None:
+                # 列表输出也要给出阻断值，否则接在「逐行数据」上的节点仍会执行
+                return ExecutionBlocker(None), 0, status_msg, [ExecutionBlocker(None)]
+            return "", 0, status_msg, []
+
+        output_data, rows = format_records(records, columns, 输出格式, normalize_separator(列分隔符))
+        status_msg = f"发现 {len(records)} 行新增或修改"
+        print(f"👀 {status_msg}")
+        return output_data, len(records), status_msg, rows
+
+
+# 节点注册映射（由 __init__.py 汇总导出）
+NODE_CLASS_MAPPINGS = {
+    "FeishuWatchNode": FeishuWatchNode,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "FeishuWatchNode": "监视变更（飞书多维表格）",
+}
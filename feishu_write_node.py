@@ -5,10 +5,20 @@
 
 import json
 import re
-import requests
 from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urlparse, parse_qs
 
+try:
+    from .feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from .feishu_client import get_tenant_access_token, http_post, http_put
+    from .feishu_filter import condition_columns, filter_records
+    from .feishu_records import fetch_update_targets, invalidate_table
+except ImportError:
+    from feishu_async import ASYNC_NODES_SUPPORTED, run_blocking
+    from feishu_client import get_tenant_access_token, http_post, http_put
+    from feishu_filter import condition_columns, filter_records
+    from feishu_records import fetch_update_targets, invalidate_table
+
 
 class FeishuWriteNode:
     """
@@ -21,10 +31,6 @@ class FeishuWriteNode:
     4. 支持指定目标列名
     """
     
-    def __init__(self):
-        self.access_token = None
-        self.token_expires_at = 0
-        
     @classmethod
     def INPUT_TYPES(s):
         """
@@ -66,33 +72,14 @@ class FeishuWriteNode:
     RETURN_TYPES = ("STRING", "STRING", "IMAGE")
     RETURN_NAMES = ("输出文本", "状态信息", "使用说明")
     
-    FUNCTION = "write_to_table"
+    FUNCTION = "write_to_table_async" if ASYNC_NODES_SUPPORTED else "write_to_table"
     CATEGORY = "飞书工具"
     
     def get_access_token(self, app_id: str, app_secret: str) -> Optional[str]:
         """
-        获取飞书访问令牌
+        获取飞书访问令牌（进程内共享缓存，到期前自动刷新）
         """
-        try:
-            url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-            payload = {
-                "app_id": app_id,
-                "app_secret": app_secret
-            }
-            
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get("code") == 0:
-                return data.get("tenant_access_token")
-            else:
-                print(f"获取访问令牌失败: {data.get('msg', '未知错误')}")
-                return None
-                
-        except Exception as e:
-            print(f"获取访问令牌时发生错误: {str(e)}")
-            return None
+        return get_tenant_access_token(app_id, app_secret)
     
     def extract_table_info(self, table_url: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -128,147 +115,21 @@ class FeishuWriteNode:
             print(f"解析表格链接时发生错误: {str(e)}")
             return None, None
     
-    def get_table_records(self, access_token: str, app_id: str, table_id: str, max_rows: int = 1000) -> Optional[List[Dict]]:
+    def get_table_records(self, access_token: str, app_id: str, table_id: str, max_rows: int = 1000,
+                          filter_condition: str = "",
+                          field_names: Optional[List[str]] = None) -> Optional[List[Dict]]:
         """
-        获取表格记录
+        获取待更新的记录（总是读取表格的最新内容，不使用快照缓存与本地镜像）
+        只扫描表格前 max_rows 行，传入筛选条件时返回其中命中的记录；传入 field_names 时只拉取这些列
         """
-        try:
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_id}/tables/{table_id}/records"
-            params = {
-                "page_size": min(max_rows, 100),  # 飞书API单次最多100条
-                "page_token": ""
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "application/json"
-            }
-            
-            all_records = []
-            
-            while len(all_records) < max_rows:
-                response = requests.get(url, headers=headers, params=params, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                if data.get("code") != 0:
-                    print(f"获取表格记录失败: {data.get('msg', '未知错误')}")
-                    break
-                
-                records = data.get("data", {}).get("items", [])
-                if not records:
-                    break
-                
-                all_records.extend(records)
-                
-                # 检查是否有下一页
-                page_token = data.get("data", {}).get("page_token")
-                if not page_token:
-                    break
-                    
-                params["page_token"] = page_token
-                
-                # 防止无限循环
-                if len(all_records) >= max_rows:
-                    break
-            
-            return all_records[:max_rows]
-            
-        except Exception as e:
-            print(f"获取表格记录时发生错误: {str(e)}")
-            return None
+        return fetch_update_targets(access_token, app_id, table_id, max_rows, filter_condition=filter_condition,
+                                    field_names=field_names)
     
     def filter_records(self, records: List[Dict], filter_condition: str) -> List[Dict]:
         """
         根据条件筛选记录（支持语法：列名+关键词 / 列名-关键词）
         """
-        if not records or not filter_condition.strip():
-            return records
-        
-        # 解析条件语法
-        include_conditions: List[Tuple[str, str]] = []
-        exclude_conditions: List[Tuple[str, str]] = []
-        
-        for raw_line in filter_condition.strip().split('\n'):
-            line = raw_line.strip()
-            if not line:
-                continue
-            # 优先解析 + / - 语法
-            m = re.match(r"^\s*([^+\-=\s]+)\s*([+-])\s*(.+?)\s*$", line)
-            if m:
-                col = m.group(1).strip()
-                op = m.group(2)
-                val = m.group(3).strip()
-                if op == '+':
-                    include_conditions.append((col, val))
-                else:
-                    exclude_conditions.append((col, val))
-                continue
-            # 兼容旧格式：列名=值
-            if '=' in line:
-                col, val = line.split('=', 1)
-                include_conditions.append((col.strip(), val.strip()))
-        
-        def value_contains(field_val: Any, needle: str) -> bool:
-            """判断字段值是否包含子串（大小写不敏感）。支持标量/列表。"""
-            if field_val is None:
-                return False
-            needle_l = str(needle).lower()
-            if isinstance(field_val, list):
-                for v in field_val:
-                    if needle_l in str(v).lower():
-                        return True
-                return False
-            return needle_l in str(field_val).lower()
-        
-        def is_empty_value(field_val: Any) -> bool:
-            """判断字段值是否为空"""
-            if field_val is None:
-                return True
-            if isinstance(field_val, str) and not field_val.strip():
-                return True
-            if isinstance(field_val, list) and len(field_val) == 0:
-                return True
-            return False
-        
-        def check_condition(field_val: Any, condition: str) -> bool:
-            """检查字段值是否满足条件"""
-            if condition == "空值":
-                return is_empty_value(field_val)
-            elif condition == "非空值":
-                return not is_empty_value(field_val)
-            else:
-                # 普通关键词匹配
-                return value_contains(field_val, condition)
-        
-        filtered: List[Dict] = []
-        for rec in records:
-            fields = rec.get('fields', {})
-            
-            # include 判定：若无 include 条件，则视为通过；否则要求全部命中
-            include_ok = True
-            if include_conditions:
-                include_ok = True
-                for col, val in include_conditions:
-                    # 当字段缺失时，将其视为"空值"
-                    field_value = fields.get(col, None)
-                    if not check_condition(field_value, val):
-                        include_ok = False
-                        break
-            
-            # exclude 判定：任一命中即排除
-            # 注意：当字段缺失时将其视为“空值”，以便条件如 列名-空值 能排除该记录
-            exclude_hit = False
-            for col, val in exclude_conditions:
-                field_value = fields.get(col, None)
-                if check_condition(field_value, val):
-                    exclude_hit = True
-                    break
-            
-            if include_ok and not exclude_hit:
-                filtered.append(rec)
-        
-        return filtered
+        return filter_records(records, filter_condition)
     
     def update_existing_records(self, access_token: str, app_id: str, table_id: str, 
                                records: List[Dict], target_columns: List[str], input_text: str) -> Tuple[int, str]:
@@ -303,7 +164,7 @@ class FeishuWriteNode:
                     "Content-Type": "application/json"
                 }
                 
-                response = requests.put(url, json=update_data, headers=headers, timeout=30)
+                response = http_put(url, json=update_data, headers=headers, timeout=30)
                 response.raise_for_status()
                 
                 data = response.json()
@@ -351,7 +212,7 @@ class FeishuWriteNode:
                     "Content-Type": "application/json"
                 }
                 
-                response = requests.post(url, json=new_row_data, headers=headers, timeout=30)
+                response = http_post(url, json=new_row_data, headers=headers, timeout=30)
                 response.raise_for_status()
                 
                 data = response.json()
@@ -373,6 +234,12 @@ class FeishuWriteNode:
         
         return added_count, status_msg
     
+    async def write_to_table_async(self, **kwargs):
+        """
+        协程入口：在工作线程中执行，不阻塞 ComfyUI 事件循环
+        """
+        return await run_blocking(self.write_to_table, **kwargs)
+    
     def write_to_table(self, 飞书配置: dict, 输入文本: str, 目标列名: str, 
                       筛选条件: str, 增加行: bool, 增加行数: int) -> Tuple[str, str, Any]:
         """
@@ -434,7 +301,10 @@ class FeishuWriteNode:
             else:
                 # 2. 获取现有记录
                 print("正在获取表格记录...")
-                records = self.get_table_records(access_token, url_app_id, table_id, 1000)
+                # 更新只需要记录 ID：按筛选条件中的列拉取，无筛选条件时只拉取目标列
+                needed_fields = condition_columns(筛选条件) or target_columns_list
+                records = self.get_table_records(access_token, url_app_id, table_id, 1000,
+                                                 filter_condition=筛选条件, field_names=needed_fields)
                 if records is None:
                     return 输入文本, "错误：无法获取表格数据"
                 
@@ -460,6 +330,9 @@ class FeishuWriteNode:
                 if updated_count > 0:
                     final_status += f" 已将文本写入到 {', '.join(target_columns_list)} 列的 {updated_count} 个单元格中。"
             
+            # 表格已被写入，丢弃其它节点可能复用的旧记录
+            invalidate_table(url_app_id, table_id)
+            
             # 加载使用说明图片
             usage_image = self._load_usage_image()
             
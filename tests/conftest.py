@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共用的假 HTTP 响应（替换 feishu_records.http_get / http_post 时使用，无需网络）
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import requests
+
+
+class FakeResponse:
+    """假的接口响应：json() 返回 payload，content 为序列化后的响应体；status 不小于 400 时 raise_for_status 抛出 HTTPError"""
+
+    def __init__(self, payload: Dict[str, Any], status: int = 200):
+        self.payload = payload
+        self.status = status
+        self.content = json.dumps(payload).encode()
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status} Server Error")
+
+    def json(self):
+        return self.payload
+
+
+def api_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """成功的飞书接口响应体"""
+    return {"code": 0, "data": data}
+
+
+def api_page(items: List[Dict], page_token: Optional[str] = None, **extra) -> Dict[str, Any]:
+    """分页接口的一页：有 page_token 时表示还有下一页"""
+    return api_response(dict({"items": items, "has_more": page_token is not None, "page_token": page_token},
+                             **extra))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试异步执行与并发 I/O 辅助函数（无需网络）
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_async import first_result, run_blocking, submit_io
+
+
+def test_first_result_is_sequential_by_default():
+    """下载回退方案逐个执行：前一个成功后不再发起后面的方案"""
+    started = []
+
+    def attempt(value):
+        def call():
+            started.append(value)
+            return value
+        return call
+
+    assert first_result([attempt(None), attempt("second"), attempt("third")]) == "second"
+    assert started == [None, "second"]
+
+
+def test_first_result_all_fail():
+    """全部失败时返回 None"""
+    def boom():
+        raise RuntimeError("x")
+
+    assert first_result([lambda: None, boom]) is None
+
+
+def test_submit_io_keeps_context():
+    """后台调用沿用提交时的执行上下文（执行分析等依赖 contextvar）"""
+    var = contextvars.ContextVar("var", default="outer")
+    var.set("node")
+    assert submit_io(var.get).result() == "node"
+
+
+def test_run_blocking_passes_kwargs():
+    """协程入口以关键字参数调用同步方法"""
+    def work(a, b=0):
+        return a + b
+
+    assert asyncio.run(run_blocking(work, 1, b=2)) == 3
+
+
+if __name__ == "__main__":
+    test_first_result_is_sequential_by_default()
+    test_first_result_all_fail()
+    test_submit_io_keeps_context()
+    test_run_blocking_passes_kwargs()
+    print("✅ 异步辅助函数测试通过")
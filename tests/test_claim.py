@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按租约领取任务：只领取空闲或租约过期的行、回读校验丢弃被抢走的行（无需网络）
+"""
+
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_claim
+from feishu_claim import claim_records, is_free
+from feishu_filter import filter_records
+
+NOW = int(time.time() * 1000)
+
+
+class FakeTable:
+    """内存中的任务表：记录写入，并可模拟其它工作进程在回读前覆盖写入"""
+
+    def __init__(self, monkeypatch, rows):
+        self.rows = {r["record_id"]: r for r in rows}
+        self.stolen = set()
+        self.gets = 0
+        self.before_get = None
+        monkeypatch.setattr(feishu_claim, "CLAIM_SETTLE_SECONDS", 0)
+        monkeypatch.setattr(feishu_claim, "invalidate_table", lambda *a: None)
+        monkeypatch.setattr(feishu_claim, "fetch_table_fields",
+                            lambda *a: [{"field_name": "领取者", "type": 1}, {"field_name": "租约到期", "type": 5}])
+        monkeypatch.setattr(feishu_claim, "stream_table_records", self.stream)
+        monkeypatch.setattr(feishu_claim, "batch_update_records", self.update)
+        monkeypatch.setattr(feishu_claim, "batch_get_records", self.get)
+
+    def stream(self, access_token, app_token, table_id, filter_condition="", field_names=None):
+        yield from filter_records(copy.deepcopy(list(self.rows.values())), filter_condition)
+
+    def update(self, access_token, app_token, table_id, updates):
+        for update in updates:
+            self.rows[update["record_id"]]["fields"].update(update["fields"])
+
+    def get(self, access_token, app_token, table_id, record_ids):
+        # 被抢走的行：在本进程写入之后被别的进程覆盖
+        for record_id in self.stolen:
+            if self.rows[record_id]["fields"].get("领取者"):
+                self.rows[record_id]["fields"]["领取者"] = "别的进程#0000"
+        self.gets += 1
+        if self.before_get is not None:
+            self.before_get(self)
+        return [copy.deepcopy(self.rows[i]) for i in record_ids]
+
+
+def task(i, **fields):
+    return {"record_id": f"r{i}", "fields": dict({"标题": f"任务{i}", "进度": "待处理"}, **fields)}
+
+
+def test_is_free():
+    """未领取或租约过期的行可以领取"""
+    assert is_free({}, "领取者", "租约到期", NOW)
+    assert is_free({"领取者": "w#1", "租约到期": NOW - 1}, "领取者", "租约到期", NOW)
+    assert is_free({"领取者": "w#1", "租约到期": str(NOW - 1)}, "领取者", "租约到期", NOW)
+    assert not is_free({"领取者": "w#1", "租约到期": NOW + 60000}, "领取者", "租约到期", NOW)
+    # 已被领取但租约无法解析时视为仍被占用；文本列中的日期可以解析
+    assert not is_free({"领取者": "w#1", "租约到期": "下周"}, "领取者", "租约到期", NOW)
+    assert is_free({"领取者": "w#1", "租约到期": "2020-01-01 00:00"}, "领取者", "租约到期", NOW)
+    assert not is_free({"领取者": "w#1", "租约到期": "2999-01-01"}, "领取者", "租约到期", NOW)
+
+
+def test_claims_only_free_pending_rows(monkeypatch):
+    """只领取待处理且空闲的行，并写入领取标记与租约到期时间"""
+    table = FakeTable(monkeypatch, [
+        task(1), task(2, 进度="完成"), task(3, 领取者="w#1", 租约到期=NOW + 60000),
+        task(4, 领取者="w#1", 租约到期=NOW - 1000),
+    ])
+    result = claim_records("t", "base", "tbl", "进度-完成", 5, "worker-a", 60)
+    assert sorted(r["record_id"] for r in result["records"]) == ["r1", "r4"]
+    assert result["token"].startswith("worker-a#") and result["lost"] == 0
+    assert table.rows["r1"]["fields"]["领取者"] == result["token"]
+    assert table.rows["r1"]["fields"]["租约到期"] >= NOW + 60000
+    assert table.rows["r3"]["fields"]["领取者"] == "w#1"
+
+
+def test_rows_lost_to_other_workers_are_dropped(monkeypatch):
+    """回读时领取者已被其它进程覆盖的行不返回"""
+    table = FakeTable(monkeypatch, [task(i) for i in range(4)])
+    table.stolen = {"r0", "r2"}
+    result = claim_records("t", "base", "tbl", "进度-完成", 4, "worker-a", 60)
+    assert sorted(r["record_id"] for r in result["records"]) == ["r1", "r3"]
+    assert result["lost"] == 2
+
+
+def test_successive_workers_do_not_overlap(monkeypatch):
+    """先领取的行在租约内不会再被其它工作进程领取"""
+    FakeTable(monkeypatch, [task(i) for i in range(10)])
+    first = claim_records("t", "base", "tbl", "进度-完成", 4, "worker-a", 60)
+    second = claim_records("t", "base", "tbl", "进度-完成", 4, "worker-b", 60)
+    ids_a = {r["record_id"] for r in first["records"]}
+    ids_b = {r["record_id"] for r in second["records"]}
+    assert len(ids_a) == 4 and len(ids_b) == 4 and not ids_a & ids_b
+
+
+def test_rows_taken_before_write_are_not_overwritten(monkeypatch):
+    """扫描之后、写入之前被其它进程领取的行，写入前回读时丢弃，不覆盖对方的领取"""
+    table = FakeTable(monkeypatch, [task(i) for i in range(3)])
+
+    def other_worker_claims(t):
+        if t.gets == 1:
+            t.rows["r1"]["fields"].update({"领取者": "worker-b#1234", "租约到期": NOW + 60000})
+
+    table.before_get = other_worker_claims
+    result = claim_records("t", "base", "tbl", "进度-完成", 3, "worker-a", 60)
+    assert sorted(r["record_id"] for r in result["records"]) == ["r0", "r2"]
+    assert result["lost"] == 1
+    assert table.rows["r1"]["fields"]["领取者"] == "worker-b#1234"
+
+
+if __name__ == "__main__":
+    test_is_free()
+    print("✅ 任务领取测试通过")
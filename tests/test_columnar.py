@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试列式快照筛选（需要 numpy，无需网络）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("numpy")
+
+import feishu_columnar
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_columnar import ColumnarTable, filter_snapshot
+from feishu_filter import compile_filter, filter_records, selectivity_stats
+
+RECORDS = [
+    {"record_id": "r1", "fields": {"状态": "完成", "内容": "这是第一条记录", "备注": "有备注"}},
+    {"record_id": "r2", "fields": {"状态": "未完成", "内容": "", "备注": None}},
+    {"record_id": "r3", "fields": {"状态": "进行中", "内容": "这是第三条记录", "备注": []}},
+    {"record_id": "r4", "fields": {"状态": "暂停", "内容": "  ", "标签": ["ab", "cd"]}},
+    {"record_id": "r5", "fields": {"状态": "完成", "链接": {"link": "https://x", "text": "Feishu 文档"},
+                                   "负责人": [{"name": "张三"}], "数量": 12}},
+]
+
+CONDITIONS = [
+    "备注+空值", "备注+非空值", "内容-空值", "状态+完成\n备注+空值", "状态-完成",
+    "链接+feishu", "链接+https", "标签+b", "标签+bc", "数量+12", "负责人+张三", "不存在+空值",
+    "数量>11", "数量<=12", "数量介于1~11", "状态==完成", "状态!=完成\n数量<100",
+]
+
+
+def test_columnar_matches_row_filter():
+    """列式筛选与逐条筛选结果一致（包括列表项不跨项匹配）"""
+    table = ColumnarTable(RECORDS)
+    for condition in CONDITIONS:
+        expected = filter_records(RECORDS, condition)
+        assert table.filter(compile_filter(condition)) == expected, condition
+
+
+def test_filter_snapshot_threshold_and_limit(monkeypatch):
+    """小快照交给调用方逐条筛选；大快照的列式视图挂在快照上复用"""
+    snapshot = TableSnapshot(RECORDS, True)
+    assert filter_snapshot(snapshot, compile_filter("状态+完成"), None) is None
+
+    monkeypatch.setattr(feishu_columnar, "COLUMNAR_MIN_ROWS", 1)
+    matched = filter_snapshot(snapshot, compile_filter("状态+完成"), 2)
+    assert [r["record_id"] for r in matched] == ["r1", "r2"]
+    columnar = snapshot.columnar
+    filter_snapshot(snapshot, compile_filter("状态-完成"), None)
+    assert snapshot.columnar is columnar
+
+
+def test_keyword_index_matches_scan(monkeypatch):
+    """建立倒排索引后的关键词查询与全列扫描结果一致"""
+    monkeypatch.setattr(feishu_columnar, "KEYWORD_INDEX_AFTER", 1)
+    table = ColumnarTable(RECORDS)
+    for condition in CONDITIONS:
+        assert table.filter(compile_filter(condition)) == filter_records(RECORDS, condition), condition
+    assert table.column("状态").index is not None
+
+
+def test_index_updated_incrementally_after_refresh(monkeypatch):
+    """快照刷新后只更新变化的行，追加的记录也能被索引命中"""
+    monkeypatch.setattr(feishu_columnar, "COLUMNAR_MIN_ROWS", 1)
+    monkeypatch.setattr(feishu_columnar, "KEYWORD_INDEX_AFTER", 1)
+    cache = SnapshotCache(ttl=60)
+    cache.put("k", TableSnapshot(RECORDS, True))
+    filter_snapshot(cache.get("k"), compile_filter("状态+完成"))
+    old_index = cache.get("k").columnar.column("状态").index
+
+    refreshed = [dict(r) for r in RECORDS]
+    refreshed[2] = {"record_id": "r3", "fields": {"状态": "已完成"}}
+    refreshed.append({"record_id": "r6", "fields": {"状态": "完成了"}})
+    cache.invalidate(lambda key: True)
+    cache.put("k", TableSnapshot(refreshed, True))
+    snapshot = cache.get("k")
+    matched = filter_snapshot(snapshot, compile_filter("状态+完成"))
+
+    assert [r["record_id"] for r in matched] == ["r1", "r2", "r3", "r5", "r6"]
+    index = snapshot.columnar.column("状态").index
+    assert index is not None and index is not old_index
+    # 旧索引不受影响
+    assert 2 not in old_index.candidates("完成")
+
+
+def test_column_statistics_drive_plan():
+    """空值比例与不同取值数量用于估计规则的通过率"""
+    table = ColumnarTable(RECORDS)
+    assert table.column("备注").statistics()[0] == 0.8
+    accept = compile_filter("状态+完成\n备注+非空值")
+    plan = accept.plan("t", table.estimate)
+    assert [accept.labels[i] for i, _ in plan] == ["备注+非空值", "状态+完成"]
+    selectivity_stats.clear()
+    table.filter(accept, scope="t")
+    assert selectivity_stats.pass_rate(("t", "状态+完成")) is None  # 样本太少
+    assert table.filter(accept, scope="t") == filter_records(RECORDS, "状态+完成\n备注+非空值")
+
+
+if __name__ == "__main__":
+    test_columnar_matches_row_filter()
+    print("✅ 列式筛选测试通过")
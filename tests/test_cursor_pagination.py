@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试游标分页读取：逐批读完整张表不重复、不遗漏，且总请求量与表格行数成正比（无需网络）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache
+from feishu_records import read_page
+from conftest import FakeResponse, api_page
+
+TABLE = [{"record_id": f"r{i}", "fields": {"标题": f"任务{i}", "状态": "已完成" if i % 3 == 0 else "进行中"}}
+         for i in range(1000)]
+FIELDS = [{"field_name": "标题", "type": 1}, {"field_name": "状态", "type": 3}]
+
+
+def install(monkeypatch):
+    served = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        start = int(params.get("page_token") or 0)
+        end = min(start + params["page_size"], len(TABLE))
+        served.append(end - start)
+        return FakeResponse(api_page(TABLE[start:end], str(end) if end < len(TABLE) else None))
+
+    monkeypatch.setattr(feishu_records, "http_get", fake_get)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+    return served
+
+
+def read_all(condition, page_size):
+    batches, cursor = [], ""
+    while True:
+        records, cursor = read_page("t", "base", "tbl", cursor, page_size, filter_condition=condition)
+        batches.append(records)
+        if not cursor:
+            return batches
+
+
+def test_filtered_batches_cover_table_once(monkeypatch):
+    """本地筛选的批次按顺序覆盖全部命中记录，拉取的总行数与表格行数成正比"""
+    served = install(monkeypatch)
+    batches = read_all("状态+完成", 20)
+    expected = [r["record_id"] for r in TABLE if r["fields"]["状态"] == "已完成"]
+    assert [r["record_id"] for batch in batches for r in batch] == expected
+    assert all(len(batch) == 20 for batch in batches[:-1])
+    assert sum(served) == len(TABLE)
+
+
+def test_unfiltered_batches(monkeypatch):
+    """无筛选条件时每批正好 page_size 条，最后一批后游标为空"""
+    served = install(monkeypatch)
+    batches = read_all("", 300)
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+    assert sum(served) == len(TABLE)
+
+
+def test_cursor_bound_to_table_and_condition(monkeypatch):
+    """游标不能换表格或筛选条件继续使用"""
+    install(monkeypatch)
+    _, cursor = read_page("t", "base", "tbl", "", 5, filter_condition="状态+完成")
+    with pytest.raises(ValueError):
+        read_page("t", "base", "tbl", cursor, 5, filter_condition="状态+进行")
+    with pytest.raises(ValueError):
+        read_page("t", "base", "tbl", "不是游标", 5)
+
+
+if __name__ == "__main__":
+    print("请使用 pytest 运行本测试")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试执行分析（explain）：分页、行数、规则下推与缓存命中的记录（无需网络）
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_profile
+import feishu_records
+from feishu_cache import SnapshotCache
+from feishu_profile import attach_profile, explain, lap, record_matched
+from feishu_records import SingleFlight
+from conftest import FakeResponse, api_page
+
+FIELDS = [{"field_name": "标题", "type": 1}, {"field_name": "状态", "type": 3}]
+
+
+def page_response(page):
+    items = [{"record_id": f"r{page}-{i}", "fields": {"标题": [{"type": "text", "text": "风景"}],
+                                                      "状态": "已完成" if i else "进行中"}}
+             for i in range(3)]
+    return FakeResponse(api_page(items, "next" if page == 0 else None))
+
+
+def fake_post(url, headers=None, params=None, json=None, timeout=None):
+    return page_response(1 if params.get("page_token") else 0)
+
+
+def test_profile_records_pages_rules_and_cache(monkeypatch, tmp_path):
+    """记录翻页、扫描/命中行数、下推与本地规则；再次读取记为缓存命中"""
+    monkeypatch.setattr(feishu_profile, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(feishu_records, "http_post", fake_post)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    with explain("TestNode") as profile:
+        records = feishu_records.fetch_table_records("t", "base", "tbl", 100, filter_condition="标题+风景\n状态+完成")
+        lap("fetch")
+        record_matched(len(records))
+    assert profile.pages == 2 and profile.rows_scanned == 6
+    assert profile.bytes == len(page_response(0).content) + len(page_response(1).content)
+    assert profile.rows_matched == 4
+    assert profile.pushdown == ["标题 contains 风景"]
+    assert profile.local == ["标题+风景", "状态+完成"]
+    assert "fetch" in profile.stages and not profile.cache
+
+    with open(profile.sidecar, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["rows_scanned"] == 6 and data["pushdown_rules"] == ["标题 contains 风景"]
+
+    with explain("TestNode") as again:
+        feishu_records.fetch_table_records("t", "base", "tbl", 100, filter_condition="标题+风景\n状态+完成")
+    assert again.pages == 0 and again.cache == ["快照缓存"]
+
+
+def test_attach_profile_to_status(tmp_path, monkeypatch):
+    """摘要追加到状态信息；未开启时返回值不变"""
+    monkeypatch.setattr(feishu_profile, "PROFILE_DIR", str(tmp_path))
+    result = ("数据", "成功", None)
+    with explain("TestNode", False) as profile:
+        lap("auth")
+    assert profile is None and attach_profile(result, profile) is result
+
+    with explain("TestNode") as profile:
+        lap("auth")
+    attached = attach_profile({"ui": {}, "result": result}, profile)
+    status = attached["result"][1]
+    assert status.startswith("成功\n\n—— 执行分析 ——")
+    assert "鉴权" in status and profile.sidecar in status
+
+
+if __name__ == "__main__":
+    print("请使用 pytest 运行本测试")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享的已编译筛选器（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_filter import compile_filter, display_text, filter_records, is_empty_value, searchable_text
+
+RECORDS = [
+    {"record_id": "r1", "fields": {"状态": "完成", "内容": "这是第一条记录", "备注": "有备注"}},
+    {"record_id": "r2", "fields": {"状态": "未完成", "内容": "", "备注": None}},
+    {"record_id": "r3", "fields": {"状态": "进行中", "内容": "这是第三条记录", "备注": []}},
+    {"record_id": "r4", "fields": {"状态": "暂停", "内容": "这是第四条记录"}},
+    {"record_id": "r5", "fields": {"状态": "完成", "链接": {"link": "https://x", "text": "Feishu 文档"},
+                                   "负责人": [{"name": "张三"}]}},
+]
+
+
+def ids(condition):
+    return [r["record_id"] for r in filter_records(RECORDS, condition)]
+
+
+def test_empty_and_keyword_rules():
+    """空值/非空值与关键词规则（缺失的字段视为空值）"""
+    assert ids("备注+空值") == ["r2", "r3", "r4", "r5"]
+    assert ids("备注+非空值") == ["r1"]
+    assert ids("备注-空值") == ["r1"]
+    assert ids("状态+进行中\n备注+空值") == ["r3"]
+    assert ids("状态-完成") == ["r3", "r4"]
+    assert ids("") == ["r1", "r2", "r3", "r4", "r5"]
+
+
+def test_object_values_match_on_text_and_name():
+    """链接/人员等对象按 text/name 匹配，大小写不敏感"""
+    assert ids("链接+feishu") == ["r5"]
+    assert ids("链接+https") == []
+    assert ids("负责人+张三") == ["r5"]
+    assert is_empty_value({})
+    assert not is_empty_value({"text": "a"})
+
+
+def test_objects_without_text_are_not_empty():
+    """只有链接或 id 的对象（无 text/name）仍算有值；文本键全部为空的对象才算空值"""
+    assert not is_empty_value({"link": "https://example.com"})
+    assert not is_empty_value({"id": "ou_123"})
+    assert is_empty_value({"text": "", "link": ""})
+    assert is_empty_value({"type": 1, "value": []})
+    records = [
+        {"record_id": "a", "fields": {"链接": {"link": "https://example.com"}, "负责人": [{"id": "ou_1"}]}},
+        {"record_id": "b", "fields": {"链接": {"text": " "}, "负责人": []}},
+    ]
+    assert [r["record_id"] for r in filter_records(records, "链接+非空值")] == ["a"]
+    assert [r["record_id"] for r in filter_records(records, "负责人+空值")] == ["b"]
+
+
+def test_searchable_text_is_normalized_and_flattened():
+    """全角/半角、大小写统一；人员、附件按名称匹配，不会匹配到对象的键名"""
+    records = [
+        {"record_id": "a", "fields": {"标题": "ＡＢＣ１２３", "附件": [{"name": "cat.png", "file_token": "t"}]}},
+        {"record_id": "b", "fields": {"标题": [{"type": "text", "text": "Stra"}, {"type": "text", "text": "ße"}]}},
+    ]
+    assert [r["record_id"] for r in filter_records(records, "标题+abc123")] == ["a"]
+    assert [r["record_id"] for r in filter_records(records, "标题+STRASSE")] == ["b"]
+    assert filter_records(records, "附件+file_token") == []
+    assert [r["record_id"] for r in filter_records(records, "附件+CAT")] == ["a"]
+    assert searchable_text(["a", "b"]) == "a\x00b"
+    assert display_text([{"name": "张三"}, {"name": "李四"}]) == "张三, 李四"
+    assert display_text({"type": 1, "value": [{"type": "text", "text": "公式"}]}) == "公式"
+
+
+def test_legacy_syntaxes():
+    """兼容 列名=值 与 +列名+关键词 / -列名-关键词 写法"""
+    assert ids("状态=进行") == ["r3"]
+    assert ids("+状态+暂停") == ["r4"]
+    assert ids("-状态-完成") == ["r3", "r4"]
+
+
+def test_compiled_filters_are_cached():
+    """相同条件文本只编译一次"""
+    first = compile_filter("状态+完成\n备注-空值")
+    assert compile_filter("状态+完成\n备注-空值") is first
+    assert first.columns == ["状态", "备注"]
+    assert not compile_filter("")
+
+
+if __name__ == "__main__":
+    test_empty_and_keyword_rules()
+    test_object_values_match_on_text_and_name()
+    test_searchable_text_is_normalized_and_flattened()
+    test_legacy_syntaxes()
+    test_compiled_filters_are_cached()
+    print("✅ 筛选器测试通过")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享 HTTP 会话层（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import feishu_client
+
+
+def test_session_is_shared():
+    """所有调用复用同一个会话及连接池"""
+    session = feishu_client.get_session()
+    assert feishu_client.get_session() is session
+    adapter = session.get_adapter("https://open.feishu.cn")
+    assert adapter._pool_maxsize == feishu_client.POOL_MAXSIZE
+
+
+def test_timeout_split_into_connect_and_read(monkeypatch):
+    """timeout 参数拆分为连接超时与读取超时"""
+    seen = {}
+
+    class FakeSession:
+        def request(self, method, url, timeout=None, **kwargs):
+            seen["method"] = method
+            seen["timeout"] = timeout
+            resp = requests.Response()
+            resp.status_code = 200
+            resp._content = b"ok"
+            return resp
+
+    monkeypatch.setattr(feishu_client, "get_session", lambda: FakeSession())
+    assert feishu_client.http_get("https://open.feishu.cn/x", timeout=60).content == b"ok"
+    assert seen["method"] == "GET"
+    assert seen["timeout"] == (feishu_client.CONNECT_TIMEOUT, 60)
+
+    feishu_client.http_put("https://open.feishu.cn/x", timeout=(3, 7))
+    assert seen["timeout"] == (3, 7)
+
+
+if __name__ == "__main__":
+    test_session_is_shared()
+    print("✅ HTTP 会话测试通过")
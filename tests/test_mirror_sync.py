@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试本地 SQLite 镜像的全量/增量同步（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_mirror
+import feishu_records
+from feishu_mirror import TableMirror
+
+FIELDS = [{"field_name": "标题", "type": 1}, {"field_name": "修改时间", "type": 1002}]
+
+
+def record(record_id, title, modified):
+    return {"record_id": record_id, "last_modified_time": modified,
+            "fields": {"标题": title, "修改时间": modified}}
+
+
+class FakeTable:
+    """模拟飞书数据表，记录各接口的调用次数"""
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.list_calls = 0
+        self.search_bodies = []
+
+    def list_pages(self, access_token, app_token, table_id, params=None, page_size=500):
+        self.list_calls += 1
+        yield [dict(r) for r in self.records], 100
+
+    def search_pages(self, access_token, app_token, table_id, body, page_size=500):
+        self.search_bodies.append(body)
+        yield [dict(r) for r in self.records], 100
+
+
+def install(monkeypatch, table, fields=FIELDS):
+    monkeypatch.setattr(feishu_mirror, "iter_record_pages", table.list_pages)
+    monkeypatch.setattr(feishu_mirror, "iter_search_pages", table.search_pages)
+    monkeypatch.setattr(feishu_mirror, "fetch_table_fields", lambda *a: fields)
+
+
+def titles(mirror):
+    return [r["fields"]["标题"] for r in mirror.load().records]
+
+
+def test_full_then_incremental_sync(tmp_path, monkeypatch):
+    """首次全量同步，之后只写入修改时间晚于水位的记录，新记录追加在末尾"""
+    table = FakeTable([record("r1", "a", 1000), record("r2", "b", 2000)])
+    install(monkeypatch, table)
+    mirror = TableMirror(str(tmp_path / "t.sqlite3"))
+
+    assert mirror.sync("t", "base", "tbl")
+    assert table.list_calls == 1
+    assert titles(mirror) == ["a", "b"]
+
+    table.records = [record("r1", "a2", 3000), record("r2", "b", 2000), record("r3", "c", 4000)]
+    assert mirror.sync("t", "base", "tbl")
+    assert table.list_calls == 1
+    condition = table.search_bodies[-1]["filter"]["conditions"][0]
+    assert condition["field_name"] == "修改时间"
+    assert titles(mirror) == ["a2", "b", "c"]
+
+
+def test_reconcile_removes_deleted_records(tmp_path, monkeypatch):
+    """到达核对间隔后删除飞书中已不存在的记录"""
+    table = FakeTable([record("r1", "a", 1000), record("r2", "b", 2000)])
+    install(monkeypatch, table)
+    mirror = TableMirror(str(tmp_path / "t.sqlite3"))
+    mirror.sync("t", "base", "tbl")
+
+    table.records = [record("r2", "b", 2000)]
+    monkeypatch.setattr(feishu_mirror, "RECONCILE_INTERVAL", 0)
+    mirror.sync("t", "base", "tbl")
+    assert titles(mirror) == ["b"]
+
+
+def test_without_modified_field_falls_back_to_full_sync(tmp_path, monkeypatch):
+    """没有「修改时间」字段时每次全量同步"""
+    table = FakeTable([record("r1", "a", 1000)])
+    install(monkeypatch, table, fields=FIELDS[:1])
+    mirror = TableMirror(str(tmp_path / "t.sqlite3"))
+    mirror.sync("t", "base", "tbl")
+    mirror.sync("t", "base", "tbl")
+    assert table.list_calls == 2
+    assert not table.search_bodies
+
+
+def test_failed_sync_serves_previous_data(tmp_path, monkeypatch):
+    """同步失败时返回上次同步的数据"""
+    table = FakeTable([record("r1", "a", 1000)])
+    install(monkeypatch, table)
+    monkeypatch.setattr(feishu_mirror, "MIRROR_DIR", str(tmp_path))
+    monkeypatch.setattr(feishu_mirror, "_mirrors", {})
+    assert feishu_mirror.scan_mirror("t", "base", "tbl").complete
+
+    def broken(*args, **kwargs):
+        raise feishu_records.FeishuAPIError("boom")
+
+    monkeypatch.setattr(feishu_mirror, "iter_search_pages", broken)
+    snapshot = feishu_mirror.scan_mirror("t", "base", "tbl")
+    assert [r["record_id"] for r in snapshot.records] == ["r1"]
+    assert not snapshot.complete
+
+
+def test_search_text_segments_normalized():
+    """search 接口的纯文本片段被还原成字符串"""
+    item = {"record_id": "r1", "fields": {"标题": [{"type": "text", "text": "你"}, {"type": "text", "text": "好"}],
+                                          "附件": [{"file_token": "x", "name": "a.png"}]}}
+    fields = feishu_records.normalize_search_record(item)["fields"]
+    assert fields["标题"] == "你好"
+    assert fields["附件"] == [{"file_token": "x", "name": "a.png"}]
+
+
+if __name__ == "__main__":
+    test_search_text_segments_normalized()
+    print("✅ 本地镜像测试通过")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试获取文本节点的结构化输出格式：JSON、JSONL、CSV 与逐行列表（无需网络）
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_format import format_records, marker_lines
+
+RECORDS = [
+    {"record_id": "r1", "fields": {"标题": '含,逗号与"引号"', "数量": 3, "标签": [{"text": "a"}, {"text": "b"}]}},
+    {"record_id": "r2", "fields": {"标题": "多行\n文本", "标签": []}},
+    {"record_id": "r3", "fields": {"标题": [{"type": "text", "text": " 富文本 "}], "数量": 1.5}},
+]
+COLUMNS = ["标题", "数量", "标签"]
+
+
+def test_json_and_jsonl():
+    """JSON 数组与 JSONL 逐行可解析，数字保持原类型，空值为 null"""
+    text, rows = format_records(RECORDS, COLUMNS, "JSON")
+    data = json.loads(text)
+    assert data[0] == {"标题": '含,逗号与"引号"', "数量": 3, "标签": "a, b"}
+    assert data[1] == {"标题": "多行\n文本", "数量": None, "标签": None}
+    assert data[2]["标题"] == " 富文本 "
+    assert [json.loads(row) for row in rows] == data
+
+    text, rows = format_records(RECORDS, COLUMNS, "JSONL")
+    assert [json.loads(line) for line in text.split("\n")] == data
+    assert format_records([], COLUMNS, "JSON")[0] == "[]"
+
+
+def test_csv_escaping_round_trips():
+    """CSV 中的逗号、引号、换行与首尾空白都能被标准解析器还原"""
+    text, rows = format_records(RECORDS, COLUMNS, "CSV")
+    parsed = list(csv.reader(io.StringIO(text)))
+    assert parsed[0] == COLUMNS
+    assert parsed[1] == ['含,逗号与"引号"', "3", "a, b"]
+    assert parsed[2] == ["多行\n文本", "", ""]
+    assert parsed[3] == [" 富文本 ", "1.5", ""]
+    assert len(rows) == 3
+
+
+def test_marker_format_unchanged():
+    """默认的标记格式与原有输出一致"""
+    text, rows = format_records(RECORDS, COLUMNS)
+    assert rows == marker_lines(RECORDS, COLUMNS, " | ")
+    assert text == "\n".join(rows)
+    assert format_records([], COLUMNS)[0] == "[]"
+
+
+if __name__ == "__main__":
+    test_json_and_jsonl()
+    test_csv_escaping_round_trips()
+    test_marker_format_unchanged()
+    print("✅ 输出格式测试通过")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式读取管线：分页 → 筛选 → 数量限制（无需网络）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_filter import filter_records, in_shard
+from conftest import FakeResponse, api_page
+
+FIELDS = [{"field_name": "标题", "type": 1}, {"field_name": "状态", "type": 3}]
+
+
+def make_pages(requested, pages=5, per_page=4):
+    def fake_list(access_token, app_token, table_id, params, page_size=500):
+        for p in range(pages):
+            requested.append(p)
+            yield [{"record_id": f"r{p}-{i}", "fields": {"标题": f"第{i}条", "状态": "已完成" if i % 2 else "进行中"}}
+                   for i in range(per_page)], 100
+    return fake_list
+
+
+def setup(monkeypatch, requested, **kwargs):
+    cache = SnapshotCache(ttl=60)
+    monkeypatch.setattr(feishu_records, "iter_record_pages", make_pages(requested, **kwargs))
+    monkeypatch.setattr(feishu_records, "iter_search_pages", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "snapshot_cache", cache)
+    return cache
+
+
+def test_consumer_stop_ends_paging(monkeypatch):
+    """调用方停止迭代后不再请求后续页面"""
+    requested = []
+    setup(monkeypatch, requested)
+    stream = feishu_records.stream_table_records("t", "base", "tbl", 1000)
+    first = next(stream)
+    assert first["record_id"] == "r0-0"
+    stream.close()
+    assert requested == [0]
+
+
+def test_filter_and_limit_applied_while_streaming(monkeypatch):
+    """选项字段的子串匹配在本地判定，凑够 limit 条即停止翻页"""
+    requested = []
+    setup(monkeypatch, requested)
+    records = list(feishu_records.stream_table_records("t", "base", "tbl", 1000,
+                                                       filter_condition="状态+完成", limit=3))
+    assert [r["record_id"] for r in records] == ["r0-1", "r0-3", "r1-1"]
+    assert requested == [0, 1]
+
+
+def test_small_complete_scan_cached(monkeypatch):
+    """完整扫描完的小结果写入快照缓存，再次读取不发请求"""
+    requested = []
+    setup(monkeypatch, requested, pages=2)
+    first = list(feishu_records.stream_table_records("t", "base", "tbl", 1000, filter_condition="状态+完成"))
+    assert len(first) == 4 and requested == [0, 1]
+    again = list(feishu_records.stream_table_records("t", "base", "tbl", 1000, filter_condition="状态+完成"))
+    assert again == first
+    assert requested == [0, 1]
+
+
+def test_cached_snapshot_uses_columnar_view(monkeypatch):
+    """已缓存完整快照时用列式视图筛选，之后再按分片与数量限制产出"""
+    pytest.importorskip("numpy")
+    import feishu_columnar
+
+    requested = []
+    cache = setup(monkeypatch, requested)
+    monkeypatch.setattr(feishu_columnar, "COLUMNAR_MIN_ROWS", 1)
+    filtered = []
+    original = feishu_columnar.ColumnarTable.filter
+
+    def spy(self, compiled, limit=None, scope=None):
+        filtered.append(limit)
+        return original(self, compiled, limit, scope)
+
+    monkeypatch.setattr(feishu_columnar.ColumnarTable, "filter", spy)
+    records = [{"record_id": f"r{i}", "fields": {"标题": f"第{i}条", "状态": "已完成" if i % 2 else "进行中"}}
+               for i in range(40)]
+    cache.put(feishu_records._table_key("t", "base", "tbl", None), TableSnapshot(records, True))
+
+    limited = list(feishu_records.stream_table_records("t", "base", "tbl", 1000,
+                                                       filter_condition="状态+完成", limit=3))
+    assert limited == filter_records(records, "状态+完成")[:3]
+    shard = (1, 3)
+    sharded = list(feishu_records.stream_table_records("t", "base", "tbl", 1000,
+                                                       filter_condition="状态+完成", shard=shard))
+    assert sharded == [r for r in filter_records(records, "状态+完成") if in_shard(r, shard)]
+    assert filtered == [3, None]  # 分片时不能在筛选阶段截断
+    assert requested == []
+
+
+def test_http_error_mid_stream_keeps_rows(monkeypatch):
+    """第 2 页出现 HTTP 错误时，已产出的记录照常返回，且不完整的结果不写入缓存"""
+    cache = SnapshotCache(ttl=60)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "snapshot_cache", cache)
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        page = int(params.get("page_token") or 0)
+        items = [{"record_id": f"r{page}-{i}", "fields": {"标题": f"第{i}条"}} for i in range(4)]
+        return FakeResponse(api_page(items, str(page + 1)), 502 if page == 1 else 200)
+
+    monkeypatch.setattr(feishu_records, "http_get", fake_get)
+    records = list(feishu_records.stream_table_records("t", "base", "tbl", 1000))
+    assert [r["record_id"] for r in records] == [f"r0-{i}" for i in range(4)]
+    assert cache.get(feishu_records._table_key("t", "base", "tbl", None), 1000, None) is None
+
+
+if __name__ == "__main__":
+    print("请使用 pytest 运行本测试")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按规则通过率排序的执行计划（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_filter import compile_filter, selectivity_stats
+
+RECORDS = [{"record_id": f"r{i}", "fields": {"标题": f"标题{i}", "状态": "完成" if i % 50 == 0 else "进行中"}}
+           for i in range(500)]
+
+
+def test_observed_pass_rates_reorder_rules():
+    """通过率低的规则在之后的筛选中先判定，结果不变"""
+    selectivity_stats.clear()
+    accept = compile_filter("标题+标题\n状态+完成")
+    # 没有统计时按默认顺序：关键词从长到短
+    assert [accept.labels[i] for i, _ in accept.plan("t")] == ["标题+标题", "状态+完成"]
+
+    first = accept.filter(RECORDS, scope="t")
+    plan = accept.plan("t")
+    assert [accept.labels[i] for i, _ in plan] == ["状态+完成", "标题+标题"]
+    assert accept.describe(plan) == "状态+完成(2%) → 标题+标题(100%)"
+    assert accept.filter(RECORDS, scope="t") == first
+    assert len(first) == 10
+
+    # 统计按表格区分
+    assert [accept.labels[i] for i, _ in accept.plan("other")] == ["标题+标题", "状态+完成"]
+
+
+def test_estimates_take_precedence():
+    """列统计给出的估计优先于观察到的通过率，代价更低的规则在通过率相同时先判定"""
+    selectivity_stats.clear()
+    accept = compile_filter("状态==完成\n备注+空值")
+    estimates = {"状态": 0.9, "备注": 0.97}
+    plan = accept.plan("t", lambda col, val, expect: estimates[col])
+    assert [accept.labels[i] for i, _ in plan] == ["状态==完成", "备注+空值"]
+    plan = accept.plan("t", lambda col, val, expect: 0.5)
+    assert [accept.labels[i] for i, _ in plan] == ["备注+空值", "状态==完成"]
+
+
+if __name__ == "__main__":
+    test_observed_pass_rates_reorder_rules()
+    test_estimates_take_precedence()
+    print("✅ 执行计划测试通过")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试字段投影（field_names）与快照的字段覆盖判断（无需网络）
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_filter import condition_columns, split_column_names
+from feishu_records import SingleFlight
+
+FIELDS = [{"field_name": name, "type": 1} for name in ("标题", "描述", "图片")]
+
+
+def test_snapshot_with_more_fields_serves_subset():
+    """包含更多字段的快照可以满足只需要部分字段的请求"""
+    cache = SnapshotCache(ttl=60)
+    cache.put("k", TableSnapshot([], True, field_names={"标题", "描述"}))
+    assert cache.get("k", None, {"标题"}) is not None
+    assert cache.get("k", None, {"图片"}) is None
+    assert cache.get("k") is None
+
+    # 字段更少的快照不会覆盖字段更多的有效快照
+    cache.put("k", TableSnapshot([], True, field_names={"标题"}))
+    assert cache.get("k", None, {"描述"}) is not None
+
+
+def test_list_scan_requests_only_known_fields(monkeypatch):
+    """列表接口只请求用到且表格中存在的字段"""
+    seen = []
+
+    def fake_pages(access_token, app_token, table_id, params=None, page_size=500):
+        seen.append(params)
+        yield [{"record_id": "r1", "fields": {"标题": "a"}}], 10
+
+    monkeypatch.setattr(feishu_records, "iter_record_pages", fake_pages)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    feishu_records.fetch_table_records("t", "base", "tbl", 100, field_names=["标题", "不存在"])
+    assert json.loads(seen[0]["field_names"]) == ["标题"]
+
+    # 子集请求复用快照，不再发请求
+    feishu_records.fetch_table_records("t", "base", "tbl", 100, field_names=["标题"])
+    assert len(seen) == 1
+    # 需要其它字段时重新拉取
+    feishu_records.fetch_table_records("t", "base", "tbl", 100, field_names=["描述"])
+    assert len(seen) == 2
+
+
+def test_search_projection_includes_filter_columns(monkeypatch):
+    """服务端筛选时额外请求筛选条件中的列，以便本地复核"""
+    bodies = []
+
+    def fake_search(access_token, app_token, table_id, body, page_size=500):
+        bodies.append(body)
+        yield [], 10
+
+    monkeypatch.setattr(feishu_records, "iter_search_pages", fake_search)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: FIELDS)
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    feishu_records.fetch_table_records("t", "base", "tbl", filter_condition="描述+风景", field_names=["图片"])
+    assert bodies[0]["field_names"] == ["图片", "描述"]
+
+
+def test_column_helpers():
+    """列名列表与筛选条件中的列名解析"""
+    assert split_column_names("标题，描述、图片;\n备注") == ["标题", "描述", "图片", "备注"]
+    assert condition_columns("标题+风景\n+状态+完成\n-图片-空值\n旧=1") == ["标题", "状态", "图片", "旧"]
+
+
+if __name__ == "__main__":
+    test_snapshot_with_more_fields_serves_subset()
+    test_column_helpers()
+    print("✅ 字段投影测试通过")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试频率限制调度器（无需网络）
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import feishu_client
+from feishu_client import RateLimiter, TokenBucket
+
+
+def make_response(status, body=b'{"code":0}', headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.headers.update({"Content-Type": "application/json"})
+    resp.headers.update(headers or {})
+    return resp
+
+
+def test_endpoint_families():
+    """按接口路径与方法划分接口族"""
+    family = RateLimiter.endpoint_family
+    base = "https://open.feishu.cn/open-apis"
+    assert family("GET", f"{base}/bitable/v1/apps/a/tables/t/records") == "bitable_read"
+    assert family("POST", f"{base}/bitable/v1/apps/a/tables/t/records/search") == "bitable_read"
+    assert family("PUT", f"{base}/bitable/v1/apps/a/tables/t/records/r") == "bitable_write"
+    assert family("POST", f"{base}/drive/v1/medias/upload_all") == "drive"
+    assert family("GET", "https://internal-api-drive-stream.feishu.cn/x") is None
+
+
+def test_bucket_limits_rate():
+    """令牌桶按速率放行"""
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.08
+
+
+def test_retry_on_429_honours_reset_header(monkeypatch):
+    """429 响应按重置头等待后重试"""
+    responses = [
+        make_response(429, headers={"x-ogw-ratelimit-reset": "0"}),
+        make_response(200, b'{"code":99991400,"msg":"frequency limit"}'),
+        make_response(200),
+    ]
+
+    class FakeSession:
+        calls = 0
+
+        def request(self, method, url, **kwargs):
+            FakeSession.calls += 1
+            return responses.pop(0)
+
+    monkeypatch.setattr(feishu_client, "get_session", lambda: FakeSession())
+    monkeypatch.setattr(feishu_client, "RATE_LIMIT_BACKOFF_BASE", 0.01)
+    resp = feishu_client.http_get("https://open.feishu.cn/open-apis/bitable/v1/apps/a/tables/t/records",
+                                  headers={"Authorization": "Bearer t-unknown"})
+    assert resp.status_code == 200
+    assert resp.json() == {"code": 0}
+    assert FakeSession.calls == 3
+
+
+def test_non_rate_limit_errors_not_retried(monkeypatch):
+    """普通错误直接返回"""
+    class FakeSession:
+        calls = 0
+
+        def request(self, method, url, **kwargs):
+            FakeSession.calls += 1
+            return make_response(400, b'{"code":1254045,"msg":"FieldNameNotFound"}')
+
+    monkeypatch.setattr(feishu_client, "get_session", lambda: FakeSession())
+    resp = feishu_client.http_get("https://open.feishu.cn/open-apis/bitable/v1/apps/a/tables/t/records")
+    assert resp.status_code == 400
+    assert FakeSession.calls == 1
+
+
+if __name__ == "__main__":
+    test_endpoint_families()
+    test_bucket_limits_rate()
+    print("✅ 频率限制调度测试通过")
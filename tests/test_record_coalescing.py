@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试记录扫描的合并（single-flight）逻辑（无需网络）
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_records import SingleFlight
+from conftest import FakeResponse
+
+
+def test_concurrent_scans_share_one_request():
+    """并发的相同扫描只执行一次"""
+    flight = SingleFlight(window=5)
+    calls = []
+
+    def scan():
+        calls.append(1)
+        time.sleep(0.05)
+        return TableSnapshot([{"record_id": "r1"}], True)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", None, scan))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] and r.records == [{"record_id": "r1"}] for r in results)
+
+
+def test_finished_scan_reused_within_window_and_forgotten_after_write():
+    """完成的扫描在窗口内复用，写入后失效"""
+    flight = SingleFlight(window=5)
+    calls = []
+
+    def scan():
+        calls.append(1)
+        return TableSnapshot([{"record_id": "r1"}], True)
+
+    flight.do(("app", "base", "tbl", ""), None, scan)
+    flight.do(("app", "base", "tbl", ""), 10, scan)
+    assert len(calls) == 1
+
+    flight.forget(lambda key: key[2] == "tbl")
+    flight.do(("app", "base", "tbl", ""), None, scan)
+    assert len(calls) == 2
+
+
+def test_partial_scan_not_reused_for_larger_request():
+    """截断的扫描不能满足更大行数的请求"""
+    flight = SingleFlight(window=5)
+    calls = []
+
+    def scan():
+        calls.append(1)
+        return TableSnapshot([{"record_id": "r1"}, {"record_id": "r2"}], False)
+
+    flight.do("k", 2, scan)
+    flight.do("k", 1, scan)
+    assert len(calls) == 1
+    flight.do("k", None, scan)
+    assert len(calls) == 2
+
+
+def test_expired_results_are_released(monkeypatch):
+    """过了复用期的扫描结果在下一次扫描时丢弃，不在快照缓存之外长期占用内存"""
+    flight = SingleFlight(window=0.05)
+    monkeypatch.setattr(feishu_records, "current_prompt_id", lambda: "prompt-1")
+    flight.do("a", None, lambda: TableSnapshot([{"record_id": "r1"}], True))
+    time.sleep(0.1)
+    flight.do("b", None, lambda: TableSnapshot([], True))
+    assert "a" in flight._calls  # 同一 prompt 内仍可复用
+
+    monkeypatch.setattr(feishu_records, "current_prompt_id", lambda: "prompt-2")
+    time.sleep(0.1)
+    flight.do("c", None, lambda: TableSnapshot([], True))
+    assert set(flight._calls) == {"c"}
+
+
+def test_fetch_table_records_pages_until_done(monkeypatch):
+    """分页拉取直到没有下一页"""
+    pages = [
+        {"code": 0, "data": {"items": [{"record_id": "r1"}], "page_token": "p2", "has_more": True}},
+        {"code": 0, "data": {"items": [{"record_id": "r2"}], "has_more": False}},
+    ]
+
+    monkeypatch.setattr(feishu_records, "http_get", lambda *a, **k: FakeResponse(pages.pop(0)))
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=5))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=0))
+    records = feishu_records.fetch_table_records("t-x", "base", "tbl")
+    assert [r["record_id"] for r in records] == ["r1", "r2"]
+
+
+if __name__ == "__main__":
+    test_concurrent_scans_share_one_request()
+    test_finished_scan_reused_within_window_and_forgotten_after_write()
+    test_partial_scan_not_reused_for_larger_request()
+    print("✅ 记录扫描合并测试通过")
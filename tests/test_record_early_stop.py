@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试凑够结果限制后提前停止分页，以及自适应的每页条数（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache
+from feishu_records import AdaptivePageSize, SingleFlight
+
+
+def test_adaptive_page_size_follows_hit_rate():
+    """每页条数随命中率调整，且不超过接口上限与扫描预算"""
+    size = AdaptivePageSize(wanted=5, initial_rate=1.0)
+    assert size() == 5
+    size = AdaptivePageSize(wanted=10)
+    assert size() == 48
+    size.observe(48, 1)
+    assert size() == 500
+    size = AdaptivePageSize(wanted=10, budget=30)
+    assert size() == 30
+    assert AdaptivePageSize(wanted=None)() == 500
+
+
+class FakeTable:
+    """按 page_size 分页的假数据表：每 10 行中有 1 行命中"""
+
+    def __init__(self, rows):
+        self.rows = [{"record_id": f"r{i}", "fields": {"标签": "Hit" if i % 10 == 0 else "miss"}}
+                     for i in range(rows)]
+        self.sizes = []
+
+    def pages(self, access_token, app_token, table_id, params=None, page_size=500):
+        offset = 0
+        while offset < len(self.rows):
+            size = page_size() if callable(page_size) else page_size
+            self.sizes.append(size)
+            yield self.rows[offset:offset + size], 10
+            offset += size
+
+
+def install(monkeypatch, table):
+    monkeypatch.setattr(feishu_records, "iter_record_pages", table.pages)
+    # 含大写字母的关键词不会下推到服务端
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: [{"field_name": "标签", "type": 1}])
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+
+def test_local_filter_stops_once_limit_reached(monkeypatch):
+    """本地逐页筛选凑够结果限制后不再翻页"""
+    table = FakeTable(10000)
+    install(monkeypatch, table)
+    records = feishu_records.fetch_table_records("t", "base", "tbl", 10000, filter_condition="标签+Hit", limit=5)
+    assert [r["record_id"] for r in records] == ["r0", "r10", "r20", "r30", "r40"]
+    assert sum(table.sizes) < 100
+
+
+def test_max_rows_counts_matches_without_pushdown(monkeypatch):
+    """无法下推时最大行数同样限制命中条数（与下推到服务端时含义一致），凑够即停止"""
+    table = FakeTable(10000)
+    install(monkeypatch, table)
+    records = feishu_records.fetch_table_records("t", "base", "tbl", 3, filter_condition="标签+Hit")
+    assert [r["record_id"] for r in records] == ["r0", "r10", "r20"]
+    assert sum(table.sizes) < 100
+
+    streamed = list(feishu_records.stream_table_records("t", "base", "tbl", 3, filter_condition="标签+Hit"))
+    assert [r["record_id"] for r in streamed] == ["r0", "r10", "r20"]
+
+if __name__ == "__main__":
+    test_adaptive_page_size_follows_hit_rate()
+    print("✅ 提前停止分页测试通过")
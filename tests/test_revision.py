@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试基于表格版本的 IS_CHANGED 指纹：表格未变化时指纹不变，探测结果在短时间内复用（无需网络）
+"""
+
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+import feishu_table_page_node
+from feishu_records import invalidate_table, read_fingerprint, table_revision
+from feishu_table_page_node import FeishuTablePageNode
+from conftest import FakeResponse, api_page
+
+CONFIG = {"app_id": "cli", "app_secret": "secret", "url_app_id": "base", "table_id": "tbl"}
+NODE = ("FeishuTablePageNode", "5")
+
+
+class FakeBase:
+    def __init__(self, monkeypatch, revision=7, newest=1000):
+        self.revision = revision
+        self.newest = newest
+        self.calls = []
+        monkeypatch.setattr(feishu_records, "http_get", self.get)
+        monkeypatch.setattr(feishu_records, "http_post", self.post)
+        monkeypatch.setattr(feishu_records.token_cache, "get_token", lambda app_id, app_secret: "t")
+        monkeypatch.setattr(feishu_records, "fetch_table_fields",
+                            lambda *a: [{"field_name": "标题", "type": 1}, {"field_name": "修改时间", "type": 1002}])
+        monkeypatch.setattr(feishu_records, "_revision_cache", {})
+        monkeypatch.setattr(feishu_records, "_node_configs", {})
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.calls.append(("tables", params))
+        table = {"table_id": "tbl", "name": "任务"}
+        if self.revision is not None:
+            table["revision"] = self.revision
+        return FakeResponse(api_page([{"table_id": "other", "revision": 1}, table]))
+
+    def post(self, url, headers=None, params=None, json=None, timeout=None):
+        self.calls.append(("search", params, json))
+        return FakeResponse(api_page([{"record_id": "r1", "fields": {"修改时间": self.newest}}], "x", total=42))
+
+
+def test_fingerprint_follows_revision_and_inputs(monkeypatch):
+    """版本与输入都不变时指纹相同；表格被修改或输入变化后指纹改变"""
+    base = FakeBase(monkeypatch)
+    first = read_fingerprint(NODE, CONFIG, {"筛选条件": "进度-完成"})
+    assert read_fingerprint(NODE, CONFIG, {"筛选条件": "进度-完成"}) == first
+    assert len(base.calls) == 1  # 第二次复用缓存的探测结果
+    assert read_fingerprint(NODE, CONFIG, {"筛选条件": "进度+完成"}) != first
+
+    base.revision = 8
+    assert read_fingerprint(NODE, CONFIG, {"筛选条件": "进度-完成"}) == first  # 仍在缓存有效期内
+    invalidate_table("base", "tbl")
+    assert read_fingerprint(NODE, CONFIG, {"筛选条件": "进度-完成"}) != first
+
+
+def test_falls_back_to_newest_modified_time(monkeypatch):
+    """没有 revision 时用一行大小的「最新修改时间」查询"""
+    base = FakeBase(monkeypatch, revision=None)
+    assert table_revision("t", "base", "tbl") == "mod:1000/42"
+    search = base.calls[-1]
+    assert search[1]["page_size"] == 1
+    assert search[2]["sort"] == [{"field_name": "修改时间", "desc": True}]
+
+
+def test_unknown_state_always_reruns(monkeypatch):
+    """配置不完整或探测失败时返回 NaN，节点总是重新执行"""
+    FakeBase(monkeypatch)
+    assert math.isnan(read_fingerprint(NODE, None, {}))
+    assert math.isnan(read_fingerprint(NODE, dict(CONFIG, table_id=""), {}))
+
+    def broken(*args, **kwargs):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(feishu_records, "http_get", broken)
+    assert math.isnan(read_fingerprint(NODE, CONFIG, {}))
+
+
+def test_is_changed_without_linked_config(monkeypatch):
+    """ComfyUI 计算 IS_CHANGED 时不传连线输入：节点执行过一次后用记下的配置探测版本"""
+    base = FakeBase(monkeypatch)
+    monkeypatch.setattr(feishu_table_page_node, "get_tenant_access_token", lambda app_id, app_secret: None)
+    inputs = {"筛选列名": "标题", "筛选条件": "", "游标": "", "每页行数": 20, "unique_id": "5"}
+    assert math.isnan(FeishuTablePageNode.IS_CHANGED(**inputs))  # 还没执行过，只能重新执行
+
+    FeishuTablePageNode().read_page(CONFIG, **inputs)
+    first = FeishuTablePageNode.IS_CHANGED(**inputs)
+    assert isinstance(first, str)  # 不是 NaN，表格不变时可以复用输出
+    assert FeishuTablePageNode.IS_CHANGED(**inputs) == first
+    assert math.isnan(FeishuTablePageNode.IS_CHANGED(**dict(inputs, unique_id="6")))
+
+    base.revision = 8
+    invalidate_table("base", "tbl")
+    assert FeishuTablePageNode.IS_CHANGED(**inputs) != first
+
+
+if __name__ == "__main__":
+    print("请使用 pytest 运行本文件")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试筛选条件下推到 records/search 接口（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_filter import build_search_filter, parse_filter_condition
+from feishu_records import SingleFlight
+
+FIELD_TYPES = {"标题": 1, "状态": 3, "图片": 17}
+
+
+def compile_condition(text):
+    include, exclude = parse_filter_condition(text)
+    return build_search_filter(include, exclude, FIELD_TYPES)
+
+
+def test_rules_compiled_to_search_conditions():
+    """关键词/空值/非空值规则映射为 contains、doesNotContain、isEmpty、isNotEmpty"""
+    search_filter, exact = compile_condition("标题+风景\n标题-草稿\n图片-空值\n状态-非空值")
+    assert exact
+    assert search_filter["conjunction"] == "and"
+    assert [(c["field_name"], c["operator"]) for c in search_filter["conditions"]] == [
+        ("标题", "contains"), ("标题", "doesNotContain"), ("图片", "isNotEmpty"), ("状态", "isEmpty"),
+    ]
+
+
+def test_rules_server_cannot_express_stay_local():
+    """未知列、选项字段的子串匹配、可能区分大小写的关键词、文本判空都留在本地判定"""
+    search_filter, exact = compile_condition("标题+Cat\n状态+进行\n不存在+x\n标题+空值\n标题+猫")
+    assert not exact
+    assert [(c["field_name"], c["operator"]) for c in search_filter["conditions"]] == [("标题", "contains")]
+    assert compile_condition("状态+进行") == (None, False)
+
+
+def test_fetch_pushes_filter_and_rechecks_locally(monkeypatch):
+    """只拉取服务端命中的记录，并在本地复核"""
+    bodies = []
+
+    def fake_search(access_token, app_token, table_id, body, page_size=500):
+        bodies.append(body)
+        yield [{"record_id": "r1", "fields": {"标题": "风景A"}},
+               {"record_id": "r2", "fields": {"标题": "人像"}}], 10
+
+    monkeypatch.setattr(feishu_records, "iter_search_pages", fake_search)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields",
+                        lambda *a: [{"field_name": k, "type": v} for k, v in FIELD_TYPES.items()])
+    monkeypatch.setattr(feishu_records, "_scan_records", lambda *a: (_ for _ in ()).throw(AssertionError))
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    records = feishu_records.fetch_table_records("t", "base", "tbl", 1000, filter_condition="标题+风景")
+    assert [r["record_id"] for r in records] == ["r1"]
+    assert bodies[0]["filter"]["conditions"][0]["operator"] == "contains"
+
+
+def test_cached_snapshot_filtered_without_request(monkeypatch):
+    """已有完整快照时直接在本地筛选"""
+    cache = SnapshotCache(ttl=60)
+    cache.put((None, "base", "tbl", ""), TableSnapshot(
+        [{"record_id": "r1", "fields": {"标题": "风景"}}, {"record_id": "r2", "fields": {}}], True))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", cache)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: (_ for _ in ()).throw(AssertionError))
+
+    records = feishu_records.fetch_table_records("t-unknown", "base", "tbl", filter_condition="标题-空值")
+    assert [r["record_id"] for r in records] == ["r1"]
+
+
+if __name__ == "__main__":
+    test_rules_compiled_to_search_conditions()
+    test_rules_server_cannot_express_stay_local()
+    print("✅ 筛选下推测试通过")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按 record_id 哈希的静态分片（无需网络）
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache
+from feishu_filter import node_shard, shard_of, shard_records
+
+RECORDS = [{"record_id": f"rec{i:05d}", "fields": {"状态": "已完成" if i % 2 else "进行中"}} for i in range(2000)]
+
+
+def test_shards_partition_records():
+    """各分片互不重叠、合起来正好是全部记录，且大致均匀"""
+    parts = [shard_records(RECORDS, (i, 4)) for i in range(4)]
+    ids = [r["record_id"] for part in parts for r in part]
+    assert sorted(ids) == [r["record_id"] for r in RECORDS]
+    assert all(400 <= len(part) <= 600 for part in parts)
+    # 跨进程稳定：不依赖 Python 的 hash 随机化
+    assert shard_of("rec00001", 4) == shard_of("rec00001", 4) and shard_of("abc", 7) == 891568578 % 7
+
+
+def test_node_shard_arguments():
+    assert node_shard(1, 1) is None
+    assert node_shard(3, 4) == (2, 4)
+    with pytest.raises(ValueError):
+        node_shard(5, 4)
+
+
+def test_stream_applies_shard_before_limit(monkeypatch):
+    """流式读取时先分片再计数，limit 条都来自本分片"""
+    def fake_list(access_token, app_token, table_id, params, page_size=500):
+        for start in range(0, len(RECORDS), 500):
+            yield RECORDS[start:start + 500], 100
+
+    monkeypatch.setattr(feishu_records, "iter_record_pages", fake_list)
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: [{"field_name": "状态", "type": 3}])
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    got = list(feishu_records.stream_table_records("t", "base", "tbl", filter_condition="状态+完成",
+                                                   limit=50, shard=(1, 3)))
+    expected = shard_records([r for r in RECORDS if r["fields"]["状态"] == "已完成"], (1, 3))[:50]
+    assert got == expected
+
+    got = list(feishu_records.stream_table_records("t", "base", "tbl", limit=30, shard=(2, 3)))
+    assert got == shard_records(RECORDS, (2, 3))[:30]
+
+
+if __name__ == "__main__":
+    test_shards_partition_records()
+    test_node_shard_arguments()
+    print("✅ 分片测试通过")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试记录快照缓存（无需网络）
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+from feishu_cache import SnapshotCache, TableSnapshot
+from feishu_records import SingleFlight
+
+
+def rows(n):
+    return [{"record_id": f"r{i}", "fields": {"序号": i}} for i in range(n)]
+
+
+def test_hit_until_ttl_expires():
+    """有效期内命中，过期后失效"""
+    cache = SnapshotCache(ttl=0.05)
+    cache.put("k", TableSnapshot(rows(3), True))
+    assert cache.get("k").records == rows(3)
+    time.sleep(0.06)
+    assert cache.get("k") is None
+
+
+def test_truncated_snapshot_only_serves_smaller_requests():
+    """截断的快照只能满足不超过其行数的请求"""
+    cache = SnapshotCache(ttl=60)
+    cache.put("k", TableSnapshot(rows(10), False))
+    assert cache.get("k", 5) is not None
+    assert cache.get("k", 20) is None
+    assert cache.get("k") is None
+
+
+def test_lru_eviction_by_memory():
+    """超出内存上限时淘汰最久未使用的快照"""
+    one = TableSnapshot(rows(10), True, nbytes=1000)
+    cache = SnapshotCache(ttl=60, max_bytes=one.memory_cost() * 2)
+    cache.put("a", one)
+    cache.put("b", TableSnapshot(rows(10), True, nbytes=1000))
+    cache.get("a")
+    cache.put("c", TableSnapshot(rows(10), True, nbytes=1000))
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_fetch_uses_snapshot_and_invalidates_after_write(monkeypatch):
+    """重复读取走快照，写入后重新拉取"""
+    calls = []
+
+    def fake_scan(access_token, app_token, table_id, view_id, max_rows, field_names=None):
+        calls.append(1)
+        return TableSnapshot(rows(4), True)
+
+    monkeypatch.setattr(feishu_records, "_scan_records", fake_scan)
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    for _ in range(3):
+        assert len(feishu_records.fetch_table_records("t", "base", "tbl")) == 4
+    assert len(feishu_records.fetch_table_records("t", "base", "tbl", max_rows=2)) == 2
+    assert len(calls) == 1
+
+    feishu_records.invalidate_table("base", "tbl")
+    feishu_records.fetch_table_records("t", "base", "tbl")
+    assert len(calls) == 2
+
+
+def test_update_targets_always_read_fresh(monkeypatch):
+    """选择要覆盖写入的行时不使用缓存的快照，且读取结果之后仍可供只读节点复用"""
+    calls = []
+
+    def fake_scan(access_token, app_token, table_id, view_id, max_rows, field_names=None):
+        calls.append(1)
+        return TableSnapshot(rows(4), True)
+
+    monkeypatch.setattr(feishu_records, "_scan_records", fake_scan)
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=60))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+
+    feishu_records.fetch_table_records("t", "base", "tbl")
+    assert len(feishu_records.fetch_update_targets("t", "base", "tbl", None)) == 4
+    assert len(feishu_records.fetch_update_targets("t", "base", "tbl", None)) == 4
+    assert len(calls) == 3
+    feishu_records.fetch_table_records("t", "base", "tbl")
+    assert len(calls) == 3
+
+
+def test_update_targets_bounded_by_scanned_rows(monkeypatch):
+    """更新模式只在表格前 max_scan 行中选择要覆盖的行，命中再少也不继续往后读"""
+    scanned = []
+
+    def fake_scan(access_token, app_token, table_id, view_id, max_rows, field_names=None):
+        scanned.append((max_rows, field_names))
+        records = [{"record_id": f"r{i}", "fields": {"状态": "完成" if i % 3 == 0 else "进行中"}}
+                   for i in range(max_rows)]
+        return TableSnapshot(records, False)
+
+    monkeypatch.setattr(feishu_records, "_scan_records", fake_scan)
+    monkeypatch.setattr(feishu_records, "_search_scan", lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    monkeypatch.setattr(feishu_records, "_single_flight", SingleFlight(window=0))
+    monkeypatch.setattr(feishu_records, "snapshot_cache", SnapshotCache(ttl=60))
+    monkeypatch.setattr(feishu_records, "fetch_table_fields", lambda *a: [{"field_name": "状态", "type": 1}])
+
+    targets = feishu_records.fetch_update_targets("t", "base", "tbl", 10, "状态+完成", ["标题"])
+    assert [r["record_id"] for r in targets] == ["r0", "r3", "r6", "r9"]
+    assert scanned == [(10, frozenset({"状态"}))]
+
+
+if __name__ == "__main__":
+    test_hit_until_ttl_expires()
+    test_truncated_snapshot_only_serves_smaller_requests()
+    test_lru_eviction_by_memory()
+    print("✅ 快照缓存测试通过")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试共享访问令牌缓存（无需网络）
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_client import TokenCache
+
+
+class CountingTokenCache(TokenCache):
+    """用计数桩替换真实的令牌请求"""
+
+    def __init__(self, expire=7200, delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.expire = expire
+        self.delay = delay
+
+    def _request_token(self, app_id, app_secret):
+        self.calls += 1
+        time.sleep(self.delay)
+        return f"t-{app_id}-{self.calls}", self.expire
+
+
+def test_token_reused_until_expiry():
+    """同一应用在有效期内复用令牌"""
+    cache = CountingTokenCache()
+    assert cache.get_token("cli_a", "secret") == "t-cli_a-1"
+    assert cache.get_token("cli_a", "secret") == "t-cli_a-1"
+    assert cache.calls == 1
+
+
+def test_token_refreshed_near_expiry():
+    """剩余有效期小于提前刷新窗口时重新获取"""
+    cache = CountingTokenCache(expire=200, refresh_margin=300)
+    cache.get_token("cli_a", "secret")
+    cache.get_token("cli_a", "secret")
+    assert cache.calls == 2
+
+
+def test_secret_change_forces_refresh():
+    """App Secret 变化时不复用旧令牌"""
+    cache = CountingTokenCache()
+    cache.get_token("cli_a", "secret")
+    cache.get_token("cli_a", "other-secret")
+    assert cache.calls == 2
+
+
+def test_concurrent_callers_share_one_refresh():
+    """并发调用只触发一次刷新"""
+    cache = CountingTokenCache(delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_token("cli_a", "secret")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.calls == 1
+    assert set(results) == {"t-cli_a-1"}
+
+
+if __name__ == "__main__":
+    test_token_reused_until_expiry()
+    test_token_refreshed_near_expiry()
+    test_secret_change_forces_refresh()
+    test_concurrent_callers_share_one_refresh()
+    print("✅ 令牌缓存测试通过")
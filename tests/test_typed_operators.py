@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按类型比较的筛选规则（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feishu_filter import (build_search_filter, compile_filter, condition_columns, filter_records,
+                           parse_conditions, parse_date)
+
+DAY = parse_date("2024-05-02") - parse_date("2024-05-01")
+
+RECORDS = [
+    {"record_id": "r1", "fields": {"评分": 95, "日期": parse_date("2024-05-01") + 3600 * 1000,
+                                   "状态": "完成", "标签": ["猫", "狗"], "已审核": True}},
+    {"record_id": "r2", "fields": {"评分": 80, "日期": parse_date("2024-04-01"), "状态": "进行中"}},
+    {"record_id": "r3", "fields": {"评分": 60.5, "标签": ["鸟"], "已审核": False}},
+    {"record_id": "r4", "fields": {"评分": {"type": 2, "value": [88]}, "状态": "完成了"}},
+]
+
+
+def ids(condition):
+    return [r["record_id"] for r in filter_records(RECORDS, condition)]
+
+
+def test_range_operators():
+    """数字与日期按大小比较，缺失值不匹配"""
+    assert ids("评分>80") == ["r1", "r4"]
+    assert ids("评分>=80") == ["r1", "r2", "r4"]
+    assert ids("评分<-1") == []
+    assert ids("评分介于60~88") == ["r2", "r3", "r4"]
+    assert ids("日期>=2024-05-01") == ["r1"]
+    assert ids("日期<2024/05/01") == ["r2"]
+    assert ids("日期>不是日期") == []
+
+
+def test_equality_operators():
+    """选项按名称完全相等，复选框比较是/否（未填写视为否），日期按同一天"""
+    assert ids("状态==完成") == ["r1"]
+    assert ids("状态!=完成") == ["r2", "r3", "r4"]
+    assert ids("标签==狗") == ["r1"]
+    assert ids("已审核==是") == ["r1"]
+    assert ids("已审核==否") == ["r2", "r3", "r4"]
+    assert ids("日期==2024-05-01") == ["r1"]
+    assert ids("评分==80\n状态+进行") == ["r2"]
+
+
+def test_parsing_keeps_legacy_rules():
+    """按类型比较的规则与关键词规则互不干扰"""
+    include, exclude, typed = parse_conditions("标题+a>b\n分数>=-5\n旧=1\n状态==完成")
+    assert include == [("标题", "a>b"), ("旧", "1")]
+    assert [(r.column, r.op, r.operand) for r in typed] == [("分数", ">=", "-5"), ("状态", "==", "完成")]
+    assert condition_columns("分数>=-5\n日期介于昨天~今天\n状态!=完成") == ["分数", "日期", "状态"]
+    assert compile_filter("分数>1").columns == ["分数"]
+
+
+def test_typed_rules_pushed_down():
+    """数字比较等价下推；日期按天放宽后下推；选项、已勾选的复选框按相等下推"""
+    field_types = {"评分": 2, "日期": 5, "状态": 3, "标签": 4, "已审核": 7, "标题": 1}
+    accept = compile_filter("评分介于60~88.5\n状态==完成\n标签==猫\n已审核==是")
+    search_filter, exact = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+    assert exact
+    assert [(c["field_name"], c["operator"], c["value"]) for c in search_filter["conditions"]] == [
+        ("评分", "isGreaterEqual", ["60"]), ("评分", "isLessEqual", ["88.5"]),
+        ("状态", "is", ["完成"]), ("标签", "contains", ["猫"]), ("已审核", "is", ["true"]),
+    ]
+
+    accept = compile_filter("日期>2024-05-01\n已审核==否\n标题==x")
+    search_filter, exact = build_search_filter(accept.include, accept.exclude, field_types, accept.typed)
+    assert not exact
+    assert search_filter["conditions"] == [{"field_name": "日期", "operator": "isGreater",
+                                            "value": ["ExactDate", str(int(parse_date("2024-05-01") - DAY))]}]
+
+
+if __name__ == "__main__":
+    test_range_operators()
+    test_equality_operators()
+    test_parsing_keeps_legacy_rules()
+    test_typed_rules_pushed_down()
+    print("✅ 按类型比较测试通过")
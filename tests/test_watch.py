@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试变更监视：每次轮询一个小请求，只返回新增或修改的行（无需网络）
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feishu_records
+import feishu_watch
+import feishu_watch_node
+from feishu_watch import WatchMark, poll_changes, reset_watch
+from conftest import FakeResponse, api_page
+
+FIELDS = [{"field_name": "标题", "type": 1}, {"field_name": "状态", "type": 3},
+          {"field_name": "修改时间", "type": 1002}]
+
+
+class FakeTable:
+    """内存中的表格：按 search 请求的排序与 page_size 返回，并记录每次请求"""
+
+    def __init__(self, monkeypatch, count):
+        self.rows = {f"r{i}": {"标题": f"任务{i}", "状态": "待处理", "修改时间": 1000 + i} for i in range(count)}
+        self.requests = []
+        monkeypatch.setattr(feishu_records, "http_post", self.post)
+        monkeypatch.setattr(feishu_watch, "fetch_table_fields", lambda *a: FIELDS)
+        reset_watch()
+
+    def post(self, url, headers=None, params=None, json=None, timeout=None):
+        self.requests.append((params, json))
+        sort = json["sort"][0]
+        ordered = sorted(self.rows.items(), key=lambda kv: kv[1][sort["field_name"]], reverse=sort["desc"])
+        start = int(params.get("page_token") or 0)
+        end = start + params["page_size"]
+        items = [{"record_id": rid, "fields": {k: v for k, v in fields.items()
+                                               if k in json.get("field_names", fields)}}
+                 for rid, fields in ordered[start:end]]
+        return FakeResponse(api_page(items, str(end) if end < len(ordered) else None))
+
+    def touch(self, record_id, when, **fields):
+        self.rows.setdefault(record_id, {"标题": record_id, "状态": "待处理"}).update(fields, 修改时间=when)
+
+
+def ids(records):
+    return [r["record_id"] for r in records]
+
+
+def test_poll_returns_only_changes_with_one_request(monkeypatch):
+    """首次只建立高水位；之后每次一个请求，只返回新增或修改的行"""
+    table = FakeTable(monkeypatch, 5000)
+    records, first = poll_changes("t", "base", "tbl", page_size=10, field_names=["标题"])
+    assert first and records == []
+    assert len(table.requests) == 1 and table.requests[0][0]["page_size"] == 10
+
+    table.requests.clear()
+    assert poll_changes("t", "base", "tbl", page_size=10, field_names=["标题"]) == ([], False)
+    assert len(table.requests) == 1
+    assert table.requests[0][1]["sort"] == [{"field_name": "修改时间", "desc": True}]
+    assert table.requests[0][1]["field_names"] == ["修改时间", "标题"]
+
+    table.touch("r7", 9000)
+    table.touch("new", 9001)
+    table.requests.clear()
+    records, _ = poll_changes("t", "base", "tbl", page_size=10, field_names=["标题"])
+    assert ids(records) == ["r7", "new"]
+    assert len(table.requests) == 1
+    assert poll_changes("t", "base", "tbl", page_size=10, field_names=["标题"]) == ([], False)
+
+
+def test_burst_pages_and_same_millisecond(monkeypatch):
+    """一次改动超过 page_size 行时继续翻页；同一毫秒修改的行不漏报也不重复"""
+    table = FakeTable(monkeypatch, 100)
+    poll_changes("t", "base", "tbl", page_size=3)
+    for i in range(7):
+        table.touch(f"r{i}", 5000)
+    records, _ = poll_changes("t", "base", "tbl", page_size=3)
+    assert sorted(ids(records)) == [f"r{i}" for i in range(7)]
+    table.touch("r50", 5000)
+    records, _ = poll_changes("t", "base", "tbl", page_size=3)
+    assert ids(records) == ["r50"]
+
+
+def test_filter_skips_but_advances(monkeypatch):
+    """不满足筛选条件的改动不输出，但高水位照样前进"""
+    table = FakeTable(monkeypatch, 10)
+    poll_changes("t", "base", "tbl", filter_condition="状态==待处理")
+    table.touch("r1", 6000, 状态="已完成")
+    table.touch("r2", 6001)
+    records, _ = poll_changes("t", "base", "tbl", filter_condition="状态==待处理")
+    assert ids(records) == ["r2"]
+    assert table.requests[-1][1]["filter"]["conditions"][0]["field_name"] == "状态"
+    assert poll_changes("t", "base", "tbl", filter_condition="状态==待处理") == ([], False)
+
+
+def test_watch_mark_advance():
+    mark = WatchMark(10, {"a"}).advance([(10, "b"), (9, "c")])
+    assert mark.since == 10 and mark.seen == {"a", "b"}
+    assert mark.covers(10, "a") and mark.covers(9, "z") and not mark.covers(10, "z")
+    assert WatchMark(10, {"a"}).advance([(11, "z")]).seen == {"z"}
+
+
+def test_node_blocks_every_output_without_changes(monkeypatch):
+    """没有变更时表格数据与逐行数据（列表输出）都给出阻断值"""
+    class Blocker:
+        def __init__(self, value):
+            self.value = value
+
+    monkeypatch.setattr(feishu_watch_node, "ExecutionBlocker", Blocker)
+    monkeypatch.setattr(feishu_watch_node, "get_tenant_access_token", lambda *a: "t")
+    monkeypatch.setattr(feishu_watch_node, "poll_changes", lambda *a, **k: ([], False))
+    config = {"app_id": "a", "app_secret": "s", "url_app_id": "base", "table_id": "tbl"}
+    data, count, status, rows = feishu_watch_node.FeishuWatchNode().watch(config, "标题", "", 20)
+    assert isinstance(data, Blocker) and count == 0
+    assert len(rows) == 1 and isinstance(rows[0], Blocker)
+
+
+if __name__ == "__main__":
+    test_watch_mark_advance()
+    print("✅ 变更监视测试通过")